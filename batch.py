@@ -0,0 +1,335 @@
+"""
+VI batch converter
+
+converts many Linearity Curve files at once using a process pool.
+
+usage: python batch.py folder/ "more/*.curve" -o out/ --summary summary.json
+
+Each input gets its own svg (input.curve -> input.svg).
+Outputs are written to a temporary file first and renamed when complete,
+so re-running the same batch skips files that were already converted.
+Inputs that would write the same svg (same name matched from different
+folders without a common root) are reported as failed instead of overwritten.
+A worker process that dies (killed, out of memory) fails only the file it was
+converting, and --timeout fails the files that take too long.
+With --result-cache, inputs whose content did not change (even if touched or
+copied elsewhere) are copied from a VI result cache.
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import signal
+import time
+import traceback
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+# Vectornator Inspection
+import open_vectornator as ov
+
+CURVE_EXTENSION = ".curve"
+
+parser = argparse.ArgumentParser(
+    description='Linearity Curve batch converter')
+
+parser.add_argument('inputs', nargs='+',
+                    help='Linearity Curve files, directories or glob patterns')
+parser.add_argument('-o', '--output-dir', default=None,
+                    help='output directory (default: next to each input)')
+parser.add_argument('-j', '--jobs', type=int, default=None,
+                    help='number of worker processes (default: CPU count)')
+parser.add_argument('--summary', default=None,
+                    help='summary JSON path (default: batch_summary.json in output directory)')
+parser.add_argument('--force', action='store_true',
+                    help='convert again even if the output is up to date')
+parser.add_argument('--timeout', type=float, default=None, metavar='SECONDS',
+                    help='fail a file whose conversion takes longer (default: no limit)')
+parser.add_argument('--pretty', action='store_true',
+                    help='indent the svg output')
+parser.add_argument('--images', choices=[ov.exp.IMAGE_INLINE, ov.exp.IMAGE_EXTERNAL],
+                    default=ov.exp.IMAGE_INLINE,
+                    help='embed bitmaps, or write them to an images directory next to each svg')
+parser.add_argument('--styles', choices=[ov.exp.STYLE_INLINE, ov.exp.STYLE_CSS],
+                    default=ov.exp.STYLE_INLINE,
+                    help='style attributes, or CSS classes in a <style> element (smaller, defaults omitted)')
+parser.add_argument('--skip-hidden', action='store_true',
+                    help='omit hidden elements and invisible layers (instead of display:none)')
+parser.add_argument('--json-backend', choices=ov.tj.BACKENDS, default="auto",
+                    help='JSON parser (default: orjson if installed)')
+parser.add_argument('--incremental-json', action='store_true',
+                    help='parse artboard tables one by one, keeping path geometries as JSON text until used')
+parser.add_argument('--streaming', action='store_true',
+                    help='export elements while they are decoded (gradients are defined at the end)')
+parser.add_argument('--precision', type=ov.precision_type, default=ov.exp.pe.DEFAULT_PRECISION,
+                    help='decimals in path data, or "full" (default: %(default)s)')
+parser.add_argument('--result-cache', default=None, metavar='DIR',
+                    help='reuse the svgs of unchanged inputs from a cache directory (see result_cache.py)')
+parser.add_argument('--result-cache-size', type=float,
+                    default=ov.rc.DEFAULT_MAX_BYTES / 1024 ** 2, metavar='MB',
+                    help='size limit of the result cache (default: %(default)d MB)')
+
+
+def collect_inputs(patterns):
+    """
+    Expands files, directories (recursively) and glob patterns into (input, root) pairs.
+
+    `root` is the directory the relative output path is computed from.
+    """
+    inputs = []
+    seen = set()
+
+    def add(path, root):
+        path = os.path.abspath(path)
+        if path not in seen:
+            seen.add(path)
+            inputs.append((path, root))
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            root = os.path.abspath(pattern)
+            for directory, _, files in os.walk(root):
+                for name in sorted(files):
+                    if name.endswith(CURVE_EXTENSION):
+                        add(os.path.join(directory, name), root)
+        elif os.path.isfile(pattern):
+            add(pattern, os.path.dirname(os.path.abspath(pattern)))
+        else:
+            root = glob_root(pattern)
+            for path in sorted(glob.glob(pattern, recursive=True)):
+                if os.path.isfile(path):
+                    add(path, root)
+
+    return inputs
+
+
+def glob_root(pattern):
+    """
+    Returns the directory of a glob pattern before its first wildcard ("a/*/x.curve" -> "a"),
+    so that the outputs of its matches keep their relative paths.
+    """
+    root = pattern
+    while glob.has_magic(root):
+        root = os.path.dirname(root)
+    return os.path.abspath(root or os.curdir)
+
+
+def output_path_for(input_file, root, output_dir=None):
+    """
+    Returns the svg path for an input file.
+
+    With `output_dir`, the directory structure below `root` is kept so that
+    files with the same name in different folders do not collide.
+    """
+    stem = os.path.splitext(os.path.basename(input_file))[0]
+    if output_dir is None:
+        return os.path.join(os.path.dirname(input_file), stem + ".svg")
+
+    relative_dir = os.path.relpath(os.path.dirname(input_file), root)
+    return os.path.normpath(
+        os.path.join(output_dir, relative_dir, stem + ".svg"))
+
+
+def is_up_to_date(input_file, output):
+    """Checks if the output exists and is newer than the input."""
+    try:
+        return os.path.getmtime(output) >= os.path.getmtime(input_file)
+    except OSError:
+        return False
+
+
+def new_result(input_file, output, status="ok"):
+    """Returns a summary entry."""
+    return {
+        "input": input_file,
+        "output": output,
+        "status": status,
+        "duration": 0.0,
+        "error": None,
+        "message": None,
+    }
+
+
+def failed_result(input_file, error, status="failed"):
+    """Returns the summary entry of a file that could not be converted."""
+    result = new_result(input_file, None, status)
+    result["error"] = type(error).__name__
+    result["message"] = str(error)
+    return result
+
+
+def raise_timeout(signum, frame):
+    """SIGALRM handler of convert_one()."""
+    raise TimeoutError("conversion timed out")
+
+
+def convert_one(input_file, output, options, timeout=None):
+    """
+    Converts a single file and returns its summary entry.
+
+    `options` are passed to convert_vectornator() (incremental, streaming, result_cache
+    and VI Exporters.create_svg() options).
+    With `timeout` (seconds), a conversion still running is interrupted and reported
+    with the "timeout" status (on platforms with SIGALRM, not Windows; a conversion
+    blocked inside a C extension is interrupted when it returns to Python).
+
+    Runs inside a worker process. Every exception is caught so that
+    one broken document does not abort the batch.
+    """
+    result = new_result(input_file, output)
+    # written under a temporary name and renamed when complete
+    partial = output + ".part"
+    alarm = timeout is not None and hasattr(signal, "setitimer")
+    if alarm:
+        previous_handler = signal.signal(signal.SIGALRM, raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    start = time.perf_counter()
+    try:
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        if ov.convert_vectornator(input_file, partial, **options) is None:
+            result["status"] = "empty"
+            result["output"] = None
+        else:
+            os.replace(partial, output)
+    except Exception as e:
+        result = failed_result(input_file, e, "timeout" if isinstance(e, TimeoutError) else "failed")
+        logging.debug(traceback.format_exc())
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+        if os.path.exists(partial):
+            os.remove(partial)
+    result["duration"] = time.perf_counter() - start
+
+    return result
+
+
+def convert_all(tasks, jobs, json_backend, options, timeout=None):
+    """
+    Converts (input, output) tasks in worker processes, yields their results as they complete.
+
+    At most `jobs` tasks are submitted at once, so the tasks in flight when a worker
+    process dies (killed, out of memory) are known: the pool is restarted and each of
+    them is converted again alone. A task that breaks the pool alone is failed.
+    """
+    queue = deque(tasks)
+    # tasks in flight when the pool broke, converted again alone
+    crashed = set()
+    running = {}  # future -> task
+    executor = None
+    try:
+        while queue or running:
+            if executor is None:
+                executor = ProcessPoolExecutor(max_workers=jobs, initializer=ov.tj.set_backend,
+                                               initargs=(json_backend,))
+            broken = False
+            try:
+                while queue and len(running) < jobs:
+                    if running and (queue[0] in crashed or crashed.intersection(running.values())):
+                        break
+                    future = executor.submit(convert_one, *queue[0], options, timeout)
+                    running[future] = queue.popleft()
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            except BrokenProcessPool:
+                # broken since the last wait()
+                broken = True
+                finished = wait(running)[0]
+            while finished:
+                for future in finished:
+                    task = running.pop(future)
+                    try:
+                        yield future.result()
+                    except BrokenProcessPool as error:
+                        broken = True
+                        if task in crashed:
+                            yield failed_result(task[0], error)
+                        else:
+                            crashed.add(task)
+                            queue.appendleft(task)
+                    except Exception as error:
+                        yield failed_result(task[0], error)
+                # every future of a broken pool fails
+                finished = wait(running)[0] if broken else ()
+            if broken:
+                executor.shutdown()
+                executor = None
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def run_batch(patterns, output_dir=None, jobs=None, summary=None, force=False,
+              json_backend="auto", timeout=None, **options):
+    """
+    Converts every input matched by `patterns` and writes a JSON summary.
+
+    `json_backend` is set in every worker (VI JSON tools).
+    `timeout` (seconds) fails the conversions that take longer (see convert_one()).
+    `options` are passed to convert_vectornator() (incremental, streaming, result_cache,
+    pretty, image_mode, precision, skip_hidden, style_mode).
+
+    Returns the summary dict.
+    """
+    inputs = collect_inputs(patterns)
+    if output_dir is not None:
+        output_dir = os.path.abspath(output_dir)
+    if summary is None:
+        summary = os.path.join(output_dir or os.getcwd(), "batch_summary.json")
+
+    results = []
+    tasks = []
+    claimed = {}  # output -> input writing it
+    for input_file, root in inputs:
+        output = output_path_for(input_file, root, output_dir)
+        other = claimed.setdefault(os.path.normcase(output), input_file)
+        if other != input_file:
+            results.append(failed_result(
+                input_file, FileExistsError(f"{output} is also the output of {other}")))
+        elif not force and is_up_to_date(input_file, output):
+            results.append(new_result(input_file, output, "skipped"))
+        else:
+            tasks.append((input_file, output))
+
+    start = time.perf_counter()
+    for result in convert_all(tasks, jobs or os.cpu_count(), json_backend, options, timeout):
+        results.append(result)
+        print(f"[{result['status']}] {result['input']} "
+              f"({result['duration']:.2f}s)")
+
+    results.sort(key=lambda result: result["input"])
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+
+    summary_data = {
+        "total": len(results),
+        "counts": counts,
+        "duration": time.perf_counter() - start,
+        "files": results,
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(summary)), exist_ok=True)
+    with open(summary, "w", encoding="utf-8") as summary_file:
+        json.dump(summary_data, summary_file, indent=4)
+
+    return summary_data
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    result_cache = None
+    if args.result_cache:
+        result_cache = ov.rc.ResultCache(args.result_cache,
+                                         int(args.result_cache_size * 1024 ** 2))
+    summary_data = run_batch(args.inputs, args.output_dir, args.jobs,
+                             args.summary, args.force, args.json_backend, args.timeout,
+                             incremental=args.incremental_json, streaming=args.streaming,
+                             result_cache=result_cache,
+                             pretty=args.pretty,
+                             image_mode=args.images, precision=args.precision,
+                             skip_hidden=args.skip_hidden, style_mode=args.styles)
+    print(f"Converted {summary_data['total']} files: {summary_data['counts']}")
@@ -0,0 +1,5 @@
+"""
+VI benchmarks
+
+run from the repository root, e.g. `python -m benchmarks.bench_traversal`.
+"""
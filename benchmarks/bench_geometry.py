@@ -0,0 +1,122 @@
+"""
+Geometry storage benchmark: pathGeometry dicts (JSON) vs. model.PathGeometry.
+
+usage: python -m benchmarks.bench_geometry [--geometries 5000] [--nodes 64] [--shared 4]
+
+Reports the memory retained by the geometries (tracemalloc), the conversion time,
+the transform + path data time of both representations, and the access time of an
+incremental (LazyArray) table whose geometries are each used by `--shared` elements.
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import model as m
+import path_encoder as pe
+import tools_json as tj
+import tools_path as tp
+from benchmarks import synthetic
+
+parser = argparse.ArgumentParser(description='Geometry storage benchmark')
+parser.add_argument('--geometries', type=int, default=5000)
+parser.add_argument('--nodes', type=int, default=64)
+parser.add_argument('--shared', type=int, default=4,
+                    help='elements using each geometry for the LazyArray access (default: %(default)s)')
+parser.add_argument('--repeat', type=int, default=3)
+
+TRANSFORM = {"rotation": 0.5, "scale": [2, 3], "shear": 0.1, "translation": [10, 20]}
+
+
+def retained(function, *args):
+    """Returns (result, bytes allocated by `function` and still alive)."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = function(*args)
+        return result, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def transform_dict(data, transform):
+    """Previous apply_transform() on pathGeometry dicts, kept as the baseline."""
+    a, b, c, d, e, f = tp.transform_to_matrix(transform)
+    transformed_nodes = []
+    for node in data["nodes"]:
+        x0, y0 = node["anchorPoint"]
+        x1, y1 = node["inPoint"]
+        x2, y2 = node["outPoint"]
+        transformed_nodes.append({
+            "nodeType": node["nodeType"],
+            "cornerRadius": node["cornerRadius"],
+            "anchorPoint": [a * x0 + c * y0 + e, b * x0 + d * y0 + f],
+            "inPoint": [a * x1 + c * y1 + e, b * x1 + d * y1 + f],
+            "outPoint": [a * x2 + c * y2 + e, b * x2 + d * y2 + f],
+        })
+    return {"closed": data["closed"], "nodes": transformed_nodes}
+
+
+def export_all(geometries, transform):
+    """Transforms and encodes every geometry (one d= each)."""
+    for geometry in geometries:
+        pe.encode_path_geometries([transform(geometry, TRANSFORM)])
+
+
+def access_all(lazy_table, shared, cache):
+    """Accesses each geometry `shared` times through a GeometryTable, like the decoded elements."""
+    table = m.GeometryTable(lazy_table, keep=False, cache=cache() if cache else None)
+    for _ in range(shared):
+        for index in range(len(table)):
+            table[index]
+
+
+def best_of(repeat, function, *args):
+    """Returns the fastest wall time of `repeat` runs."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    text = json.dumps(synthetic.generate_gid_json(
+        elements=args.geometries, nodes_per_path=args.nodes)["pathGeometries"])
+    nodes = args.geometries * args.nodes
+
+    dicts, dict_bytes = retained(json.loads, text)
+    compact, compact_bytes = retained(lambda: [m.path_geometry(data) for data in dicts])
+    print(f"geometries: {len(dicts)}, nodes: {nodes}")
+    print(f"{'JSON dicts':24} {dict_bytes / 1024 ** 2:9.1f} MiB {dict_bytes / nodes:7.0f} B/node")
+    print(f"{'PathGeometry':24} {compact_bytes / 1024 ** 2:9.1f} MiB "
+          f"{compact_bytes / nodes:7.0f} B/node ({dict_bytes / compact_bytes:.1f}x smaller)")
+
+    elapsed = best_of(args.repeat, lambda: [m.path_geometry(data) for data in dicts])
+    print(f"{'conversion':24} {nodes / elapsed:12,.0f} nodes/s")
+
+    # the encoder takes PathGeometry, dicts are converted after the transform
+    runs = [
+        ("dict transform", dicts, lambda data, transform: m.path_geometry(
+            transform_dict(data, transform))),
+        ("PathGeometry transform", compact, tp.apply_transform),
+    ]
+    for label, geometries, transform in runs:
+        elapsed = best_of(args.repeat, export_all, geometries, transform)
+        print(f"{label:24} {nodes / elapsed:12,.0f} nodes/s (transform + d=)")
+    if tp.numpy() is not None:
+        numpy_min_coordinates = tp.NUMPY_MIN_COORDINATES
+        tp.NUMPY_MIN_COORDINATES = float("inf")
+        elapsed = best_of(args.repeat, export_all, compact, tp.apply_transform)
+        tp.NUMPY_MIN_COORDINATES = numpy_min_coordinates
+        print(f"{'  without NumPy':24} {nodes / elapsed:12,.0f} nodes/s (transform + d=)")
+
+    lazy_table = tj.loads_gid_json(f'{{"pathGeometries": {text}}}'.encode("utf-8"))["pathGeometries"]
+    for label, cache in (("LazyArray access", None), ("  with DecodeCache", m.DecodeCache)):
+        elapsed = best_of(args.repeat, access_all, lazy_table, args.shared, cache)
+        print(f"{label:24} {nodes * args.shared / elapsed:12,.0f} nodes/s "
+              f"(each geometry used {args.shared} times)")
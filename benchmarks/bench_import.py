@@ -0,0 +1,90 @@
+"""
+Import time benchmark: `python -X importtime` of the VI entry points, with a budget.
+
+usage: python -m benchmarks.bench_import [--modules open_vectornator batch] [--repeat 7]
+
+Each module is imported in a fresh interpreter `--repeat` times, the fastest run is
+kept. Reports the cumulative import time of each module and its slowest imports,
+and checks that the modules loaded on first use (LAZY_MODULES) are not imported.
+
+Exits with status 1 if a module exceeds its budget (IMPORT_BUDGETS_MS, or --budget),
+or imports a lazy module: run it after adding an import at module level.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# cumulative import time budgets (ms), about 1.5-2x the measured time, so that a
+# heavy dependency imported at module level (NumPy: ~80 ms) goes over
+IMPORT_BUDGETS_MS = {
+    "open_vectornator": 100,
+    # + multiprocessing (process pool)
+    "batch": 150,
+    "watch": 150,
+}
+
+# optional or rarely used modules that VI modules import on first use
+LAZY_MODULES = ("numpy", "orjson", "packaging", "PIL", "plistlib", "datetime",
+                "cProfile", "tracemalloc")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+parser = argparse.ArgumentParser(description='Import time benchmark')
+parser.add_argument('--modules', nargs='+', default=list(IMPORT_BUDGETS_MS))
+parser.add_argument('--repeat', type=int, default=7)
+parser.add_argument('--budget', type=float, default=None,
+                    help='budget (ms) for every module, instead of IMPORT_BUDGETS_MS')
+parser.add_argument('--top', type=int, default=8,
+                    help='number of slowest imports shown per module')
+
+
+def import_times(module):
+    """
+    Imports `module` in a fresh interpreter with -X importtime.
+
+    Returns {imported module: (self us, cumulative us)}.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def fastest(module, repeat):
+    """Returns the import_times() of the run with the smallest total."""
+    runs = [import_times(module) for _ in range(repeat)]
+    return min(runs, key=lambda times: times[module][1])
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    failures = []
+    for module in args.modules:
+        times = fastest(module, args.repeat)
+        total_ms = times[module][1] / 1000
+        budget = args.budget if args.budget is not None else IMPORT_BUDGETS_MS.get(module)
+        status = "" if budget is None else f" (budget {budget:.0f} ms)"
+        print(f"{module}: {total_ms:.1f} ms{status}")
+
+        slowest = sorted(((cumulative, name) for name, (_, cumulative) in times.items()
+                          if name != module), reverse=True)
+        for cumulative, name in slowest[:args.top]:
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+        if budget is not None and total_ms > budget:
+            failures.append(f"{module} takes {total_ms:.1f} ms to import (budget {budget:.0f} ms)")
+        eager = [name for name in LAZY_MODULES if name in times]
+        if eager:
+            failures.append(f"{module} imports {', '.join(eager)} at load time")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
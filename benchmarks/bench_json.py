@@ -0,0 +1,70 @@
+"""
+GUID JSON parsing benchmark: json / orjson backends and incremental parsing.
+
+usage: python -m benchmarks.bench_json [--elements 20000] [--nodes 16]
+
+Reports parse time and the peak memory allocated while parsing (tracemalloc).
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import tools_json as tj
+from benchmarks import synthetic
+
+parser = argparse.ArgumentParser(description='GUID JSON parsing benchmark')
+parser.add_argument('--elements', type=int, default=20000)
+parser.add_argument('--nodes', type=int, default=16)
+parser.add_argument('--repeat', type=int, default=3)
+
+
+def parse_eager(backend, data):
+    """Parses the whole GUID JSON (bytes) like read_json_from_zip()."""
+    tj.set_backend(backend)
+    return tj.loads(data)
+
+
+def parse_incremental(backend, data):
+    """Parses the GUID JSON (bytes) table by table, pathGeometries stay JSON text."""
+    tj.set_backend(backend)
+    return tj.loads_gid_json(data)
+
+
+def measure(repeat, function, *args):
+    """Returns (best time, peak bytes) of `function`."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    try:
+        result = function(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del result
+    return best, peak
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    data = json.dumps(synthetic.generate_gid_json(
+        elements=args.elements, nodes_per_path=args.nodes)).encode("utf-8")
+    print(f"GUID JSON: {len(data) / 1024 ** 2:.1f} MiB")
+
+    backends = ["json"] + (["orjson"] if tj.ORJSON_INSTALLED else [])
+    runs = [(f"{backend}", parse_eager, backend) for backend in backends]
+    runs += [(f"incremental ({backend})", parse_incremental, backend) for backend in backends]
+    for label, function, backend in runs:
+        elapsed, peak = measure(args.repeat, function, backend, data)
+        print(f"{label:22} {elapsed * 1000:9.1f} ms {peak / 1024 ** 2:9.1f} MiB peak")
+
+    # accessing every geometry of a LazyArray
+    tj.set_backend(backends[-1])
+    geometries = parse_incremental(backends[-1], data)["pathGeometries"]
+    elapsed, _ = measure(1, lambda: [geometry for geometry in geometries])
+    print(f"{'lazy access, all':22} {elapsed * 1000:9.1f} ms")
@@ -0,0 +1,53 @@
+"""
+Nesting stress benchmark: decode and export of deeply nested groups.
+
+usage: python -m benchmarks.bench_nesting [--depths 100 1000 10000 50000] [--leaves 4]
+
+Each leaf (path) is wrapped in `depth` nested groups, far beyond the recursion
+limit. Reports read_gid_json and create_svg times per nesting level, which should
+stay flat as the depth grows (the slow growth of read_gid_json comes from garbage
+collections over the decoded dicts, it disappears with gc.disable()).
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import decoders as d
+import exporters as exp
+import model as m
+from benchmarks import synthetic
+
+parser = argparse.ArgumentParser(description='Nesting stress benchmark')
+parser.add_argument('--depths', type=int, nargs='+', default=[100, 1000, 10000, 50000])
+parser.add_argument('--leaves', type=int, default=4)
+parser.add_argument('--nodes', type=int, default=4)
+
+
+def measure(gid_json, output):
+    """Returns (read_gid_json seconds, create_svg seconds)."""
+    cache = m.DecodeCache()
+    start = time.perf_counter()
+    # no images, the archive is not used
+    layers = d.read_gid_json(None, gid_json, cache)
+    decoded = time.perf_counter()
+    exp.create_svg(gid_json["artboards"][0], layers, output, cache=cache)
+    return decoded - start, time.perf_counter() - decoded
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    print(f"recursion limit: {sys.getrecursionlimit()}, leaves: {args.leaves}")
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, "nesting.svg")
+        for depth in args.depths:
+            gid_json = synthetic.generate_gid_json(
+                elements=args.leaves, nodes_per_path=args.nodes, group_depth=depth)
+            levels = depth * args.leaves
+            decode, export = measure(gid_json, output)
+            print(f"depth {depth:7}: read_gid_json {decode * 1000:9.1f} ms "
+                  f"({decode / levels * 1e6:5.2f} us/group), create_svg {export * 1000:9.1f} ms "
+                  f"({export / levels * 1e6:5.2f} us/group), "
+                  f"svg {os.path.getsize(output) / 1024 ** 2:.1f} MiB")
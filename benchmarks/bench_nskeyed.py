@@ -0,0 +1,132 @@
+"""
+NSKeyedArchiver benchmark: decoding Vectornator attributedText archives.
+
+usage: python -m benchmarks.bench_nskeyed [--runs 100 1000 10000] [--baseline-max 1000]
+
+Generates attributed string archives (binary plist) with one attribute dictionary
+per style run, sharing a few fonts, colors and paragraph styles like real texts.
+Reports the time per run of the previous decoder (deep copies and rescans, kept as
+the baseline, with removeClassName=False: it fails on specialized classes otherwise)
+and of VI text tools.unserializeNSKeyedArchiver(), which should stay flat.
+"""
+
+import argparse
+import copy
+import plistlib
+import random
+import time
+from plistlib import UID
+
+import tools_text as tt
+
+parser = argparse.ArgumentParser(description='NSKeyedArchiver benchmark')
+parser.add_argument('--runs', type=int, nargs='+', default=[100, 1000, 10000])
+parser.add_argument('--fonts', type=int, default=8)
+parser.add_argument('--colors', type=int, default=16)
+parser.add_argument('--baseline-max', type=int, default=1000,
+                    help='largest number of runs decoded with the baseline (default: %(default)s)')
+
+
+def generate_archive(runs, fonts=8, colors=16, seed=0):
+    """Returns the bytes of an NSKeyedArchiver (binary plist) attributed string."""
+    rnd = random.Random(seed)
+    objects = ["$null"]
+
+    def add(value):
+        objects.append(value)
+        return UID(len(objects) - 1)
+
+    def add_class(name, *superclasses):
+        return add({"$classname": name, "$classes": [name, *superclasses, "NSObject"]})
+
+    dictionary_class = add_class("NSDictionary")
+    array_class = add_class("NSArray")
+    string_class = add_class("NSMutableString", "NSString")
+    font_class = add_class("NSFont")
+    color_class = add_class("NSColor")
+    paragraph_class = add_class("NSParagraphStyle")
+    keys = [add(key) for key in ("NSFont", "NSColor", "NSParagraphStyle")]
+
+    font_ids = [add({"$class": font_class, "NSName": add(f"Font-{index}"),
+                     "NSSize": float(rnd.choice([10, 12, 14, 18, 24])), "NSfFlags": 16})
+                for index in range(fonts)]
+    color_ids = [add({"$class": color_class, "NSColorSpace": 1,
+                      "NSRGB": f"{rnd.random():.3f} {rnd.random():.3f} {rnd.random():.3f}".encode()})
+                 for _ in range(colors)]
+    tabs = add({"$class": array_class, "NS.objects": []})
+    paragraph_ids = [add({"$class": paragraph_class, "NSAlignment": alignment, "NSTabStops": tabs})
+                     for alignment in range(3)]
+
+    attributes = [add({"$class": dictionary_class, "NS.keys": keys,
+                       "NS.objects": [rnd.choice(font_ids), rnd.choice(color_ids),
+                                      rnd.choice(paragraph_ids)]})
+                  for _ in range(runs)]
+    text = " ".join(f"word{index}" for index in range(runs))
+    root = add({
+        "$class": add_class("NSMutableAttributedString", "NSAttributedString"),
+        "NSString": add({"$class": string_class, "NS.string": text}),
+        "NSAttributes": add({"$class": array_class, "NS.objects": attributes}),
+        "NSAttributeInfo": add(bytes(2 * runs)),
+    })
+    return plistlib.dumps({"$version": 100000, "$archiver": "NSKeyedArchiver",
+                           "$top": {"root": root}, "$objects": objects},
+                          fmt=plistlib.FMT_BINARY)
+
+
+def previous_unserialize(o, serialized, start=True):
+    """Previous _unserialize() with removeClassName=False, kept as the baseline."""
+    reassembled = copy.deepcopy(o) if start else o
+    finished = False
+    while not finished:
+        finished = True
+        if isinstance(reassembled, dict):
+            cursor = reassembled.keys()
+        elif isinstance(reassembled, list):
+            cursor = range(len(reassembled))
+        else:
+            return reassembled
+        for k in cursor:
+            if isinstance(reassembled[k], UID):
+                reassembled[k] = copy.deepcopy(serialized[reassembled[k].data])
+                if str(reassembled[k]) == "$null":
+                    reassembled[k] = None
+                finished = False
+            elif isinstance(reassembled[k], (dict, list)):
+                reassembled[k] = previous_unserialize(reassembled[k], serialized, start=False)
+                if "$class" in reassembled[k] and "$classes" in reassembled[k]["$class"]:
+                    classes = reassembled[k]["$class"]["$classes"]
+                    if "NSArray" in classes:
+                        reassembled[k] = reassembled[k]["NS.objects"]
+                    elif "NSDictionary" in classes:
+                        reassembled[k] = dict(zip(reassembled[k]["NS.keys"],
+                                                  reassembled[k]["NS.objects"]))
+                    elif "NSString" in classes:
+                        reassembled[k] = reassembled[k]["NS.string"]
+                finished = True
+    return reassembled
+
+
+def previous_decoder(data):
+    plist = plistlib.loads(data)
+    return previous_unserialize(plist["$top"], plist["$objects"])
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    for runs in args.runs:
+        data = generate_archive(runs, args.fonts, args.colors)
+        elapsed, text = timed(tt.unserializeNSKeyedArchiver, data)
+        assert len(text["NSAttributes"]) == runs
+        assert text["NSAttributes"][0]["NSFont"]["NSName"].startswith("Font-")
+        line = (f"{runs:6} runs ({len(data) / 1024:8.1f} KiB): "
+                f"unserializeNSKeyedArchiver {elapsed / runs * 1e6:7.2f} us/run")
+        if runs <= args.baseline_max:
+            baseline, _ = timed(previous_decoder, data)
+            line += f", previous {baseline / runs * 1e6:9.2f} us/run"
+        print(line)
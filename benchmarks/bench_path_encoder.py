@@ -0,0 +1,96 @@
+"""
+Path data benchmark: previous encoder (full repr, always C) vs. VI path encoder.
+
+usage: python -m benchmarks.bench_path_encoder [--geometries 20000] [--nodes 8] [--precision 3]
+
+Reports the encoding rate and the output size of each encoder, both relative to
+the previous encoder (a speed below 1.00x is a regression).
+"""
+
+import argparse
+import time
+
+import model as m
+import path_encoder as pe
+from benchmarks import synthetic
+
+parser = argparse.ArgumentParser(description='Path data benchmark')
+parser.add_argument('--geometries', type=int, default=20000)
+parser.add_argument('--nodes', type=int, default=8)
+parser.add_argument('--precision', type=int, default=pe.DEFAULT_PRECISION)
+parser.add_argument('--repeat', type=int, default=5)
+
+
+def legacy_path_geometry_to_svg_path(datas):
+    """Previous path_geometry_to_svg_path(), kept as the baseline."""
+    return " ".join(legacy_single_path_geometry_to_svg_path(data) for data in datas)
+
+
+def legacy_single_path_geometry_to_svg_path(data):
+    """Previous single_path_geometry_to_svg_path()."""
+    nodes = data["nodes"]
+    closed = data.get("closed", False)
+    svg_path = ""
+
+    first_node = nodes[0]
+    svg_path += f"M {first_node['anchorPoint'][0]} {first_node['anchorPoint'][1]} "
+
+    for i, node in enumerate(nodes[1:], start=1):
+        anchor = node["anchorPoint"]
+        in_point = node.get("inPoint", anchor)
+        out_point = nodes[i - 1].get("outPoint", nodes[i - 1]["anchorPoint"])
+        svg_path += f"C {out_point[0]} {out_point[1]} {in_point[0]} {in_point[1]} {anchor[0]} {anchor[1]} "
+
+    if closed:
+        last_node = nodes[-1]
+        out_point = last_node.get("outPoint", last_node["anchorPoint"])
+        in_point = first_node.get("inPoint", first_node["anchorPoint"])
+        svg_path += f"C {out_point[0]} {out_point[1]} {in_point[0]} {in_point[1]} {first_node['anchorPoint'][0]} {first_node['anchorPoint'][1]} "
+        svg_path += "Z"
+
+    return svg_path
+
+
+def encode_all(encode, geometries, *args):
+    """Encodes every geometry (one d= each) and returns the total size in bytes."""
+    return sum(len(encode([geometry], *args)) for geometry in geometries)
+
+
+def best_of(repeat, runs):
+    """
+    Returns the fastest wall time and the result of each run (encode, data, args).
+
+    Runs are interleaved, so a slower period of the machine affects all of them alike.
+    """
+    best = [None] * len(runs)
+    results = [None] * len(runs)
+    for _ in range(repeat):
+        for index, (encode, data, encode_args) in enumerate(runs):
+            start = time.perf_counter()
+            results[index] = encode_all(encode, data, *encode_args)
+            elapsed = time.perf_counter() - start
+            if best[index] is None or elapsed < best[index]:
+                best[index] = elapsed
+    return best, results
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    geometries = synthetic.generate_gid_json(
+        elements=args.geometries, nodes_per_path=args.nodes)["pathGeometries"]
+    nodes = sum(len(geometry["nodes"]) for geometry in geometries)
+    print(f"geometries: {len(geometries)}, nodes: {nodes}")
+    # the VI path encoder takes model.PathGeometry (converted once by VI model)
+    compact = [m.path_geometry(geometry) for geometry in geometries]
+
+    runs = [
+        ("previous encoder", legacy_path_geometry_to_svg_path, geometries, ()),
+        ("full precision", pe.encode_path_geometries, compact, (None,)),
+        (f"precision {args.precision} (default)", pe.encode_path_geometries, compact, (args.precision,)),
+        (f"precision {args.precision}, absolute", pe.encode_path_geometries, compact,
+         (args.precision, False)),
+    ]
+    times, sizes = best_of(args.repeat, [run[1:] for run in runs])
+    for (label, *_), elapsed, size in zip(runs, times, sizes):
+        print(f"{label:28} {nodes / elapsed:12,.0f} nodes/s ({times[0] / elapsed:5.2f}x) "
+              f"{size / 1024:10.1f} KiB ({1 - size / sizes[0]:6.1%} smaller)")
@@ -0,0 +1,225 @@
+"""
+End-to-end benchmark: synthetic .curve archives through every pipeline stage.
+
+usage: python -m benchmarks.bench_pipeline [--scenario all] [--output results.json] [--compare previous.json]
+
+Each scenario writes a .curve archive (see benchmarks.synthetic), then times
+extract_manifest, extract_document, extract_gid_json, read_gid_json, create_svg and
+the XML serialization of the result (best of --repeat runs), and measures the peak
+memory allocated by each stage in a separate tracemalloc run.
+Results are stored as JSON, --compare prints the ratios to a previous result file
+and exits with status 1 if a stage got slower than --threshold.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+import zipfile
+
+import decoders as d
+import exporters as exp
+import extractors as ext
+import model as m
+import writers as w
+from benchmarks import synthetic
+
+# name -> synthetic.generate_gid_json() arguments (+ image_size)
+SCENARIOS = {
+    "paths": {"elements": 5000, "nodes_per_path": 8},
+    "groups": {"elements": 2000, "nodes_per_path": 4, "group_depth": 16},
+    "compound": {"elements": 2000, "nodes_per_path": 8, "compound_fanout": 8},
+    "gradients": {"elements": 2000, "nodes_per_path": 4, "gradients": 500},
+    "text": {"elements": 0, "texts": 1000, "text_runs": 8},
+    "images": {"elements": 100, "images": 200, "bitmaps": 20, "image_size": 256},
+}
+
+STAGES = ["extract_manifest", "extract_document", "extract_gid_json",
+          "read_gid_json", "create_svg", "serialization"]
+
+parser = argparse.ArgumentParser(description='End-to-end pipeline benchmark')
+parser.add_argument('--scenario', choices=["all"] + list(SCENARIOS), default="all")
+parser.add_argument('--repeat', type=int, default=3)
+parser.add_argument('--output', default=None, help='write results to this JSON file')
+parser.add_argument('--compare', default=None, help='previous results JSON file')
+parser.add_argument('--threshold', type=float, default=1.25,
+                    help='slowdown ratio reported as a regression (default: %(default)s)')
+# overrides of the scenario parameters
+parser.add_argument('--elements', type=int)
+parser.add_argument('--nodes', dest='nodes_per_path', type=int)
+parser.add_argument('--depth', dest='group_depth', type=int)
+parser.add_argument('--compound', dest='compound_fanout', type=int)
+parser.add_argument('--gradients', type=int)
+parser.add_argument('--texts', type=int)
+parser.add_argument('--text-runs', type=int)
+parser.add_argument('--images', type=int)
+parser.add_argument('--image-size', type=int)
+
+OVERRIDES = ["elements", "nodes_per_path", "group_depth", "compound_fanout",
+             "gradients", "texts", "text_runs", "images", "image_size"]
+
+
+def run_pipeline(curve_file, output, on_stage):
+    """
+    Runs every stage once. `on_stage(stage, function, *args)` calls and measures a stage.
+
+    Returns the svg output size in bytes.
+    """
+    with zipfile.ZipFile(curve_file) as archive:
+        manifest = on_stage("extract_manifest", ext.extract_manifest, archive)
+        document = on_stage("extract_document", ext.extract_document, archive, manifest)
+        artboard_paths = ext.extract_drawing_data(document).get("artboardPaths", [])
+        gid_json = on_stage("extract_gid_json", ext.extract_gid_json,
+                            archive, artboard_paths[0])
+        cache = m.DecodeCache()
+        layers = on_stage("read_gid_json", d.read_gid_json, archive, gid_json, cache)
+        on_stage("create_svg", exp.create_svg, gid_json["artboards"][0], layers,
+                 output, cache=cache)
+
+    # serialization alone: the same svg tree written again
+    tree = ET.parse(output)
+    on_stage("serialization", serialize, tree.getroot())
+    return os.path.getsize(output)
+
+
+def serialize(root):
+    """Writes an svg tree to memory with the writer used by VI Exporters."""
+    stream = io.StringIO()
+    writer = w.SvgWriter(stream)
+    writer.declaration()
+    writer.element(root)
+    writer.close()
+    return stream
+
+
+def measure_scenario(name, params, repeat, directory):
+    """Generates the scenario archive and returns its result entry."""
+    image_size = params.get("image_size", 64)
+    gid_params = {key: value for key, value in params.items() if key != "image_size"}
+    curve_file = os.path.join(directory, f"{name}.curve")
+    output = os.path.join(directory, f"{name}.svg")
+    synthetic.write_curve(curve_file, synthetic.generate_gid_json(**gid_params),
+                          image_size=image_size)
+
+    seconds = {stage: [] for stage in STAGES}
+
+    def timed(stage, function, *args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        seconds[stage].append(time.perf_counter() - start)
+        return result
+
+    peak_bytes = {}
+
+    def traced(stage, function, *args, **kwargs):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        result = function(*args, **kwargs)
+        peak_bytes[stage] = tracemalloc.get_traced_memory()[1] - before
+        return result
+
+    # console output of the pipeline (if any) is not part of the measurement
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            output_bytes = run_pipeline(curve_file, output, timed)
+        tracemalloc.start()
+        try:
+            run_pipeline(curve_file, output, traced)
+        finally:
+            tracemalloc.stop()
+
+    stages = {stage: {"seconds": min(seconds[stage]), "peak_bytes": peak_bytes[stage]}
+              for stage in STAGES}
+    return {
+        "params": params,
+        "archive_bytes": os.path.getsize(curve_file),
+        "output_bytes": output_bytes,
+        "total_seconds": sum(stage["seconds"] for stage in stages.values()),
+        "peak_bytes": max(stage["peak_bytes"] for stage in stages.values()),
+        "stages": stages,
+    }
+
+
+def git_revision():
+    """Returns the current git commit of the repository, or None."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(previous, current, threshold):
+    """Prints stage time ratios (current / previous) and returns the regressions."""
+    regressions = []
+    for name, scenario in current["scenarios"].items():
+        previous_scenario = previous.get("scenarios", {}).get(name)
+        if previous_scenario is None:
+            continue
+        print(f"\n{name} (vs {previous.get('revision') or 'previous run'})")
+        for stage, result in scenario["stages"].items():
+            previous_stage = previous_scenario["stages"].get(stage)
+            if not previous_stage or not previous_stage["seconds"]:
+                continue
+            ratio = result["seconds"] / previous_stage["seconds"]
+            flag = ""
+            if ratio > threshold:
+                flag = "  REGRESSION"
+                regressions.append((name, stage, ratio))
+            print(f"  {stage:18} {previous_stage['seconds'] * 1000:10.1f} ms -> "
+                  f"{result['seconds'] * 1000:10.1f} ms ({ratio:5.2f}x){flag}")
+    return regressions
+
+
+def print_scenario(name, scenario):
+    """Prints the result of a scenario."""
+    print(f"\n{name}: archive {scenario['archive_bytes'] / 1024:.0f} KiB, "
+          f"svg {scenario['output_bytes'] / 1024:.0f} KiB")
+    for stage, result in scenario["stages"].items():
+        print(f"  {stage:18} {result['seconds'] * 1000:10.1f} ms "
+              f"{result['peak_bytes'] / 1024 ** 2:10.1f} MiB peak")
+    print(f"  {'total':18} {scenario['total_seconds'] * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+
+    results = {
+        "revision": git_revision(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scenarios": {},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for name in names:
+            params = dict(SCENARIOS[name])
+            for key in OVERRIDES:
+                if getattr(args, key) is not None:
+                    params[key] = getattr(args, key)
+            results["scenarios"][name] = measure_scenario(
+                name, params, args.repeat, directory)
+            print_scenario(name, results["scenarios"][name])
+    # kilobytes on Linux
+    results["max_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=4)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as previous_file:
+            regressions = compare_results(json.load(previous_file), results, args.threshold)
+        if regressions:
+            sys.exit(1)
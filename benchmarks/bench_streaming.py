@@ -0,0 +1,78 @@
+"""
+Streaming benchmark: read_gid_json() + write_svg() vs. iter_gid_json() events.
+
+usage: python -m benchmarks.bench_streaming [--elements 1000 10000 30000] [--nodes 8]
+
+For each document size, reports the decode + export time, the time until the first
+element is written, and the peak memory allocated while decoding and exporting
+(tracemalloc, the parsed GUID JSON is not included).
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import decoders as d
+import exporters as exp
+import model as m
+from benchmarks import synthetic
+
+parser = argparse.ArgumentParser(description='Streaming benchmark')
+parser.add_argument('--elements', type=int, nargs='+', default=[1000, 10000, 30000])
+parser.add_argument('--nodes', type=int, default=8)
+parser.add_argument('--depth', type=int, default=2)
+
+
+class FirstElementStream:
+    """Text stream that discards the output and records when the first element is written."""
+
+    def __init__(self):
+        self.first_element = None
+
+    def write(self, text):
+        if self.first_element is None and text.startswith("<path"):
+            self.first_element = time.perf_counter()
+        return len(text)
+
+
+def tree(gid_json, cache):
+    return d.read_gid_json(None, gid_json, cache)
+
+
+def streaming(gid_json, cache):
+    return d.iter_gid_json(None, gid_json, cache)
+
+
+def measure(decode, gid_json):
+    """Returns (total seconds, seconds until the first element, peak bytes)."""
+    results = []
+    for trace in (False, True):
+        if trace:
+            tracemalloc.start()
+        try:
+            cache = m.DecodeCache()
+            stream = FirstElementStream()
+            start = time.perf_counter()
+            exp.write_svg(gid_json["artboards"][0], decode(gid_json, cache), stream,
+                          context=exp.ExportContext(cache=cache))
+            elapsed = time.perf_counter() - start
+            if trace:
+                results.append(tracemalloc.get_traced_memory()[1])
+            else:
+                results += [elapsed, stream.first_element - start]
+        finally:
+            if trace:
+                tracemalloc.stop()
+    return results
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    for elements in args.elements:
+        gid_json = synthetic.generate_gid_json(
+            elements=elements, nodes_per_path=args.nodes, group_depth=args.depth)
+        print(f"{elements} elements")
+        for label, decode in (("read_gid_json", tree), ("iter_gid_json", streaming)):
+            elapsed, first, peak = measure(decode, gid_json)
+            print(f"  {label:14} {elapsed * 1000:9.1f} ms, first element after "
+                  f"{first * 1000:8.2f} ms, {peak / 1024 ** 2:8.1f} MiB peak")
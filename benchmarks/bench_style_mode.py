@@ -0,0 +1,72 @@
+"""
+Style mode benchmark: inline style attributes vs. CSS classes (style_mode="css").
+
+usage: python -m benchmarks.bench_style_mode [--elements 1000 10000] [--fills 16] [--strokes 8]
+
+For each document size, exports the svg in both style modes and reports its size,
+the export time and the time to parse it back (ElementTree), with the savings of
+the css mode.
+"""
+
+import argparse
+import io
+import time
+import xml.etree.ElementTree as ET
+
+import decoders as d
+import exporters as exp
+import model as m
+from benchmarks import synthetic
+
+parser = argparse.ArgumentParser(description='Style mode benchmark')
+parser.add_argument('--elements', type=int, nargs='+', default=[1000, 10000])
+parser.add_argument('--nodes', type=int, default=8)
+parser.add_argument('--depth', type=int, default=2)
+parser.add_argument('--fills', type=int, default=16)
+parser.add_argument('--strokes', type=int, default=8)
+parser.add_argument('--texts', type=int, default=20)
+parser.add_argument('--repeat', type=int, default=3)
+
+
+def export(gid_json, style_mode):
+    """Returns (export seconds, svg text) of the first artboard."""
+    cache = m.DecodeCache()
+    layers = d.read_gid_json(None, gid_json, cache)
+    stream = io.StringIO()
+    start = time.perf_counter()
+    exp.write_svg(gid_json["artboards"][0], layers, stream,
+                  context=exp.ExportContext(cache=cache, style_mode=style_mode))
+    return time.perf_counter() - start, stream.getvalue()
+
+
+def best_of(repeat, function, *args):
+    """Returns the fastest wall time of `repeat` runs."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    for elements in args.elements:
+        gid_json = synthetic.generate_gid_json(
+            elements=elements, nodes_per_path=args.nodes, group_depth=args.depth,
+            fills=args.fills, stroke_styles=args.strokes, texts=args.texts)
+        print(f"{elements} elements")
+        results = {}
+        for style_mode in (exp.STYLE_INLINE, exp.STYLE_CSS):
+            exported, svg = min(export(gid_json, style_mode) for _ in range(args.repeat))
+            data = svg.encode("utf-8")
+            parsed = best_of(args.repeat, ET.fromstring, data)
+            results[style_mode] = (len(data), exported, parsed)
+            print(f"  {style_mode:7} {len(data) / 1024:10.1f} KiB, export {exported * 1000:8.1f} ms, "
+                  f"parse {parsed * 1000:8.1f} ms")
+        (size, exported, parsed), (css_size, css_exported, css_parsed) = (
+            results[exp.STYLE_INLINE], results[exp.STYLE_CSS])
+        print(f"  css saves {(1 - css_size / size) * 100:.1f}% of the size, "
+              f"{(1 - css_parsed / parsed) * 100:.1f}% of the parse time "
+              f"(export {(css_exported / exported - 1) * 100:+.1f}%)")
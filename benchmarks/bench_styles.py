@@ -0,0 +1,129 @@
+"""
+Path style benchmark: per-element style assembly vs. VI path styles.StyleTable.
+
+usage: python -m benchmarks.bench_styles [--elements 20000] [--fills 2000] [--strokes 500]
+
+Reports the HSB -> RGB conversion rate (colorsys vs. the NumPy batch), and the time
+per element of the style attribute, assembled for each element (previous
+create_svg_path()) and looked up in the style table of the document, on first use
+(entries are converted) and once its entries are converted.
+"""
+
+import argparse
+import random
+import time
+
+import styles_path as sp
+from benchmarks import synthetic
+
+parser = argparse.ArgumentParser(description='Path style benchmark')
+parser.add_argument('--elements', type=int, default=20000)
+parser.add_argument('--fills', type=int, default=2000)
+parser.add_argument('--strokes', type=int, default=500)
+parser.add_argument('--hsb', type=float, default=0.5,
+                    help='share of HSB colors (default: %(default)s)')
+parser.add_argument('--repeat', type=int, default=3)
+
+
+def hsb_colors(gid_json, share, rnd):
+    """Replaces a `share` of the fill and stroke colors by HSB colors."""
+    def hsb():
+        return {"hsba": {"hue": rnd.random(), "saturation": rnd.random(),
+                         "brightness": rnd.random(), "alpha": 1}}
+    for fill in gid_json["fills"]:
+        if "color" in fill and rnd.random() < share:
+            fill["color"]["_0"] = hsb()
+    for stroke_style in gid_json["pathStrokeStyles"]:
+        if rnd.random() < share:
+            stroke_style["color"] = hsb()
+
+
+def assembled_style(element, fills, stroke_styles, cache):
+    """Previous create_svg_path() style attribute (decoded entries cached), kept as the baseline."""
+    stroke_id, fill_id = element["strokeStyleId"], element["fillId"]
+    if stroke_id not in cache["strokes"]:
+        cache["strokes"][stroke_id] = sp.decode_stroke_style(stroke_styles[stroke_id])
+    stroke = cache["strokes"][stroke_id]
+    if fill_id not in cache["fills"]:
+        cache["fills"][fill_id] = sp.decode_fill(fills[fill_id])
+    fill = cache["fills"][fill_id]
+    style_parts = [
+        f"display:{'none' if element.get('isHidden') else 'inline'}",
+        f"mix-blend-mode:{sp.blend_mode_to_svg(element.get('blendMode', 1))}",
+        f"opacity:{element.get('opacity', 1)}",
+        f"fill:{fill.get('fill') or 'none'}",
+        f"fill-opacity:{fill.get('fill-opacity')}",
+        f"fill-rule:{'nonzero'}",
+        f"stroke:{stroke.get('stroke', 'none')}",
+        f"stroke-width:{stroke.get('stroke-width')}",
+        f"stroke-opacity:{stroke.get('stroke-opacity')}",
+        f"stroke-linecap:{stroke.get('stroke-linecap')}",
+        f"stroke-dasharray:{stroke.get('stroke-dasharray')}",
+        f"stroke-linejoin:{stroke.get('stroke-linejoin')}",
+    ]
+    return ";".join(style_parts)
+
+
+def table_style(element, fills, stroke_styles, styles):
+    """Style attribute of create_svg_path() with a StyleTable."""
+    stroke_id, fill_id = element["strokeStyleId"], element["fillId"]
+    return styles.path_style(element.get("isHidden"), element.get("blendMode", 1),
+                             element.get("opacity", 1),
+                             styles.fill(fill_id, fills[fill_id]),
+                             styles.stroke(stroke_id, stroke_styles[stroke_id]))
+
+
+def best_of(repeat, function, *args):
+    """Returns (fastest wall time, result) of `repeat` runs (the first one warms caches)."""
+    best = result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    rnd = random.Random(0)
+    gid_json = synthetic.generate_gid_json(elements=0, fills=args.fills,
+                                           stroke_styles=args.strokes)
+    hsb_colors(gid_json, args.hsb, rnd)
+    fills, stroke_styles = gid_json["fills"], gid_json["pathStrokeStyles"]
+    elements = [{"fillId": rnd.randrange(len(fills)),
+                 "strokeStyleId": rnd.randrange(len(stroke_styles)),
+                 "opacity": rnd.choice([1, 0.5]), "blendMode": 0, "isHidden": False}
+                for _ in range(args.elements)]
+
+    colors = [{"hsba": {"hue": rnd.random(), "saturation": rnd.random(),
+                        "brightness": rnd.random(), "alpha": 1}} for _ in range(100000)]
+    numpy_min_colors = sp.NUMPY_MIN_COLORS
+    sp.NUMPY_MIN_COLORS = float("inf")
+    elapsed, expected = best_of(args.repeat, sp.colors_to_rgba, colors)
+    sp.NUMPY_MIN_COLORS = numpy_min_colors
+    print(f"{'HSB colorsys':24} {len(colors) / elapsed:12,.0f} colors/s")
+    if sp.tp.numpy() is not None:
+        elapsed, result = best_of(args.repeat, sp.colors_to_rgba, colors)
+        assert result == expected
+        print(f"{'HSB NumPy batch':24} {len(colors) / elapsed:12,.0f} colors/s")
+
+    assembled, expected = best_of(args.repeat, lambda cache: [
+        assembled_style(element, fills, stroke_styles, cache)
+        for element in elements], {"fills": {}, "strokes": {}})
+    # the entries referenced by elements are converted in one batch (exporters.style_table())
+    fill_ids = {element["fillId"] for element in elements}
+    stroke_style_ids = {element["strokeStyleId"] for element in elements}
+    first_use, _ = best_of(args.repeat, lambda: [
+        table_style(element, fills, stroke_styles, styles)
+        for styles in [sp.StyleTable(fills, stroke_styles, fill_ids, stroke_style_ids)]
+        for element in elements])
+    styles = sp.StyleTable(fills, stroke_styles, fill_ids, stroke_style_ids)
+    looked_up, result = best_of(args.repeat, lambda: [
+        table_style(element, fills, stroke_styles, styles) for element in elements])
+    assert result == expected
+    print(f"{'assembled per element':24} {assembled / len(elements) * 1e6:9.2f} us/element")
+    print(f"{'StyleTable first use':24} {first_use / len(elements) * 1e6:9.2f} us/element "
+          f"({len(fill_ids)} fills, {len(stroke_style_ids)} stroke styles converted)")
+    print(f"{'StyleTable lookup':24} {looked_up / len(elements) * 1e6:9.2f} us/element, "
+          f"{len(set(map(id, result)))} distinct style strings")
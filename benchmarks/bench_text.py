@@ -0,0 +1,64 @@
+"""
+Styled text benchmark: style runs of long texts (range scan vs. VI text tools.style_runs()).
+
+usage: python -m benchmarks.bench_text [--runs 100 1000 10000]
+
+For texts with a style change every few words, reports the time per run of finding
+the runs (previous scan from the first range at every run, and the single sweep),
+and of create_svg_text(), which should stay flat as the text grows.
+"""
+
+import argparse
+import time
+
+import exporters as exp
+import tools_text as tt
+from benchmarks import synthetic
+
+parser = argparse.ArgumentParser(description='Styled text benchmark')
+parser.add_argument('--runs', type=int, nargs='+', default=[100, 1000, 10000])
+
+
+def scan_runs(styled_text, length):
+    """Previous run detection of create_svg_text(), kept as the baseline."""
+    properties = [((styled_text.get(name) or {}).get("values", []), default)
+                  for name, default in tt.TEXT_STYLE_PROPERTIES]
+    runs = []
+    start = 0
+    while start < length:
+        end = length
+        values = []
+        for ranges, default in properties:
+            value = default
+            for range_item in ranges:
+                if start < range_item["upperBound"]:
+                    value = range_item["value"]
+                    end = min(end, range_item["upperBound"])
+                    break
+            values.append(value)
+        runs.append((start, end, tuple(values)))
+        start = end
+    return runs
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    for runs in args.runs:
+        gid_json = synthetic.generate_gid_json(elements=1, texts=1, text_runs=runs)
+        styled_text = gid_json["styledTexts"][0]
+        length = len(styled_text["string"])
+        element = {"name": "Text", "localTransform": None, "styledText": styled_text}
+
+        assert scan_runs(styled_text, length) == list(tt.style_runs(styled_text, length))
+        scan = timed(scan_runs, styled_text, length)
+        sweep = timed(lambda: list(tt.style_runs(styled_text, length)))
+        export = timed(exp.create_svg_text, element, exp.ExportContext())
+        print(f"{runs:6} runs: scan {scan / runs * 1e6:8.2f} us/run, "
+              f"sweep {sweep / runs * 1e6:6.2f} us/run, "
+              f"create_svg_text {export / runs * 1e6:6.2f} us/run")
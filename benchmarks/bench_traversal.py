@@ -0,0 +1,172 @@
+"""
+Traversal benchmark: `gid_json.get()` chains (previous decoders) vs. indexed model.
+
+read_gid_json() builds records while traversing (lazy), its line is the one to
+compare with the get() chains: a document is decoded once. The best of --repeat
+runs leaves out the full garbage collections that a single decode after parsing
+usually triggers (read_gid_json() pauses them), the decode stage of
+`open_vectornator.py --profile` includes them.
+
+usage: python -m benchmarks.bench_traversal [--elements 20000] [--nodes 8] [--depth 2]
+"""
+
+import argparse
+import time
+
+import decoders as d
+from benchmarks import synthetic
+
+parser = argparse.ArgumentParser(description='Traversal benchmark')
+parser.add_argument('--elements', type=int, default=20000)
+parser.add_argument('--nodes', type=int, default=8)
+parser.add_argument('--depth', type=int, default=2)
+parser.add_argument('--compound', type=int, default=3)
+parser.add_argument('--repeat', type=int, default=5)
+
+
+def legacy_read_gid_json(gid_json):
+    """Previous read_gid_json() (without images), kept as the baseline."""
+    layer_ids = gid_json.get("artboards", [])[0].get("layerIds", [])
+    layers = gid_json.get("layers", [])
+    result = []
+    for layer_id in layer_ids:
+        layer = layers[layer_id]
+        elements = []
+        for element_id in layer.get("elementIds", []):
+            element = gid_json.get("elements", [])[element_id]
+            if element:
+                elements.append(legacy_traverse_element(gid_json, element))
+        result.append({"name": layer.get("name", "Unnamed Layer"), "elements": elements})
+    return result
+
+
+def legacy_traverse_element(gid_json, element):
+    """Previous traverse_element() (bitmaps are not read)."""
+    element_result = {
+        "name": element.get("name", "Unnamed Element"),
+        "isHidden": element.get("isHidden", False),
+        "opacity": element.get("opacity", 1),
+        "blendMode": element.get("blendMode", 0),
+        "blur": element.get("blur", 0),
+        "localTransform": None,
+        "imageData": None,
+        "styledText": None,
+        "textProperty": None,
+        "singleStyle": None,
+        "strokeStyle": None,
+        "fill": None,
+        "fillId": None,
+        "pathGeometry": [],
+        "groupElements": []
+    }
+    local_transform_id = element.get("localTransformId")
+    if local_transform_id is not None:
+        element_result["localTransform"] = gid_json.get(
+            "localTransforms", [])[local_transform_id]
+
+    image_id = element.get("subElement", {}).get("image", {}).get("_0")
+    if image_id is not None:
+        image = gid_json.get("images", [])[image_id].get(
+            "imageData", {}).get("sharedFileImage", {}).get("_0")
+        element_result["imageData"] = gid_json.get(
+            "imageDatas", [])[image].get("relativePath", "")
+
+    stylable_id = element.get("subElement", {}).get("stylable", {}).get("_0")
+    if stylable_id is not None:
+        stylable = gid_json.get("stylables", [])[stylable_id]
+        abstract_path_id = stylable.get("subElement", {}).get(
+            "abstractPath", {}).get("_0")
+        if abstract_path_id is not None:
+            abstract_path = gid_json.get("abstractPaths", [])[abstract_path_id]
+            stroke_style_id = abstract_path.get("strokeStyleId")
+            if stroke_style_id is not None:
+                element_result["strokeStyle"] = gid_json.get(
+                    "pathStrokeStyles", [])[stroke_style_id]
+            fill_id = abstract_path.get("fillId")
+            if fill_id is not None:
+                element_result["fill"] = gid_json.get("fills", [])[fill_id]
+                element_result["fillId"] = fill_id
+            path_id = abstract_path.get(
+                "subElement", {}).get("path", {}).get("_0")
+            if path_id is not None:
+                path = gid_json.get("paths", [])[path_id]
+                geometry_id = path.get("geometryId")
+                if geometry_id is not None:
+                    element_result["pathGeometry"].append(
+                        gid_json.get("pathGeometries", [])[geometry_id])
+            compound_path_id = abstract_path.get(
+                "subElement", {}).get("compoundPath", {}).get("_0")
+            if compound_path_id is not None:
+                compound_path = gid_json.get("compoundPaths", [])[compound_path_id]
+                for subpath_id in compound_path.get("subpathIds", []):
+                    element_result["pathGeometry"].append(
+                        gid_json.get("pathGeometries", [])[subpath_id])
+
+        abstract_text_id = stylable.get("subElement", {}).get(
+            "abstractText", {}).get("_0")
+        if abstract_text_id is not None:
+            abstract_text = gid_json.get("abstractTexts", [])[abstract_text_id]
+            text_id = abstract_text.get("textId")
+            styled_text_id = abstract_text.get(
+                "subElement", {}).get("text", {}).get("_0")
+            if text_id is not None:
+                element_result["textProperty"] = gid_json.get("texts", [])[text_id]
+            if styled_text_id is not None:
+                element_result["styledText"] = gid_json.get(
+                    "styledTexts", [])[styled_text_id]
+
+        single_style_id = stylable.get("subElement", {}).get(
+            "singleStyle", {}).get("_0")
+        if single_style_id is not None:
+            element_result["singleStyle"] = gid_json.get(
+                "singleStyles", [])[single_style_id]
+
+    group_id = element.get("subElement", {}).get("group", {}).get("_0")
+    if group_id is not None:
+        group = gid_json.get("groups", [])[group_id]
+        for group_element_id in group.get("elementIds", []):
+            group_element = gid_json.get("elements", [])[group_element_id]
+            if group_element:
+                element_result["groupElements"].append(
+                    legacy_traverse_element(gid_json, group_element))
+    return element_result
+
+
+def best_of(repeat, function, *args):
+    """Returns the fastest wall time of `repeat` runs."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    gid_json = synthetic.generate_gid_json(
+        elements=args.elements, nodes_per_path=args.nodes,
+        group_depth=args.depth, compound_fanout=args.compound)
+    print(f"elements: {len(gid_json['elements'])}, "
+          f"geometries: {len(gid_json['pathGeometries'])}")
+
+    document = d.m.build_document(gid_json)
+
+    def traverse():
+        for layer_id in document.artboards[0].get("layerIds", []):
+            d.traverse_layer(None, document, document.layers[layer_id],
+                             d.m.DecodeCache())
+
+    legacy = best_of(args.repeat, legacy_read_gid_json, gid_json)
+    build = best_of(args.repeat, d.m.build_document, gid_json)
+    indexed = best_of(args.repeat, traverse)
+    # what VI Decoders.read_gid_json() does: records built on access (build_document(lazy=True))
+    lazy = best_of(args.repeat, d.read_gid_json, None, gid_json, d.m.DecodeCache())
+
+    print(f"get() chains traversal: {legacy * 1000:8.1f} ms")
+    print(f"model traversal:        {indexed * 1000:8.1f} ms "
+          f"({legacy / indexed:.2f}x)")
+    print(f"model build (once):     {build * 1000:8.1f} ms")
+    print(f"model build + traversal:{(build + indexed) * 1000:8.1f} ms "
+          f"({legacy / (build + indexed):.2f}x)")
+    print(f"read_gid_json (lazy):   {lazy * 1000:8.1f} ms ({legacy / lazy:.2f}x)")
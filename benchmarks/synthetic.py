@@ -0,0 +1,239 @@
+"""
+VI synthetic documents
+
+generates Linearity Curve (5.x) GUID JSON data and .curve archives for benchmarks.
+"""
+
+
+import json
+import random
+import struct
+import zipfile
+import zlib
+
+APP_VERSION = "5.18.4"
+
+
+def generate_gid_json(elements=1000, nodes_per_path=8, group_depth=0,
+                      compound_fanout=0, fills=16, stroke_styles=8,
+                      local_transforms=32, gradients=0, texts=0, text_runs=4,
+                      images=0, bitmaps=4, seed=0):
+    """
+    Generates an artboard (GUID JSON) dict with one layer.
+
+    Args:
+        elements (int): Number of leaf (path) elements.
+        nodes_per_path (int): Nodes in each path geometry.
+        group_depth (int): Leaf elements are wrapped in this many nested groups.
+        compound_fanout (int): Every other path becomes a compound path with this many subpaths (0: no compound paths).
+        fills (int): Size of the shared fill table.
+        stroke_styles (int): Size of the shared pathStrokeStyle table.
+        local_transforms (int): Size of the shared localTransform table.
+        gradients (int): Gradient fills added to the fill table.
+        texts (int): Number of text elements.
+        text_runs (int): Style runs in each text.
+        images (int): Number of image elements.
+        bitmaps (int): Distinct bitmaps shared by the image elements (imageDatas/*.dat).
+        seed (int): Random seed, the same arguments always give the same document.
+    """
+    rnd = random.Random(seed)
+    gid_json = {
+        "artboards": [{
+            "title": "Synthetic",
+            "frame": {"x": 0, "y": 0, "width": 1000, "height": 1000},
+            "layerIds": [0],
+        }],
+        "layers": [{"name": "Layer 1", "opacity": 1, "isVisible": True,
+                    "isLocked": False, "isExpanded": False, "elementIds": []}],
+        "elements": [], "stylables": [], "abstractPaths": [], "paths": [],
+        "compoundPaths": [], "pathGeometries": [], "groups": [],
+        "localTransforms": [], "fills": [], "pathStrokeStyles": [],
+        "images": [], "imageDatas": [], "abstractTexts": [], "texts": [],
+        "styledTexts": [],
+    }
+
+    def color():
+        return {"rgba": {"red": rnd.random(), "green": rnd.random(),
+                         "blue": rnd.random(), "alpha": 1}}
+
+    for _ in range(max(local_transforms, 1)):
+        gid_json["localTransforms"].append({
+            "rotation": rnd.uniform(-3.14, 3.14),
+            "scale": [rnd.uniform(0.5, 2), rnd.uniform(0.5, 2)],
+            "shear": rnd.choice([0, rnd.uniform(-0.5, 0.5)]),
+            "translation": [rnd.uniform(0, 1000), rnd.uniform(0, 1000)],
+        })
+    for _ in range(max(fills, 1)):
+        gid_json["fills"].append({"color": {"_0": color()}})
+    for _ in range(gradients):
+        gid_json["fills"].append({"gradient": {"_0": {
+            "gradient": {
+                "typeRawValue": rnd.randint(0, 1),  # linear / radial
+                "stops": [{"color": color(), "ratio": ratio} for ratio in (0, 0.5, 1)],
+            },
+            "transform": {"start": [rnd.uniform(-50, 50), rnd.uniform(-50, 50)],
+                          "end": [rnd.uniform(-50, 50), rnd.uniform(-50, 50)]},
+        }}})
+    for _ in range(max(stroke_styles, 1)):
+        gid_json["pathStrokeStyles"].append({
+            "color": color(),
+            "width": rnd.choice([1, 2, 4]),
+            "basicStrokeStyle": {"cap": rnd.randint(0, 2), "join": rnd.randint(0, 2),
+                                 "position": 0, "dashPattern": []},
+        })
+
+    def add(table, data):
+        gid_json[table].append(data)
+        return len(gid_json[table]) - 1
+
+    def geometry():
+        nodes = []
+        for _ in range(nodes_per_path):
+            x, y = rnd.uniform(-100, 100), rnd.uniform(-100, 100)
+            curved = rnd.random() < 0.5
+            nodes.append({
+                "anchorPoint": [x, y],
+                "inPoint": [x - 5, y + 3] if curved else [x, y],
+                "outPoint": [x + 5, y - 3] if curved else [x, y],
+                "nodeType": 0,
+                "cornerRadius": 0,
+            })
+        return add("pathGeometries", {"closed": rnd.random() < 0.5, "nodes": nodes})
+
+    def path_element(index):
+        abstract_path = {
+            "fillId": rnd.randrange(len(gid_json["fills"])),
+            "strokeStyleId": rnd.randrange(len(gid_json["pathStrokeStyles"])),
+        }
+        if compound_fanout and index % 2:
+            subpath_ids = [geometry() for _ in range(compound_fanout)]
+            abstract_path["subElement"] = {"compoundPath": {
+                "_0": add("compoundPaths", {"subpathIds": subpath_ids})}}
+        else:
+            abstract_path["subElement"] = {"path": {
+                "_0": add("paths", {"geometryId": geometry()})}}
+        stylable_id = add("stylables", {"subElement": {"abstractPath": {
+            "_0": add("abstractPaths", abstract_path)}}})
+        return add("elements", {
+            "name": f"Path {index}",
+            "blendMode": 0,
+            "isHidden": False,
+            "isLocked": False,
+            "opacity": 1,
+            "localTransformId": rnd.randrange(len(gid_json["localTransforms"])),
+            "subElement": {"stylable": {"_0": stylable_id}},
+        })
+
+    def group_element(element_id, depth):
+        group_id = add("groups", {"elementIds": [element_id]})
+        return add("elements", {
+            "name": f"Group {depth}",
+            "blendMode": 0,
+            "isHidden": False,
+            "isLocked": False,
+            "opacity": 1,
+            "localTransformId": 0,
+            "subElement": {"group": {"_0": group_id}},
+        })
+
+    def text_element(index):
+        words = ["Lorem", "ipsum", "dolor", "sit", "amet", "consectetur"]
+        string = ""
+        font_names, font_sizes, fill_colors = [], [], []
+        for run in range(max(text_runs, 1)):
+            string += " ".join(rnd.choice(words) for _ in range(rnd.randint(1, 4)))
+            string += "\n" if run % 3 == 2 else " "
+            upper_bound = len(string)
+            font_names.append({"value": rnd.choice(["Helvetica", "Arial"]),
+                               "upperBound": upper_bound})
+            font_sizes.append({"value": rnd.choice([12, 16, 24]), "upperBound": upper_bound})
+            fill_colors.append({"value": color(), "upperBound": upper_bound})
+        styled_text_id = add("styledTexts", {
+            "string": string,
+            "fontName": {"values": font_names},
+            "fontSize": {"values": font_sizes},
+            "fillColor": {"values": fill_colors},
+            "alignment": {"values": [{"value": 0, "upperBound": len(string)}]},
+        })
+        abstract_text_id = add("abstractTexts", {
+            "textId": add("texts", {"layout": 1}),
+            "subElement": {"text": {"_0": styled_text_id}},
+        })
+        stylable_id = add("stylables", {"subElement": {"abstractText": {
+            "_0": abstract_text_id}}})
+        return add("elements", {
+            "name": f"Text {index}",
+            "blendMode": 0,
+            "isHidden": False,
+            "isLocked": False,
+            "opacity": 1,
+            "localTransformId": rnd.randrange(len(gid_json["localTransforms"])),
+            "subElement": {"stylable": {"_0": stylable_id}},
+        })
+
+    for bitmap in range(max(bitmaps, 1) if images else 0):
+        add("imageDatas", {"relativePath": f"bitmap-{bitmap}.dat"})
+        add("images", {"imageData": {"sharedFileImage": {"_0": bitmap}}})
+
+    def image_element(index):
+        return add("elements", {
+            "name": f"Image {index}",
+            "blendMode": 0,
+            "isHidden": False,
+            "isLocked": False,
+            "opacity": 1,
+            "localTransformId": rnd.randrange(len(gid_json["localTransforms"])),
+            "subElement": {"image": {"_0": index % len(gid_json["images"])}},
+        })
+
+    leaves = [(path_element, index) for index in range(elements)]
+    leaves += [(text_element, index) for index in range(texts)]
+    leaves += [(image_element, index) for index in range(images)]
+    for create, index in leaves:
+        element_id = create(index)
+        for depth in range(group_depth):
+            element_id = group_element(element_id, depth)
+        gid_json["layers"][0]["elementIds"].append(element_id)
+
+    return gid_json
+
+
+def png_bytes(size, seed=0):
+    """Returns a `size` x `size` RGB PNG of random pixels (does not compress well, like photos)."""
+    rnd = random.Random(seed)
+    row_length = size * 3
+    raw = b"".join(b"\x00" + rnd.randbytes(row_length) for _ in range(size))
+
+    def chunk(kind, data):
+        return (struct.pack(">I", len(data)) + kind + data
+                + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw))
+            + chunk(b"IEND", b""))
+
+
+def write_curve(path, gid_json, artboards=1, image_size=64, app_version=APP_VERSION):
+    """
+    Writes a .curve archive (Manifest.json, Document.json, GUID JSON, *.dat bitmaps).
+
+    The same GUID JSON is used for each of `artboards` artboard paths.
+    """
+    artboard_paths = [f"Artboards/{index}.json" for index in range(artboards)]
+    document = {
+        "appVersion": app_version,
+        "drawing": {"artboardPaths": artboard_paths, "settings": {"units": "Pixels"}},
+    }
+    gid_text = json.dumps(gid_json)
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("Manifest.json", json.dumps(
+            {"documentJSONFilename": "Document.json"}))
+        archive.writestr("Document.json", json.dumps(document))
+        for artboard_path in artboard_paths:
+            archive.writestr(artboard_path, gid_text)
+        for index, image_data in enumerate(gid_json.get("imageDatas", [])):
+            # bitmaps are stored without compression, like Linearity Curve does
+            archive.writestr(image_data["relativePath"], png_bytes(image_size, index),
+                             compress_type=zipfile.ZIP_STORED)
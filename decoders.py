@@ -11,178 +11,269 @@ Curve 5.18.0 ~ 5.18.4 use fileFormatVersion 44, while Curve 5.1.1 and 5.1.2 use
 """
 
 
-import extractors as ext
-
+import gc
 
-def read_gid_json(archive, gid_json):
+import diagnostics as dg
+import extractors as ext
+import model as m
+
+# keys of decode_element() results, copied for each element (faster than a dict literal this size)
+ELEMENT_RESULT = {
+    "name": None,
+    "isHidden": False,
+    # isLocked requires sodipodi:insensitive
+    "opacity": 1,
+    "blendMode": 0,
+    "blur": 0,
+    "localTransform": None,
+    "localTransformId": None,
+    "imageData": None,  # will be bitmap bytes (model.Lazy)
+    "imageDataId": None,
+    "styledText": None,  # from styledTexts
+    "textProperty": None,  # from texts
+    "singleStyle": None,
+    "strokeStyle": None,  # what is fillRule/strokeType?
+    "strokeStyleId": None,
+    "fill": None,
+    "fillId": None,
+    "pathGeometry": None,
+    "geometryIds": None,
+    "groupElements": None,
+}
+
+# events of iter_gid_json()
+LAYER_START = "layer_start"
+LAYER_END = "layer_end"
+GROUP_START = "group_start"
+GROUP_END = "group_end"
+ELEMENT = "element"
+
+
+def read_gid_json(archive, gid_json, cache=None, artboard_index=0):
     """
-    Reads gid.json and returns simply-structured data.
-
-    Argument `archive` is needed for image embedding.
+    Reads gid.json and returns simply-structured data of an artboard.
+
+    Argument `archive` is needed for image embedding, it must stay open until exported:
+    bitmaps are model.Lazy references read only if an exporter resolves them, and
+    geometries are only parsed/converted when an exporter accesses them.
+    `cache` (model.DecodeCache) shares bitmaps between elements, pass the same one to exporters
+    (it also gives them the document tables, see model.DecodeCache.document).
+    iter_gid_json() decodes the same data as a stream of events.
     """
+    if cache is None:
+        cache = m.DecodeCache()
+    # records are built when visited: each is used once, a pass over all tables would cost more.
+    # Geometries are converted in place: exporters then run without their JSON nodes
+    document = m.build_document(gid_json, lazy=True, cache=cache, keep_geometries=True)
+    cache.document = document
+
     # "layer_ids" contain layer indexes, while "layers" contain existing layers
-    layer_ids = gid_json.get("artboards", [])[0].get("layerIds", [])
-    layers = gid_json.get("layers", [])
+    layer_ids = document.artboards[artboard_index].get("layerIds", [])
+    dg.DECODE.debug("artboard %d: %d layers, %d elements", artboard_index,
+                    len(layer_ids), len(document.elements))
     layers_result = []
 
-    # Locate elements specified in layers.elementIds with traverse_layer
-    for layer_id in layer_ids:
-        layer = layers[layer_id]
-        layers_result.append(
-            traverse_layer(archive, gid_json, layer))
+    # the results hold no reference cycles: collections triggered by their allocations
+    # would only walk gid_json again and again (see benchmarks.bench_nesting)
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        # Locate elements specified in layers.elementIds with traverse_layer
+        for layer_id in layer_ids:
+            layer = document.layers[layer_id]
+            layers_result.append(
+                traverse_layer(archive, document, layer, cache))
+    finally:
+        if gc_enabled:
+            gc.enable()
 
     return layers_result
 
 
-def traverse_layer(archive, gid_json, layer):
-    """Traverse specified layer and extract their attributes."""
-    layer_element_ids = layer.get("elementIds", [])
-    layer_result = {
-        "name": layer.get("name", "Unnamed Layer"),
-        "opacity": layer.get("opacity", 1),
-        "isVisible": layer.get("isVisible", True),
-        "isLocked": layer.get("isLocked", False),
-        "isExpanded": layer.get("isExpanded", False),
+def iter_gid_json(archive, gid_json, cache=None, artboard_index=0):
+    """
+    Decodes an artboard of gid.json as a stream of (event, data) pairs, in document order.
+
+    Events:
+        (LAYER_START, layer), (LAYER_END, layer): around the elements of a layer.
+        (GROUP_START, element), (GROUP_END, element): around the elements of a group.
+        (ELEMENT, element): any other element.
+
+    `layer` and `element` are the dicts of traverse_layer() and traverse_element(), with
+    "elements" and "groupElements" left empty. Elements are decoded one at a time when
+    the stream is consumed and are not kept, so memory does not grow with the number
+    of elements. Arguments are the same as read_gid_json().
+    """
+    if cache is None:
+        cache = m.DecodeCache()
+    # records are built when visited, the first events come without a pass over all tables
+    document = m.build_document(gid_json, lazy=True, cache=cache)
+    cache.document = document
+
+    layer_ids = document.artboards[artboard_index].get("layerIds", [])
+    dg.DECODE.debug("artboard %d: %d layers, %d elements (streaming)", artboard_index,
+                    len(layer_ids), len(document.elements))
+    for layer_id in layer_ids:
+        layer = document.layers[layer_id]
+        layer_result = decode_layer(layer)
+        yield LAYER_START, layer_result
+
+        # (iterator of element ids, open group element), no recursion for nested groups
+        stack = [(iter(layer.element_ids), None)]
+        while stack:
+            for element_id in stack[-1][0]:
+                element = document.elements[element_id]
+                if not element:
+                    continue
+                element_result = decode_element(archive, document, element, cache)
+                # groups without (non-empty) elements are plain elements, like in read_gid_json()
+                if element.group_id is not None:
+                    group_element_ids = document.groups[element.group_id].element_ids
+                    if any(document.elements.table[child_id] for child_id in group_element_ids):
+                        yield GROUP_START, element_result
+                        stack.append((iter(group_element_ids), element_result))
+                        break
+                yield ELEMENT, element_result
+            else:
+                _, group_result = stack.pop()
+                if group_result is not None:
+                    yield GROUP_END, group_result
+
+        yield LAYER_END, layer_result
+
+
+def decode_layer(layer):
+    """Extracts the attributes of a layer (model.Layer), elements are left empty."""
+    return {
+        "name": layer.name,
+        "opacity": layer.opacity,
+        "isVisible": layer.is_visible,
+        "isLocked": layer.is_locked,
+        "isExpanded": layer.is_expanded,
         "elements": []  # store elements inside the layer
     }
+
+
+def traverse_layer(archive, document, layer, cache):
+    """Traverse specified layer (model.Layer) and extract their attributes."""
+    layer_result = decode_layer(layer)
     # process each elements
-    for element_id in layer_element_ids:
-        element = get_element(gid_json, element_id)
+    for element_id in layer.element_ids:
+        element = document.elements[element_id]
         if element:
             layer_result["elements"].append(
-                traverse_element(archive, gid_json, element))
+                traverse_element(archive, document, element, cache))
 
     return layer_result
 
 
-def traverse_element(archive, gid_json, element):
-    """Traverse specified element and extract their attributes."""
+def traverse_element(archive, document, element, cache):
+    """
+    Traverse specified element (model.Element) and the elements of its groups.
+
+    Nested groups are walked with an explicit stack instead of recursion, so the
+    nesting depth is only limited by memory. groupElements keep the document order.
+    """
+    element_result = decode_element(archive, document, element, cache)
+    # (group id, result of its group element), only groups are stacked
+    stack = [] if element.group_id is None else [(element.group_id, element_result)]
+    while stack:
+        group_id, group_result = stack.pop()
+        # get elements inside group
+        group_elements = group_result["groupElements"]
+        for child_id in document.groups[group_id].element_ids:
+            child = document.elements[child_id]
+            if child:
+                child_result = decode_element(archive, document, child, cache)
+                group_elements.append(child_result)
+                if child.group_id is not None:
+                    stack.append((child.group_id, child_result))
+
+    return element_result
+
+
+def decode_element(archive, document, element, cache):
+    """Extracts the attributes of an element (model.Element), groupElements are left empty."""
 
     # easier-to-process data structure
-    element_result = {
-        "name": element.get("name", "Unnamed Element"),
-        "isHidden": element.get("isHidden", False),
-        # isLocked requires sodipodi:insensitive
-        "opacity": element.get("opacity", 1),
-        "blendMode": element.get("blendMode", 0),
-        "blur": element.get("blur", 0),
-        "localTransform": None,
-        "imageData": None,  # will be base64 string
-        "styledText": None,  # from styledTexts
-        "textProperty": None,  # from texts
-        "singleStyle": None,
-        "strokeStyle": None,  # what is fillRule/strokeType?
-        "fill": None,
-        "fillId": None,
-        "pathGeometry": [],  # array because compoundPath
-        "groupElements": []  # store group elements
-    }
+    element_result = ELEMENT_RESULT.copy()
+    element_result["name"] = element.name
+    element_result["isHidden"] = element.is_hidden
+    element_result["opacity"] = element.opacity
+    element_result["blendMode"] = element.blend_mode
+    element_result["blur"] = element.blur
+    element_result["localTransformId"] = element.local_transform_id
+    element_result["pathGeometry"] = []  # array because compoundPath (model.TableItems)
+    geometry_ids = element_result["geometryIds"] = []
+    element_result["groupElements"] = []  # store group elements
 
     # localTransform
-    local_transform_id = element.get("localTransformId")
-    if local_transform_id is not None:
-        element_result["localTransform"] = get_local_transform(
-            gid_json, local_transform_id)
+    if element.local_transform_id is not None:
+        element_result["localTransform"] = document.local_transforms[
+            element.local_transform_id]
 
     # Image
-    image_id = element.get("subElement", {}).get("image", {}).get("_0")
-    if image_id is not None:
-        # relativePath contains *.dat (bitmap data)
-        # sharedFileImage doesn't exist in 5.1.1 (file version 21) document
-        image = get_image(gid_json, image_id).get(
-            "imageData", {}).get("sharedFileImage", {}).get("_0")
-        image_data = get_image_data(gid_json, image).get("relativePath", "")
-        element_result["imageData"] = ext.read_dat_from_zip(
-            archive, image_data)
+    if element.image_id is not None:
+        image = document.images[element.image_id]
+        image_data = document.image_datas[image.image_data_id].relative_path
+        # read (m.resolve(), the same bitmap only once) or streamed when exported
+        element_result["imageData"] = ext.ZipMember(
+            archive, image_data, cache, image.image_data_id)
+        element_result["imageDataId"] = image.image_data_id
 
     # Stylable
-    stylable_id = element.get("subElement", {}).get("stylable", {}).get("_0")
-    if stylable_id is not None:
-        stylable = get_stylable(gid_json, stylable_id)
+    if element.stylable_id is not None:
+        stylable = document.stylables[element.stylable_id]
 
         # Abstract Path
-        abstract_path_id = stylable.get("subElement", {}).get(
-            "abstractPath", {}).get("_0")
-        if abstract_path_id is not None:
-            abstract_path = get_abstract_path(gid_json, abstract_path_id)
+        if stylable.abstract_path_id is not None:
+            abstract_path = document.abstract_paths[stylable.abstract_path_id]
 
             # Stroke Style
-            stroke_style_id = abstract_path.get("strokeStyleId")
-            if stroke_style_id is not None:
-                element_result["strokeStyle"] = get_stroke_style(
-                    gid_json, stroke_style_id)
+            if abstract_path.stroke_style_id is not None:
+                element_result["strokeStyle"] = document.path_stroke_styles[
+                    abstract_path.stroke_style_id]
+                element_result["strokeStyleId"] = abstract_path.stroke_style_id
 
             # fill
-            fill_id = abstract_path.get("fillId")
-            if fill_id is not None:
-                element_result["fill"] = get_fill(gid_json, fill_id)
-                element_result["fillId"] = fill_id
-
-            # Path
-            path_id = abstract_path.get(
-                "subElement", {}).get("path", {}).get("_0")
-            if path_id is not None:
-                path = get_path(gid_json, path_id)
-
-                # Path Geometry
-                geometry_id = path.get("geometryId")
+            if abstract_path.fill_id is not None:
+                element_result["fill"] = document.fills[abstract_path.fill_id]
+                element_result["fillId"] = abstract_path.fill_id
+
+            # Path Geometry
+            if abstract_path.path_id is not None:
+                geometry_id = document.paths[abstract_path.path_id].geometry_id
                 if geometry_id is not None:
-                    path_geometry = get_path_geometries(gid_json, geometry_id)
-                    element_result["pathGeometry"].append(path_geometry)
-
-            # compoundPath
-            compound_path_id = abstract_path.get(
-                "subElement", {}).get("compoundPath", {}).get("_0")
-            if compound_path_id is not None:
-                compound_path = get_compound_path(gid_json, compound_path_id)
-
-                # Path Geometries (subpath)
-                subpath_ids = compound_path.get("subpathIds", [])
-                if subpath_ids is not None:
-                    for id in subpath_ids:
-                        path_geometry = get_path_geometries(gid_json, id)
-                        element_result["pathGeometry"].append(path_geometry)
+                    geometry_ids.append(geometry_id)
+
+            # compoundPath (subpath geometries)
+            if abstract_path.compound_path_id is not None:
+                compound_path = document.compound_paths[abstract_path.compound_path_id]
+                geometry_ids.extend(compound_path.subpath_ids)
+
+            # converted (model.PathGeometry) when exported
+            if geometry_ids:
+                element_result["pathGeometry"] = m.TableItems(document.path_geometries, geometry_ids)
 
         # Abstract Text
-        abstract_text_id = stylable.get("subElement", {}).get(
-            "abstractText", {}).get("_0")
-        if abstract_text_id is not None:
-            abstract_text = get_abstract_text(gid_json, abstract_text_id)
-            text_id = abstract_text.get("textId")
-            styled_text_id = abstract_text.get(
-                "subElement", {}).get("text", {}).get("_0")
+        if stylable.abstract_text_id is not None:
+            abstract_text = document.abstract_texts[stylable.abstract_text_id]
 
             # texts(layout)
-            if text_id is not None:
-                element_result["textProperty"] = get_text_property(
-                    gid_json, text_id)  # from texts
+            if abstract_text.text_id is not None:
+                element_result["textProperty"] = document.texts[abstract_text.text_id]
 
             # styledTexts
-            if styled_text_id is not None:
-                element_result["styledText"] = get_styled_text(
-                    gid_json, styled_text_id)  # from styledTexts
+            if abstract_text.styled_text_id is not None:
+                element_result["styledText"] = document.styled_texts[
+                    abstract_text.styled_text_id]
 
         #! singleStyle (NON-EXISTENT in latest format, found in fileVersion 21)
-        single_style_id = stylable.get("subElement", {}).get(
-            "singleStyle", {}).get("_0")
-        if single_style_id is not None:
-            single_style = get_single_style(gid_json, single_style_id)
-            element_result["singleStyle"] = single_style
+        if stylable.single_style_id is not None:
+            element_result["singleStyle"] = document.single_styles[
+                stylable.single_style_id]
             # TODO Add lines later
 
-    # Group
-    group_id = element.get("subElement", {}).get("group", {}).get("_0")
-    if group_id is not None:
-        # get elements inside group
-        group = get_group(gid_json, group_id)
-        group_element_ids = group.get("elementIds", [])
-        for group_element_id in group_element_ids:
-            group_element = get_element(gid_json, group_element_id)
-            if group_element:
-                # get group elements recursively
-                element_result["groupElements"].append(
-                    traverse_element(archive, gid_json, group_element))
-
     return element_result
 
 
@@ -197,7 +288,7 @@ def vectornator_to_artboard(gid_json):
 
 
 # get_(name) functions
-# could be incorporated into Object(will happen when inkex rewrite)
+# read_gid_json() uses the indexed model (model.py) instead
 
 
 def get_element(gid_json, index):
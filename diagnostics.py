@@ -0,0 +1,115 @@
+"""
+VI diagnostics
+
+named diagnostic channels (decode, transform, export, text) on top of logging.
+
+Channels are the loggers "vi.decode", "vi.transform"... They are disabled
+(WARNING) unless enabled by configure(), and messages are formatted lazily:
+
+    dg.EXPORT.debug("element: %r", element)
+
+does not format `element` when the export channel is disabled. The handler
+installed by configure() truncates bytes (bitmaps), long strings and long lists.
+"""
+
+
+import logging
+import sys
+
+LOGGER_NAME = "vi"
+CHANNELS = ("decode", "transform", "export", "text")
+
+# characters of a string / items of a list shown before truncation
+PAYLOAD_LIMIT = 80
+ITEM_LIMIT = 8
+
+
+def channel(name):
+    """Returns the logger of a channel."""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+DECODE = channel("decode")
+TRANSFORM = channel("transform")
+EXPORT = channel("export")
+TEXT = channel("text")
+
+
+class Truncated:
+    """Placeholder shown instead of a large value."""
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __repr__(self):
+        return self.text
+
+    __str__ = __repr__
+
+
+def summarize(value, limit=PAYLOAD_LIMIT):
+    """Returns a copy of `value` with bytes, long strings and long lists truncated."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return Truncated(f"<{len(value)} bytes {bytes(value[:8]).hex()}...>")
+    if isinstance(value, str):
+        if len(value) <= limit:
+            return value
+        return Truncated(f"{value[:limit]!r}...(+{len(value) - limit} chars)")
+    if isinstance(value, dict):
+        return {key: summarize(item, limit) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [summarize(item, limit) for item in value[:ITEM_LIMIT]]
+        if len(value) > ITEM_LIMIT:
+            items.append(Truncated(f"...(+{len(value) - ITEM_LIMIT} items)"))
+        return items
+    return value
+
+
+class PayloadFormatter(logging.Formatter):
+    """Formatter that summarizes the arguments of a record (limit=None keeps them)."""
+
+    def __init__(self, limit=PAYLOAD_LIMIT):
+        super().__init__("%(name)s %(levelname)s: %(message)s")
+        self.limit = limit
+
+    def format(self, record):
+        if self.limit is not None and record.args:
+            record = logging.makeLogRecord(record.__dict__)
+            if isinstance(record.args, dict):
+                record.args = {key: summarize(value, self.limit)
+                               for key, value in record.args.items()}
+            else:
+                record.args = tuple(summarize(value, self.limit) for value in record.args)
+        return super().format(record)
+
+
+def configure(channels=CHANNELS, level=logging.DEBUG, truncate=True, stream=None):
+    """
+    Enables channels at `level`, writing to `stream` (default: stderr).
+
+    Args:
+        channels (iterable): Channel names, or "all".
+        level (int): logging level of the enabled channels.
+        truncate (bool): Truncate bitmaps and other large payloads in messages.
+    """
+    if channels == "all":
+        channels = CHANNELS
+    root = logging.getLogger(LOGGER_NAME)
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(PayloadFormatter(PAYLOAD_LIMIT if truncate else None))
+    root.handlers = [handler]
+    root.propagate = False
+    for name in CHANNELS:
+        channel(name).setLevel(level if name in channels else logging.WARNING)
+
+
+def parse_channels(value):
+    """argparse type for channel lists ("decode,export" or "all")."""
+    if value == "all":
+        return CHANNELS
+    channels = tuple(name.strip() for name in value.split(",") if name.strip())
+    for name in channels:
+        if name not in CHANNELS:
+            raise ValueError(f"Unknown diagnostic channel: {name}")
+    return channels
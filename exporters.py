@@ -8,68 +8,213 @@ outputs svg file.
 import base64
 import os
 import xml.etree.ElementTree as ET
-from io import BytesIO
-from xml.dom import minidom
-
-from PIL import Image
 
+import decoders as d
+import diagnostics as dg
+import model as m
+import path_encoder as pe
+import profiling as pf
 import styles_path as sp
+import tools_image as ti
 import tools_path as tp
 import tools_text as tt
+import writers as wr
 
+# image_mode values
+IMAGE_INLINE = "inline"  # embed as data: URI
+IMAGE_EXTERNAL = "external"  # write image files next to the svg
 
-def create_svg(artboard, layers, file):
-    """Exports svg file. (WIP)"""
+IMAGE_DIRECTORY = "images"
 
-    # SVG header
-    svg = create_svg_header(artboard)
+# style_mode values
+STYLE_INLINE = "inline"  # style attribute on every element
+STYLE_CSS = "css"  # CSS classes in a <style> element, default values omitted
+
+
+class ExportContext:
+    """
+    Per-document export options and state.
+
+    Args:
+        image_store (ImageStore): Writes images as external files. Images are embedded if None.
+        cache (DecodeCache): Converted styles/transforms, shared with VI Decoders.read_gid_json().
+        precision (int): Decimals of path data. None keeps full precision.
+        profiler (Profiler): Collects export metrics (VI profiling).
+        skip_hidden (bool): Omit hidden elements and invisible layers.
+        style_mode (str): STYLE_INLINE or STYLE_CSS (see styled()).
+    """
 
-    # Add <defs> element
-    defs = ET.Element("defs", {
+    def __init__(self, image_store=None, cache=None, precision=pe.DEFAULT_PRECISION,
+                 profiler=pf.NULL_PROFILER, skip_hidden=False, style_mode=STYLE_INLINE):
+        self.image_store = image_store
+        self.cache = cache if cache is not None else m.DecodeCache()
+        self.precision = precision
+        self.profiler = profiler
+        self.skip_hidden = skip_hidden
+        # (fillId, gradientTransform) -> gradient id, each is defined once in <defs>
+        self.gradient_ids = {}
+        self.gradient_counts = {}  # fillId -> number of gradient ids
+        # (fontName, fontSize, rgba, alignment) -> tspan style
+        self.tspan_styles = {}
+        self.style_table = None  # see style_table()
+        # CSS classes of the styles (style_mode="css"), written in a <style> at the end
+        self.style_sheet = sp.StyleSheet() if style_mode == STYLE_CSS else None
+
+
+def create_svg(artboard, layers, output, pretty=False, image_mode=IMAGE_INLINE,
+               cache=None, precision=pe.DEFAULT_PRECISION, profiler=pf.NULL_PROFILER,
+               skip_hidden=False, style_mode=STYLE_INLINE):
+    """
+    Exports svg file to `output` path. (WIP)
+
+    `layers` is the result of VI Decoders.read_gid_json(), or the events of
+    VI Decoders.iter_gid_json() to export elements while they are decoded (see write_svg()).
+    With image_mode="external", bitmaps are written to an `images` directory next to
+    the svg and referenced by href.
+    `cache` should be the DecodeCache used by VI Decoders.read_gid_json().
+    `precision` is the number of decimals in path data (None: full precision).
+    `profiler` (VI profiling) collects per-stage and per-element metrics.
+    `skip_hidden` omits hidden elements and invisible layers (their bitmaps are not even read).
+    With style_mode="css", elements reference CSS classes instead of style attributes.
+    """
+    if image_mode == IMAGE_EXTERNAL:
+        image_store = ti.ImageStore(
+            os.path.join(os.path.dirname(output), IMAGE_DIRECTORY), IMAGE_DIRECTORY)
+    elif image_mode == IMAGE_INLINE:
+        image_store = None
+    else:
+        raise ValueError(f"Unknown image mode: {image_mode}")
+    if style_mode not in (STYLE_INLINE, STYLE_CSS):
+        raise ValueError(f"Unknown style mode: {style_mode}")
+
+    with open(output, "w", encoding="utf-8") as output_file:
+        write_svg(artboard, layers, output_file, pretty,
+                  ExportContext(image_store, cache, precision, profiler, skip_hidden,
+                                style_mode))
+    profiler.count("output_bytes", os.path.getsize(output))
+
+
+def write_svg(artboard, layers, stream, pretty=False, context=None):
+    """
+    Writes svg document to a text stream.
+
+    Elements are serialized as soon as they are created, `pretty` indents the output.
+    `layers` is a list of layers (VI Decoders.read_gid_json()), or an iterable of
+    VI Decoders.iter_gid_json() events: then nothing is collected before the elements
+    are written, and the gradients are defined in a <defs> after the layers.
+    The <style> of the CSS classes (style_mode="css") is written after the layers.
+    """
+    if context is None:
+        context = ExportContext()
+    writer = wr.SvgWriter(stream, pretty)
+    writer.declaration()
+
+    # SVG header
+    writer.start_element(create_svg_header(artboard))
+
+    if type(layers) is not list:
+        writer.comment("Generated with Vectornator Inspection")
+        gradients = write_svg_events(writer, layers, context)
+        writer.start("defs", {
+            "id": "defs1",
+        })
+        for gradient in gradients:
+            writer.element(gradient)
+        writer.end()
+        write_style_sheet(writer, context)
+        writer.close()
+        return
+
+    # Add <defs> element (gradients are collected before the layers are written)
+    writer.start("defs", {
         "id": "defs1",
     })
-    svg.append(defs)
+    with context.profiler.stage("gradients"):
+        for gradient in iter_svg_gradients(layers, context):
+            writer.element(gradient)
+    writer.end()
 
     # comment
-    comment = ET.Comment("Generated with Vectornator Inspection")
-    svg.append(comment)
+    writer.comment("Generated with Vectornator Inspection")
 
     # layer as g
     for layer in layers:
-        svg_layer = create_svg_layer(layer, defs)
-        svg.append(svg_layer)
+        if context.skip_hidden and is_hidden(layer):
+            continue
+        write_svg_layer(writer, layer, context)
 
-    ET.dump(svg)
+    write_style_sheet(writer, context)
+    writer.close()
 
-    # get input file directory
-    directory = os.path.dirname(file)
 
-    # create output file directory
-    output = os.path.join(directory, "result.svg")
+def write_style_sheet(writer, context):
+    """Writes the <style> element of the CSS classes used by the elements (style_mode="css")."""
+    if context.style_sheet is None:
+        return
+    style = ET.Element("style", {"type": "text/css"})
+    style.text = context.style_sheet.css("\n" if writer.pretty else "")
+    writer.element(style)
 
-    # format svg tree
-    rough_string = ET.tostring(svg, 'utf-8')
-    reparsed = minidom.parseString(rough_string)
-    pretty_svg = reparsed.toprettyxml(indent="\t")
 
-    # Custom declaration
-    xml_declaration = '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
-    modified_svg = xml_declaration + '\n'.join(pretty_svg.splitlines()[1:])
+def styled(attributes, context):
+    """
+    Returns the attributes of an element in the style mode of the export.
+
+    With style_mode="css", the style attribute is replaced by a class (omitted if the
+    style has only default values), see VI path styles.StyleSheet.
+    """
+    if context.style_sheet is None:
+        return attributes
+    return context.style_sheet.apply(attributes)
+
+
+def iter_svg_gradients(elements_or_layers, context):
+    """Yields gradient elements used by the paths in layers/elements, in document order."""
+    # iterators of the layers/groups being walked (no recursion, any nesting depth)
+    stack = [iter(elements_or_layers)]
+    while stack:
+        for item in stack[-1]:
+            if context.skip_hidden and is_hidden(item):
+                continue
+            if "elements" in item:  # layer
+                stack.append(iter(item.get("elements", [])))
+                break
+            elif item.get("groupElements", []):
+                stack.append(iter(item.get("groupElements", [])))
+                break
+            elif is_path(item):
+                gradient = create_svg_gradient(item, context)
+                if gradient is not None:
+                    yield gradient
+        else:
+            stack.pop()
+
+
+def is_path(element):
+    """Checks if an element is exported as a path (see create_svg_element())."""
+    return (not element.get("imageData") and not element.get("styledText")
+            and bool(element.get("pathGeometry")))
 
-    # output prettified svg
-    with open(output, "w", encoding="utf-8") as output_file:
-        output_file.write(modified_svg)
 
-    # construct the tree and save svg file (unformatted svg)
-    # tree = ET.ElementTree(svg)
-    # tree.write(output, encoding="UTF-8", xml_declaration=True)
+def is_hidden(item):
+    """Checks if a layer is invisible or an element is hidden."""
+    if "elements" in item:  # layer
+        return not item.get("isVisible")
+    return bool(item.get("isHidden"))
 
 
-def create_svg_layer(layer, defs):
+def write_svg_layer(writer, layer, context):
     """
-    Converts a layer defined in VI Decoders.traverse_layer() to an SVG group.
+    Writes a layer defined in VI Decoders.traverse_layer() as an SVG group.
     """
 
+    writer.start("g", styled(create_svg_layer_attributes(layer), context))
+    write_svg_elements(writer, layer.get("elements", []), context)
+    writer.end()
+
+
+def create_svg_layer_attributes(layer):
+    """Returns the attributes of the SVG group of a layer."""
     # Inkscape only supports style tag (Opacity/Visibility DID NOT work)
     style_parts = [
         f"display:{'inline' if layer.get('isVisible') else 'none'}",
@@ -77,43 +222,28 @@ def create_svg_layer(layer, defs):
     ]
     style_layer = ";".join(style_parts)
 
-    svg_layer = ET.Element("g", {
+    return {
         "id": layer.get("name"),
         "style": style_layer,
-    })
-    elements = layer.get("elements", [])
-    for element in elements:
-        # if the element is a group
-        if element.get("groupElements", []):
-            # Process groups recursively
-            svg_group = create_svg_group(element, defs)
-            svg_layer.append(svg_group)
-
-        # if it is not a group
-        else:
-            # Process individual elements
-            print(f"ELEMENT: {element}")
-            print(f"ELEMENTNAME: {element.get('name')}")
-            svg_element, gradient = create_svg_element(element)
-            svg_layer.append(svg_element)
-            if gradient is not None:  # went through svg_path and got gradient
-                defs.append(gradient)  # add gradient to defs
-
-    return svg_layer
+    }
 
 
-def create_svg_group(group_element, defs):
+def write_svg_group(writer, group_element, context):
     """
-    Recursively creates an SVG group element and its child elements.
+    Writes an SVG group element and its child elements.
 
     Args:
+        writer (SvgWriter): Writer to output the group to.
         group_element (dict): A dictionary representing a group element.
-        defs: An svg defs to define gradients.
-
-    Returns:
-        ET.Element: An SVG group element with nested child elements.
+        context (ExportContext): Export options and state.
     """
-    root_transform = group_element.get("localTransform", {})
+    writer.start("g", styled(create_svg_group_attributes(group_element, context), context))
+    write_svg_elements(writer, group_element.get("groupElements", []), context)
+    writer.end()
+
+
+def create_svg_group_attributes(group_element, context):
+    """Returns the attributes of the SVG group of a group element."""
     style_parts = [
         f"display:{'none' if group_element.get('isHidden') else 'inline'}",
         f"opacity:{group_element.get('opacity', 1)}",
@@ -121,134 +251,279 @@ def create_svg_group(group_element, defs):
     ]
     style_group = ";".join(style_parts)
 
-    svg_group = ET.Element("g", {
+    return {
         "id": group_element.get("name"),
         "style": style_group,
-        "transform": tp.create_group_transform(root_transform)
-    })
+        "transform": group_transform(group_element, context)
+    }
 
-    # Recursively process group elements
-    group_elements = group_element.get("groupElements", [])
-    for child in group_elements:
-        if child.get("groupElements", []):
-            # Recursively process nested groups
-            nested_group = create_svg_group(child, defs)
-            svg_group.append(nested_group)
-        else:
-            # Process individual elements
-            svg_group_element, gradient = create_svg_element(child)
-            if gradient is not None:  # went through svg_path and got gradient
-                defs.append(gradient)  # add gradient to defs
 
-            svg_group.append(svg_group_element)
+def write_svg_elements(writer, elements, context):
+    """
+    Writes elements defined in VI Decoders.traverse_element(), groups with their children.
 
-    return svg_group
+    Nested groups are walked with an explicit stack instead of recursion, so the
+    nesting depth is only limited by memory. The element timer of a group is open
+    until its last child is written (profiler element times are self times).
+    """
+    # (iterator of the children, element timer of the open group)
+    stack = [(iter(elements), None)]
+    try:
+        while stack:
+            for element in stack[-1][0]:
+                if context.skip_hidden and is_hidden(element):
+                    continue
+                timer = context.profiler.element(element)
+                # if the element is a group, its children are written next
+                if element.get("groupElements", []):
+                    timer.__enter__()
+                    writer.start("g", styled(create_svg_group_attributes(element, context), context))
+                    stack.append((iter(element["groupElements"]), timer))
+                    break
 
+                # Process individual elements
+                with timer:
+                    write_svg_element(writer, element, context)
+            else:
+                # all children written: close the group
+                _, timer = stack.pop()
+                if timer is not None:
+                    writer.end()
+                    timer.__exit__(None, None, None)
+    except BaseException as error:
+        # close the timers of the open groups like nested with-statements would
+        while stack:
+            _, timer = stack.pop()
+            if timer is not None:
+                timer.__exit__(type(error), error, error.__traceback__)
+        raise
+
+
+def write_svg_events(writer, events, context):
+    """
+    Writes layers and elements from VI Decoders.iter_gid_json() events as they come.
 
-def create_svg_element(element):
+    Returns the gradients used by the paths, to be written in a <defs>.
+    """
+    gradients = []
+    # element timers of the open groups
+    timers = []
+    # nesting level inside a skipped (hidden) layer or group
+    skipped = 0
+    try:
+        for event, item in events:
+            if skipped:
+                if event == d.LAYER_START or event == d.GROUP_START:
+                    skipped += 1
+                elif event == d.LAYER_END or event == d.GROUP_END:
+                    skipped -= 1
+                continue
+            if event != d.LAYER_END and event != d.GROUP_END:
+                if context.skip_hidden and is_hidden(item):
+                    skipped = 0 if event == d.ELEMENT else 1
+                    continue
+
+            if event == d.ELEMENT:
+                with context.profiler.element(item):
+                    if is_path(item):
+                        with context.profiler.stage("gradients"):
+                            gradient = create_svg_gradient(item, context)
+                        if gradient is not None:
+                            gradients.append(gradient)
+                    write_svg_element(writer, item, context)
+            elif event == d.GROUP_START:
+                timer = context.profiler.element(item, "group")
+                timer.__enter__()
+                timers.append(timer)
+                writer.start("g", styled(create_svg_group_attributes(item, context), context))
+            elif event == d.GROUP_END:
+                writer.end()
+                timers.pop().__exit__(None, None, None)
+            elif event == d.LAYER_START:
+                writer.start("g", styled(create_svg_layer_attributes(item), context))
+            elif event == d.LAYER_END:
+                writer.end()
+    except BaseException as error:
+        while timers:
+            timers.pop().__exit__(type(error), error, error.__traceback__)
+        raise
+    return gradients
+
+
+def write_svg_element(writer, element, context):
+    """Creates and writes the SVG element of an element that is not a group."""
+    dg.EXPORT.debug("element %s: %r", element.get("name"), element)
+    svg_element = create_svg_element(element, context)
+    if context.style_sheet is not None and svg_element is not None:
+        for node in svg_element.iter():
+            node.attrib = context.style_sheet.apply(node.attrib)
+    with context.profiler.stage("serialize"):
+        writer.element(svg_element)
+
+
+def create_svg_element(element, context=None):
     """
     Converts an element defined in VI Decoders.traverse_element() to an SVG element.
     """
     if element.get("imageData"):
         # convert to image element
-        return create_svg_image(element)
+        return create_svg_image(element, context)
     elif element.get("styledText"):
         # convert to text element
-        return create_svg_text(element)
+        return create_svg_text(element, context)
     elif element.get("pathGeometry"):
         # convert to path element
-        return create_svg_path(element)
+        return create_svg_path(element, context)
 
 
-def create_svg_path(path_element):
+def group_transform(element, context, keep_proportion=False):
+    """Returns the (cached) transform attribute of an element."""
+    transform = element.get("localTransform") or {}
+    if keep_proportion:
+        return context.cache.get("textTransforms", element.get("localTransformId"),
+                                 tp.create_group_transform, transform, True)
+    return context.cache.get("localTransforms", element.get("localTransformId"),
+                             tp.create_group_transform, transform)
+
+
+def style_table(context):
+    """
+    Returns the VI path styles.StyleTable of the document, built on first use.
+
+    The tables come from the document decoded with the same DecodeCache, they are
+    empty (entries converted when used) if elements were not decoded with it.
+    Its hit/miss counts are added to the DecodeCache stats.
+    """
+    if context.style_table is None:
+        document = context.cache.document
+        if document is None:
+            context.style_table = sp.StyleTable()
+        else:
+            fill_ids, stroke_style_ids = document.style_ids()
+            context.style_table = sp.StyleTable(document.fills, document.path_stroke_styles,
+                                                fill_ids, stroke_style_ids)
+        context.cache.add_counters(context.style_table)
+    return context.style_table
+
+
+def create_svg_path(path_element, context=None):
     """
     Converts an element defined in VI Decoders.traverse_element() to an SVG path.
     """
+    if context is None:
+        context = ExportContext()
 
+    styles = style_table(context)
     stroke_style = path_element.get("strokeStyle", None)
     fill_style = path_element.get("fill")
-    fill_id = path_element.get("fillId")
 
-    # Decode stroke style only if it exists
+    # style fragments converted once per document (VI path styles.StyleTable)
     if stroke_style:
-        decoded_stroke_style = sp.decode_stroke_style(stroke_style)
-        stroke = decoded_stroke_style.get("stroke", "none")
-        stroke_width = decoded_stroke_style.get("stroke-width")
-        stroke_opacity = decoded_stroke_style.get("stroke-opacity")
-        stroke_linecap = decoded_stroke_style.get("stroke-linecap")
-        stroke_dasharray = decoded_stroke_style.get("stroke-dasharray")
-        stroke_linejoin = decoded_stroke_style.get("stroke-linejoin")
-    else:
-        stroke = "none"
-        stroke_width = "0"
-        stroke_opacity = "1"
-        stroke_linecap = "butt"
-        stroke_dasharray = ""
-        stroke_linejoin = "miter"
-
-    # Decode fill only if it exists
-    if fill_style:
-        decoded_fill = sp.decode_fill(fill_style)
-        gradient = decoded_fill.get("gradient")
-        if gradient:
-            svg_gradient_element = sp.create_gradient_element(
-                decoded_fill, path_element.get("localTransform"), fill_id)
-            gradient_name = f"gradient{fill_id}"
-            gradient_url = f"url(#{gradient_name})"
-            fill_opacity = "1"
-        else:
-            svg_gradient_element = None
-            gradient_url = None
-            fill = decoded_fill.get("fill")
-            fill_opacity = decoded_fill.get("fill-opacity")
+        stroke = styles.stroke(path_element.get("strokeStyleId"), stroke_style)
     else:
-        svg_gradient_element = None
-        gradient_url = None
-        fill = "none"
-        fill_opacity = "1"
+        stroke = sp.NO_STROKE
 
-    # Create style attribute
-    style_parts = [
-        f"display:{'none' if path_element.get('isHidden') else 'inline'}",
-        f"mix-blend-mode:{sp.blend_mode_to_svg(path_element.get('blendMode', 1))}",
-        f"opacity:{path_element.get('opacity', 1)}",
-        f"fill:{gradient_url or fill or 'none'}",
-        f"fill-opacity:{fill_opacity}",
-        f"fill-rule:{'nonzero'}",  # ? nonzero or evenodd ?
-        f"stroke:{stroke}",
-        f"stroke-width:{stroke_width}",
-        f"stroke-opacity:{stroke_opacity}",
-        f"stroke-linecap:{stroke_linecap}",
-        f"stroke-dasharray:{stroke_dasharray}",
-        f"stroke-linejoin:{stroke_linejoin}"
-    ]
-    style = ";".join(style_parts)
+    # (gradient itself is created by create_svg_gradient())
+    fill = sp.NO_FILL
+    if fill_style:
+        fill = styles.fill(path_element.get("fillId"), fill_style)
+        if fill is None:
+            gradient_name = f"gradient{gradient_id(path_element, context)[0]}"
+            fill = f"fill:url(#{gradient_name});fill-opacity:1"
 
-    geometries = path_element.get("pathGeometry")
-    transformed = []
+    # ? fill-rule: nonzero or evenodd ?
+    style = styles.path_style(path_element.get("isHidden"), path_element.get("blendMode", 1),
+                              path_element.get("opacity", 1), fill, stroke)
 
-    for path in geometries:
-        print(path)
-        transformed.append(tp.apply_transform(
-            path, path_element.get("localTransform")))
+    # elements sharing geometries and transform share the path data
+    geometry_key = (tuple(path_element.get("geometryIds") or ()),
+                    path_element.get("localTransformId"))
+    if not geometry_key[0] or geometry_key[1] is None:
+        geometry_key = None
 
     attributes = {
         "id": path_element.get("name"),
         "style": style,
-        "d": path_geometry_to_svg_path(transformed)
+        "d": context.cache.get_shared("pathData", geometry_key,
+                                      transformed_path_data, path_element, context)
     }
 
-    # add gradient to defs if exists
-    return ET.Element("path", attributes), svg_gradient_element
+    return ET.Element("path", attributes)
+
+
+def transformed_path_data(path_element, context):
+    """Returns path data (d=) of all geometries of an element with its localTransform applied."""
+    transformed = []
+
+    with context.profiler.stage("transform"):
+        for path in path_element.get("pathGeometry"):
+            dg.TRANSFORM.debug("geometry: %r", path)
+            transformed.append(tp.apply_transform(
+                path, path_element.get("localTransform")))
+            context.profiler.count("nodes", len(path))
+
+    with context.profiler.stage("path_data"):
+        return pe.encode_path_geometries(transformed, context.precision)
 
 
-def create_svg_image(image_element):
+def gradient_id(path_element, context):
+    """
+    Returns (id, is_new) of the gradient used by a gradient-filled element.
+
+    Elements with the same fill and transform share one gradient.
+    The first gradient of fillId N is "N", others are "N-1", "N-2"...
+    """
+    fill_id = path_element.get("fillId")
+    key = (fill_id, group_transform(path_element, context))
+    if key in context.gradient_ids:
+        return context.gradient_ids[key], False
+
+    count = context.gradient_counts.get(fill_id, 0)
+    context.gradient_counts[fill_id] = count + 1
+    new_id = f"{fill_id}" if count == 0 else f"{fill_id}-{count}"
+    context.gradient_ids[key] = new_id
+    return new_id, True
+
+
+def create_svg_gradient(path_element, context=None):
+    """
+    Creates the gradient used by an element defined in VI Decoders.traverse_element().
+
+    Returns None if the element is not filled with gradient,
+    or if the same gradient was already created in this context.
+    """
+    if context is None:
+        context = ExportContext()
+    fill_style = path_element.get("fill")
+    if not fill_style:
+        return None
+
+    styles = style_table(context)
+    fill_id = path_element.get("fillId")
+    if styles.fill(fill_id, fill_style) is not None:
+        return None
+
+    new_id, is_new = gradient_id(path_element, context)
+    if not is_new:
+        return None
+
+    gradient, stop_styles = styles.gradient(fill_id, fill_style)
+    return sp.create_gradient_element(
+        gradient, path_element.get("localTransform"), new_id, stop_styles)
+
+
+def create_svg_image(image_element, context=None):
     """
     Converts an element defined in VI Decoders.traverse_element() to an SVG image.
     """
-    image = image_element.get("imageData", "")  # b64 data
-    transform = image_element.get("localTransform")
-    img_format, _, _ = detect_image_format_and_size(image)
+    if context is None:
+        context = ExportContext()
+    image = image_element.get("imageData", b"")  # bitmap bytes (model.Lazy)
+
+    # the same bitmap is encoded/written once (embedded ones are streamed by the writer):
+    # the href is kept from the first use, a DataUri or a path is small
+    href = context.cache.get(
+        "imageHrefs", image_element.get("imageDataId"), image_href, image, context)
 
     # Create style attribute
     style_parts = [
@@ -261,106 +536,117 @@ def create_svg_image(image_element):
     attributes = {
         "id": image_element.get("name"),
         "preserveAspectRatio": "none",
-        "transform": tp.create_group_transform(transform),
+        "transform": group_transform(image_element, context),
         "style": style,
-        "xlink:href": f"data:image/{str(img_format).lower()};base64,{image}"
+        "xlink:href": href
     }
 
-    # no gradient unlike create_svg_path
-    return ET.Element("image", attributes), None
+    return ET.Element("image", attributes)
+
+
+def image_href(image, context):
+    """
+    Returns href of bitmap data (data: URI, or path of the external file).
+
+    Embedded archive members are returned as writers.DataUri, streamed into the
+    output without reading the whole bitmap.
+    """
+    if context.image_store is None and hasattr(image, "chunks"):
+        img_format = ti.detect_image_format(image.header())
+        context.profiler.count("images")
+        context.profiler.count("image_bytes", image.size())
+        return wr.DataUri(ti.image_mime_type(img_format), image.chunks)
+
+    image = m.resolve(image)
+    img_format = ti.detect_image_format(image)
+    context.profiler.count("images")
+    context.profiler.count("image_bytes", len(image))
+
+    with context.profiler.stage("images"):
+        if context.image_store is not None:
+            return context.image_store.add(image, img_format)
+        return f"data:{ti.image_mime_type(img_format)};base64,{base64.b64encode(image).decode('ascii')}"
 
 
-def create_svg_text(text_element):
+def create_svg_text(text_element, context=None):
     """
     Converts an element defined in VI Decoders.traverse_element() to an SVG text with multiple tspans for styled text.
     """
+    if context is None:
+        context = ExportContext()
     styled_text = text_element.get("styledText", {})
-    transform = text_element.get("localTransform", {})
     string = styled_text.get("string", "")
 
-    style_properties = {
-        "fontName": {"values": styled_text.get("fontName", {}).get("values", []), "default": "sans-serif"},
-        "fontSize": {"values": styled_text.get("fontSize", {}).get("values", []), "default": 16},
-        "fillColor": {"values": styled_text.get("fillColor", {}).get("values", []), "default": None},
-        "alignment": {"values": styled_text.get("alignment", {}).get("values", []), "default": 0},
-    }
-
     attributes = {
         "id": text_element.get("name", ""),
-        "transform": tp.create_group_transform(transform, keep_proportion=True),
+        "transform": group_transform(text_element, context, keep_proportion=True),
         "y": "0"
     }
     text_svg_element = ET.Element("text", attributes)
 
-    current_index = 0
-    last_upper_bound = 0
-    current_styles = {}
     current_x = 0 # 現在の x 座標を追跡
-    previous_tspan_length = 0 # 直前の tspan の文字数を追跡
-
-    while current_index < len(string):
-        next_upper_bound = len(string)
-        segment_styles = {}
-
-		# check the range of style
-        for style_name, style_data in style_properties.items():
-            current_value = style_data["default"] # set the default value
-            for range_item in style_data["values"]:
-                if last_upper_bound < range_item["upperBound"]:
-                    current_value = range_item["value"]
-                    next_upper_bound = min(next_upper_bound, range_item["upperBound"])
-                    break
-            segment_styles[style_name] = current_value
 
-        segment_text = string[current_index:next_upper_bound]
+    # one run per style change (VI text tools.style_runs()), its style is built once
+    for start, end, run in tt.style_runs(styled_text, len(string)):
+        segment_style = tspan_style(run, context)
+        font_size = run[1]
+        segment_text = string[start:end]
 
         lines = segment_text.split('\n')
         for i, line in enumerate(lines):
             if not line and i < len(lines) -1 :
-                tspan = create_svg_tspan("", segment_styles, is_new_line=True) # 空行の場合はテキストなしで tspan 生成
+                tspan = create_svg_tspan("", segment_style, is_new_line=True) # 空行の場合はテキストなしで tspan 生成
                 text_svg_element.append(tspan)
                 current_x = 0
                 continue
 
             is_new_line = i > 0 # 2行目以降は改行後の行
-            tspan = create_svg_tspan(line, segment_styles, is_new_line=is_new_line)
+            tspan = create_svg_tspan(line, segment_style, is_new_line=is_new_line)
             text_svg_element.append(tspan)
 
             # 次の tspan の x 座標を更新 (簡易的な幅計算)
             # ここではフォントサイズを基準に概算で幅を計算 (調整が必要な場合があります)
-             # **修正点:** 次の tspan の x 座標を文字数とフォントサイズから計算
-            current_x += segment_styles["fontSize"] * 0.5 * len(line) # 係数を 0.5 に調整 (微調整が必要な場合あり)
-            previous_tspan_length = len(line)
+            current_x += font_size * 0.5 * len(line) # 係数を 0.5 に調整 (微調整が必要な場合あり)
 
-        current_index = next_upper_bound
-        last_upper_bound = next_upper_bound
         if "\n" in segment_text: # 改行があったら x 座標をリセット
             current_x = 0
 
-    return text_svg_element, None
+    return text_svg_element
+
 
+def tspan_style(run, context):
+    """
+    Returns the style of a tspan from the values of a run (see VI text tools.style_runs()).
 
-def create_svg_tspan(text, styles, is_new_line=False):
+    The fill color is converted once per run, and the style string is built once per
+    unique (font, size, color, alignment) of the document.
+    """
+    font_name, font_size, fill_color, alignment = run
+    rgba = sp.color_to_rgb_tuple(fill_color) if fill_color else None
+    key = (font_name, font_size, rgba, alignment)
+    style = context.tspan_styles.get(key)
+    if style is None:
+        style = ""
+        if rgba is not None:
+            style += f"fill:{sp.rgba_to_hex(rgba)};fill-opacity:{rgba[3]};"
+        style += f"font-family:{font_name};font-size:{font_size}px;text-anchor:{tt.get_text_anchor(alignment)};"
+        context.tspan_styles[key] = style
+    return style
+
+
+def create_svg_tspan(text, style, is_new_line=False):
     """
     Generates tspan data from text and its style.
 
     Args:
         text (str): text data.
-        styles (dict): style data (fillColor, fontName, fontSize, alignment).
+        style (str): style attribute (see tspan_style()).
         is_new_line (bool): new line or not.
 
     Returns:
         xml.etree.ElementTree.Element: generated tspan.
     """
-    tspan_style_str = ""
-    if styles.get("fillColor"):
-        fill_color_data = styles["fillColor"]
-        fill_color_hex = sp.rgba_to_hex(sp.color_to_rgb_tuple(fill_color_data))
-        fill_opacity = str(sp.color_to_rgb_tuple(fill_color_data)[3])
-        tspan_style_str += f"fill:{fill_color_hex};fill-opacity:{fill_opacity};"
-    tspan_style_str += f"font-family:{styles['fontName']};font-size:{styles['fontSize']}px;text-anchor:{tt.get_text_anchor(styles['alignment'])};"
-
-    tspan_attributes = {"style": tspan_style_str, "x": "1em"}
+    tspan_attributes = {"style": style, "x": "1em"}
     if is_new_line:
         tspan_attributes["dy"] = "1em" # potential issue
     tspan = ET.Element("tspan", tspan_attributes)
@@ -386,73 +672,14 @@ def create_svg_header(artboard):
 
     # Create the SVG element
     svg_header = ET.Element("svg", {
+        "xmlns:xlink": "http://www.w3.org/1999/xlink",
+        "xmlns": "http://www.w3.org/2000/svg",
+        "xmlns:svg": "http://www.w3.org/2000/svg",
         "width": str(width),
         "height": str(height),
         "viewBox": f"0 0 {width} {height}",
         "version": "1.1",
         "id": f"{title}",
-        "xmlns:xlink": "http://www.w3.org/1999/xlink",
-        "xmlns": "http://www.w3.org/2000/svg",
-        "xmlns:svg": "http://www.w3.org/2000/svg",
     })
 
     return svg_header
-
-
-def path_geometry_to_svg_path(datas):
-    """Converts pathGeometry array data to svg path (d={path})."""
-    svg_paths = []
-
-    # Iterate through all path geometries
-    for path_geometry in datas:
-        # Convert the geometry to an SVG path and append it
-        svg_paths.append(single_path_geometry_to_svg_path(path_geometry))
-
-    # Join all path strings with spaces
-    return " ".join(svg_paths)
-
-
-def single_path_geometry_to_svg_path(data):
-    """Converts single pathGeometry data to svg path (d={path})."""
-    nodes = data["nodes"]
-    closed = data.get("closed", False)
-    svg_path = ""
-
-    # start from initial anchor point
-    first_node = nodes[0]
-    svg_path += f"M {first_node['anchorPoint'][0]} {first_node['anchorPoint'][1]} "
-
-    # process each nodes in order
-    for i, node in enumerate(nodes[1:], start=1):
-        anchor = node["anchorPoint"]
-        in_point = node.get("inPoint", anchor)
-        out_point = nodes[i - 1].get("outPoint", nodes[i - 1]["anchorPoint"])
-
-        # bezier curve
-        svg_path += f"C {out_point[0]} {out_point[1]} {in_point[0]} {in_point[1]} {anchor[0]} {anchor[1]} "
-
-    # close path option
-    if closed:
-        # adds a curve which connects last node and first node
-        last_node = nodes[-1]
-        out_point = last_node.get("outPoint", last_node["anchorPoint"])
-        in_point = first_node.get("inPoint", first_node["anchorPoint"])
-        svg_path += f"C {out_point[0]} {out_point[1]} {in_point[0]} {in_point[1]} {first_node['anchorPoint'][0]} {first_node['anchorPoint'][1]} "
-        svg_path += "Z"
-
-    return svg_path
-
-
-def detect_image_format_and_size(base64_image):
-    """Detect the image format and dimension of b64 encoded image."""
-    # Decode Base64 image and convert to binary
-    binary_data = base64.b64decode(base64_image)
-
-    # Load image in Pillow
-    image = Image.open(BytesIO(binary_data))
-
-    # Get image format（JPEG, PNG） and dimension
-    image_format = image.format  # 例: 'PNG'
-    width, height = image.size   # 幅と高さ (ピクセル単位)
-
-    return image_format, width, height
@@ -5,50 +5,167 @@ reads Vectornator / Linearity Curve JSON data from .vectornator or .curve files.
 """
 
 
-import base64
-import json
 import logging
+import mmap
+import struct
+import threading
 import zipfile
-from typing import Any, Dict
 
+import model as m
+import tools_json as tj
 
-def read_json_from_zip(archive: zipfile.ZipFile, file_name: str) -> Dict[str, Any]:
-    """Reads JSON file from zip (Vectornator file)."""
+# bytes per chunk when streaming members, a multiple of 3 so base64 needs no carry
+CHUNK_SIZE = 3 << 16
+
+# local file header: signature ... file name length, extra field length
+LOCAL_HEADER = struct.Struct("<4s22xHH")
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+
+def read_json_from_zip(archive: zipfile.ZipFile, file_name: str,
+                       incremental: bool = False) -> dict:
+    """
+    Reads JSON file from zip (Vectornator file).
+
+    With `incremental`, top-level tables are parsed one by one and large ones
+    are kept as JSON text until accessed (see VI JSON tools).
+    """
     try:
         with archive.open(file_name) as f:
-            return json.load(f)
+            if incremental:
+                return tj.loads_gid_json(f.read())
+            return tj.loads(f.read())
     except Exception as e:
         logging.error(f"Failed to read or parse JSON file '{file_name}': {e}")
         raise
 
 
-def read_dat_from_zip(archive: zipfile.ZipFile, file_name: str) -> str:
-    """Encode dat (bitmap) file from zip (Vectornator file) in Base64 string."""
+def read_dat_from_zip(archive: zipfile.ZipFile, file_name: str) -> bytes:
+    """Read dat (bitmap) file from zip (Vectornator file) as raw bytes."""
     try:
-        with archive.open(file_name, "r") as f:
-            return base64.b64encode(f.read()).decode('utf-8')
+        return archive.read(file_name)
     except Exception as e:
         logging.error(
-            f"Failed to read or encode bitmap file '{file_name}': {e}")
+            f"Failed to read bitmap file '{file_name}': {e}")
         raise
 
 
-def extract_manifest(archive: zipfile.ZipFile) -> Dict[str, Any]:
+class ZipMember(m.Lazy):
+    """
+    Lazy reference to a bitmap (.dat member) of the archive.
+
+    resolve() reads it as bytes (once per `key` if a DecodeCache is given),
+    chunks() streams it without reading the whole member.
+    """
+    __slots__ = ("archive", "name")
+
+    def __init__(self, archive: zipfile.ZipFile, name: str, cache=None, key=None):
+        if cache is None:
+            super().__init__(read_dat_from_zip, archive, name)
+        else:
+            super().__init__(cache.get, "imageDatas", key, read_dat_from_zip, archive, name)
+        self.archive = archive
+        self.name = name
+
+    def __repr__(self):
+        return f"<zip member {self.name!r}>"
+
+    def size(self) -> int:
+        """Returns the uncompressed size."""
+        return self.archive.getinfo(self.name).file_size
+
+    def header(self, size: int = 16) -> bytes:
+        """Returns the first bytes (enough to detect the image format)."""
+        with self.archive.open(self.name) as member:
+            return member.read(size)
+
+    def chunks(self, chunk_size: int = CHUNK_SIZE):
+        """
+        Yields the content in chunks of `chunk_size` bytes.
+
+        Stored (uncompressed) members of an archive file are memory-mapped and
+        yielded as memoryviews, which are released after each step.
+        """
+        info = self.archive.getinfo(self.name)
+        file_name = getattr(self.archive, "filename", None)
+        if info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1 and file_name:
+            yield from mapped_chunks(file_name, info, chunk_size)
+            return
+        with self.archive.open(self.name) as member:
+            while True:
+                chunk = member.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+
+def mapped_chunks(file_name: str, info: zipfile.ZipInfo, chunk_size: int = CHUNK_SIZE):
+    """Yields memoryviews of a stored member of the zip file `file_name`."""
+    with open(file_name, "rb") as zip_file, \
+            mmap.mmap(zip_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        offset = info.header_offset
+        signature, name_length, extra_length = LOCAL_HEADER.unpack_from(mapped, offset)
+        if signature != LOCAL_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile(f"Bad local header of '{info.filename}'")
+        start = offset + LOCAL_HEADER.size + name_length + extra_length
+        end = start + info.compress_size
+        with memoryview(mapped) as view:
+            for chunk_start in range(start, end, chunk_size):
+                chunk = view[chunk_start:min(chunk_start + chunk_size, end)]
+                try:
+                    yield chunk
+                finally:
+                    chunk.release()
+
+
+def extract_manifest(archive: zipfile.ZipFile) -> dict:
     """Extract and parse the Manifest.json."""
     return read_json_from_zip(archive, "Manifest.json")
 
 
-def extract_document(archive: zipfile.ZipFile, manifest: Dict[str, Any]) -> Dict[str, Any]:
+def extract_document(archive: zipfile.ZipFile, manifest: dict) -> dict:
     """Extract and parse the Document.json specified in the Manifest."""
     document_name = manifest.get("documentJSONFilename", "Document.json")
     return read_json_from_zip(archive, document_name)
 
 
-def extract_drawing_data(document: Dict[str, Any]) -> Dict[str, Any]:
+def extract_drawing_data(document: dict) -> dict:
     """Return the 'drawing' data from the Document.json."""
     return document.get("drawing", {})
 
 
-def extract_gid_json(archive: zipfile.ZipFile, artboard_path: str) -> Dict[str, Any]:
-    """Extract and parse a GUID JSON file (artboard)."""
-    return read_json_from_zip(archive, artboard_path)
+def extract_gid_json(archive: zipfile.ZipFile, artboard_path: str,
+                     incremental: bool = False) -> dict:
+    """Extract and parse a GUID JSON file (artboard), see read_json_from_zip()."""
+    return read_json_from_zip(archive, artboard_path, incremental)
+
+
+class SharedArchive:
+    """
+    Zip archive shared by the artboards of a document (VI convert_all_artboards()).
+
+    Can be used in place of the ZipFile. Members read by read() (bitmaps) are kept,
+    so a bitmap used by many artboards is read and decompressed only once.
+    """
+
+    def __init__(self, archive: zipfile.ZipFile):
+        self.archive = archive
+        self.filename = archive.filename
+        self.members = {}
+        self.lock = threading.Lock()
+
+    def open(self, file_name: str):
+        """Opens a member (ZipFile.open() is thread-safe for reading)."""
+        return self.archive.open(file_name)
+
+    def getinfo(self, file_name: str) -> zipfile.ZipInfo:
+        """Returns ZipInfo of a member."""
+        return self.archive.getinfo(file_name)
+
+    def read(self, file_name: str) -> bytes:
+        """Reads a member once and returns the same bytes afterwards."""
+        with self.lock:
+            data = self.members.get(file_name)
+            if data is None:
+                data = self.members[file_name] = self.archive.read(file_name)
+        return data
@@ -0,0 +1,457 @@
+"""
+VI model
+
+indexed document model, built once from Linearity Curve (5.x) GUID JSON (artboard).
+
+Structural tables (elements, stylables, abstractPaths...) become lists of small records
+with their `subElement` references already resolved to integers, so traversal is plain
+attribute and list access.
+
+Payload tables (localTransforms, fills, pathStrokeStyles, texts...) are what the
+exporters consume, so their entries are kept as the original dicts (not copied).
+pathGeometries entries are converted to compact PathGeometry when first used.
+"""
+
+
+from array import array
+
+# shared default for missing references (never modified)
+NO_REFERENCE = {}
+
+
+def sub_element_id(data, name):
+    """Returns `data["subElement"][name]["_0"]` or None."""
+    return data.get("subElement", NO_REFERENCE).get(name, NO_REFERENCE).get("_0")
+
+
+class Layer:
+    """Record of `layers`."""
+    __slots__ = ("name", "opacity", "is_visible", "is_locked", "is_expanded",
+                 "element_ids")
+
+    def __init__(self, data):
+        self.name = data.get("name", "Unnamed Layer")
+        self.opacity = data.get("opacity", 1)
+        self.is_visible = data.get("isVisible", True)
+        self.is_locked = data.get("isLocked", False)
+        self.is_expanded = data.get("isExpanded", False)
+        self.element_ids = data.get("elementIds", [])
+
+
+class Element:
+    """Record of `elements`."""
+    __slots__ = ("name", "is_hidden", "opacity", "blend_mode", "blur",
+                 "local_transform_id", "image_id", "stylable_id", "group_id")
+
+    def __init__(self, data):
+        self.name = data.get("name", "Unnamed Element")
+        self.is_hidden = data.get("isHidden", False)
+        self.opacity = data.get("opacity", 1)
+        self.blend_mode = data.get("blendMode", 0)
+        self.blur = data.get("blur", 0)
+        self.local_transform_id = data.get("localTransformId")
+        sub_element = data.get("subElement", NO_REFERENCE)
+        self.image_id = sub_element.get("image", NO_REFERENCE).get("_0")
+        self.stylable_id = sub_element.get("stylable", NO_REFERENCE).get("_0")
+        self.group_id = sub_element.get("group", NO_REFERENCE).get("_0")
+
+
+class Image:
+    """Record of `images`."""
+    __slots__ = ("image_data_id",)
+
+    def __init__(self, data):
+        # sharedFileImage doesn't exist in 5.1.1 (file version 21) document
+        self.image_data_id = data.get("imageData", NO_REFERENCE).get(
+            "sharedFileImage", NO_REFERENCE).get("_0")
+
+
+class ImageData:
+    """Record of `imageDatas`."""
+    __slots__ = ("relative_path",)
+
+    def __init__(self, data):
+        # relativePath contains *.dat (bitmap data)
+        self.relative_path = data.get("relativePath", "")
+
+
+class Stylable:
+    """Record of `stylables`."""
+    __slots__ = ("abstract_path_id", "abstract_text_id", "single_style_id")
+
+    def __init__(self, data):
+        sub_element = data.get("subElement", NO_REFERENCE)
+        self.abstract_path_id = sub_element.get(
+            "abstractPath", NO_REFERENCE).get("_0")
+        self.abstract_text_id = sub_element.get(
+            "abstractText", NO_REFERENCE).get("_0")
+        #! singleStyle (NON-EXISTENT in latest format, found in fileVersion 21)
+        self.single_style_id = sub_element.get(
+            "singleStyle", NO_REFERENCE).get("_0")
+
+
+class AbstractPath:
+    """Record of `abstractPaths`."""
+    __slots__ = ("stroke_style_id", "fill_id", "path_id", "compound_path_id")
+
+    def __init__(self, data):
+        self.stroke_style_id = data.get("strokeStyleId")
+        self.fill_id = data.get("fillId")
+        sub_element = data.get("subElement", NO_REFERENCE)
+        self.path_id = sub_element.get("path", NO_REFERENCE).get("_0")
+        self.compound_path_id = sub_element.get(
+            "compoundPath", NO_REFERENCE).get("_0")
+
+
+class Path:
+    """Record of `paths`."""
+    __slots__ = ("geometry_id",)
+
+    def __init__(self, data):
+        self.geometry_id = data.get("geometryId")
+
+
+class CompoundPath:
+    """Record of `compoundPaths`."""
+    __slots__ = ("subpath_ids",)
+
+    def __init__(self, data):
+        self.subpath_ids = data.get("subpathIds") or []
+
+
+class AbstractText:
+    """Record of `abstractTexts`."""
+    __slots__ = ("text_id", "styled_text_id")
+
+    def __init__(self, data):
+        self.text_id = data.get("textId")
+        self.styled_text_id = sub_element_id(data, "text")
+
+
+class Group:
+    """Record of `groups`."""
+    __slots__ = ("element_ids",)
+
+    def __init__(self, data):
+        self.element_ids = data.get("elementIds", [])
+
+
+class PathGeometry:
+    """
+    Compact pathGeometry: the points of all nodes in one flat array of floats.
+
+    `points` holds 6 floats per node (anchorPoint, inPoint, outPoint as x, y): an
+    array("d"), or a NumPy array once transformed by VI path tools.
+    `node_types` and `corner_radii` hold one value per node.
+    """
+    __slots__ = ("closed", "points", "node_types", "corner_radii")
+
+    def __init__(self, closed, points, node_types, corner_radii):
+        self.closed = closed
+        self.points = points
+        self.node_types = node_types
+        self.corner_radii = corner_radii
+
+    def __len__(self):
+        return len(self.node_types)
+
+    def __repr__(self):
+        return f"<PathGeometry {len(self)} nodes{' closed' if self.closed else ''}>"
+
+    def to_json(self):
+        """Returns the pathGeometry dict ({"closed": bool, "nodes": [...]})."""
+        points = list(self.points)
+        return {
+            "closed": self.closed,
+            "nodes": [{
+                "anchorPoint": points[offset:offset + 2],
+                "inPoint": points[offset + 2:offset + 4],
+                "outPoint": points[offset + 4:offset + 6],
+                "nodeType": node_type,
+                "cornerRadius": corner_radius,
+            } for offset, node_type, corner_radius in zip(
+                range(0, len(points), 6), self.node_types, self.corner_radii)],
+        }
+
+
+def path_geometry(data):
+    """Converts a pathGeometry dict to PathGeometry (PathGeometry is returned unchanged)."""
+    if type(data) is PathGeometry:
+        return data
+    nodes = data.get("nodes", [])
+    points = []
+    for node in nodes:
+        anchor = node["anchorPoint"]
+        in_point = node.get("inPoint", anchor)
+        out_point = node.get("outPoint", anchor)
+        points += (anchor[0], anchor[1], in_point[0], in_point[1], out_point[0], out_point[1])
+    return PathGeometry(
+        data.get("closed", False),
+        array("d", points),
+        array("b", [node.get("nodeType", 0) for node in nodes]),
+        array("d", [node.get("cornerRadius", 0) for node in nodes]))
+
+
+class GeometryTable:
+    """
+    `pathGeometries` as PathGeometry, converted when an item is first accessed.
+
+    Items of a list are replaced in place (unless `keep` is False), so the JSON nodes
+    are freed. Other items (of a tools_json.LazyArray, or not kept) are converted through
+    `cache` (DecodeCache.get_shared), so geometries used by several elements are kept.
+    """
+    __slots__ = ("table", "keep", "cache")
+
+    def __init__(self, table, keep=True, cache=None):
+        self.table = table
+        self.keep = keep and type(table) is list
+        self.cache = cache
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, index):
+        if self.keep:
+            geometry = self.table[index]
+            if type(geometry) is not PathGeometry:
+                geometry = self.table[index] = path_geometry(geometry)
+            return geometry
+        if self.cache is not None:
+            return self.cache.get_shared("pathGeometries", index, self.convert, index)
+        return self.convert(index)
+
+    def convert(self, index):
+        """Returns the item as PathGeometry, without keeping it."""
+        geometry = self.table[index]
+        return geometry if type(geometry) is PathGeometry else path_geometry(geometry)
+
+
+class RecordTable:
+    """
+    Structural table whose records are built each time they are accessed (not kept).
+
+    Used by build_document(lazy=True). With `skip_empty`, empty entries are None.
+    """
+    __slots__ = ("table", "record_type", "skip_empty")
+
+    def __init__(self, table, record_type, skip_empty=False):
+        self.table = table
+        self.record_type = record_type
+        self.skip_empty = skip_empty
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, index):
+        data = self.table[index]
+        if self.skip_empty and not data:
+            return None
+        return self.record_type(data)
+
+
+class Document:
+    """
+    All tables of one GUID JSON, indexed by the ids used in the file.
+
+    With `lazy`, records are built when accessed (RecordTable) instead of all at once.
+    `keep_geometries` (default: not `lazy`) replaces converted geometries in their table,
+    otherwise `cache` (DecodeCache) keeps the shared ones.
+    """
+    __slots__ = (
+        "artboards", "layers", "elements", "images", "image_datas", "stylables",
+        "abstract_paths", "paths", "compound_paths", "abstract_texts", "groups",
+        # payload tables (original dicts, geometries as PathGeometry)
+        "local_transforms", "path_stroke_styles", "fills", "path_geometries",
+        "texts", "styled_texts", "single_styles",
+    )
+
+    def __init__(self, gid_json, lazy=False, cache=None, keep_geometries=None):
+        def records(table, record_type):
+            if lazy:
+                return RecordTable(gid_json.get(table, []), record_type)
+            return [record_type(data) for data in gid_json.get(table, [])]
+
+        self.artboards = gid_json.get("artboards", [])
+        self.layers = records("layers", Layer)
+        # empty elements are skipped by decoders
+        if lazy:
+            self.elements = RecordTable(gid_json.get("elements", []), Element, True)
+        else:
+            self.elements = [Element(data) if data else None
+                             for data in gid_json.get("elements", [])]
+        self.images = records("images", Image)
+        self.image_datas = records("imageDatas", ImageData)
+        self.stylables = records("stylables", Stylable)
+        self.abstract_paths = records("abstractPaths", AbstractPath)
+        self.paths = records("paths", Path)
+        self.compound_paths = records("compoundPaths", CompoundPath)
+        self.abstract_texts = records("abstractTexts", AbstractText)
+        self.groups = records("groups", Group)
+
+        self.local_transforms = gid_json.get("localTransforms", [])
+        self.path_stroke_styles = gid_json.get("pathStrokeStyles", [])
+        self.fills = gid_json.get("fills", [])
+        if keep_geometries is None:
+            keep_geometries = not lazy
+        self.path_geometries = GeometryTable(gid_json.get("pathGeometries", []), keep_geometries, cache)
+        self.texts = gid_json.get("texts", [])
+        self.styled_texts = gid_json.get("styledTexts", [])
+        self.single_styles = gid_json.get("singleStyles", [])
+
+    def style_ids(self):
+        """Returns the sets of fill ids and pathStrokeStyle ids referenced by abstractPaths."""
+        fill_ids, stroke_style_ids = set(), set()
+        if type(self.abstract_paths) is RecordTable:
+            # the JSON dicts, without building a record for each
+            for data in self.abstract_paths.table:
+                fill_ids.add(data.get("fillId"))
+                stroke_style_ids.add(data.get("strokeStyleId"))
+        else:
+            for abstract_path in self.abstract_paths:
+                fill_ids.add(abstract_path.fill_id)
+                stroke_style_ids.add(abstract_path.stroke_style_id)
+        fill_ids.discard(None)
+        stroke_style_ids.discard(None)
+        return fill_ids, stroke_style_ids
+
+
+class Lazy:
+    """
+    Reference to data loaded when it is used (bitmaps, geometries), see resolve().
+
+    `load(*args)` is called on every resolve(), caching is up to `load`
+    (e.g. DecodeCache.get).
+    """
+    __slots__ = ("load", "args")
+
+    def __init__(self, load, *args):
+        self.load = load
+        self.args = args
+
+    def resolve(self):
+        return self.load(*self.args)
+
+    def __repr__(self):
+        return f"<lazy {getattr(self.load, '__name__', 'value')}{self.args[:2]!r}>"
+
+
+def resolve(value):
+    """Returns the data of a Lazy reference, other values unchanged."""
+    return value.resolve() if isinstance(value, Lazy) else value
+
+
+class TableItems:
+    """Read-only list of `table[index]` for each index, looked up when accessed."""
+    __slots__ = ("table", "indexes")
+
+    def __init__(self, table, indexes):
+        self.table = table
+        self.indexes = indexes
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __getitem__(self, position):
+        return self.table[self.indexes[position]]
+
+    def __iter__(self):
+        table = self.table
+        for index in self.indexes:
+            yield table[index]
+
+    def __repr__(self):
+        return f"<items {self.indexes!r}>"
+
+
+def build_document(gid_json, lazy=False, cache=None, keep_geometries=None):
+    """
+    Builds the indexed model of a GUID JSON.
+
+    `lazy` builds records on access: nothing is done upfront and records are not kept,
+    for a single pass over the document (VI Decoders.read_gid_json(), iter_gid_json()).
+    `keep_geometries` (default: not `lazy`) replaces converted geometries in their table,
+    `cache` (DecodeCache) keeps shared geometries otherwise, see GeometryTable.
+    """
+    return Document(gid_json, lazy, cache, keep_geometries)
+
+
+class DecodeCache:
+    """
+    Per-document cache of decoded/converted table entries, keyed by (table, index).
+
+    Shared records (the same fillId, strokeStyleId, localTransformId... used by many
+    elements) are converted once. `table` may also name a conversion variant
+    (e.g. "textTransforms"), each has its own hit/miss counters.
+
+    `document` is the Document being decoded (set by VI Decoders), so that exporters
+    can convert whole tables at once (VI path styles.StyleTable).
+    """
+
+    def __init__(self):
+        self.document = None
+        self.values = {}
+        self.seen = set()
+        self.hits = {}
+        self.misses = {}
+        # objects with their own hits/misses by table (VI path styles.StyleTable)
+        self.counters = []
+
+    def get(self, table, index, decode, *args):
+        """Returns cached `decode(*args)` for the table entry. index=None is never cached."""
+        if index is None:
+            return decode(*args)
+        key = (table, index)
+        if key in self.values:
+            self.hits[table] = self.hits.get(table, 0) + 1
+            return self.values[key]
+        self.misses[table] = self.misses.get(table, 0) + 1
+        value = self.values[key] = decode(*args)
+        return value
+
+    def get_shared(self, table, index, decode, *args):
+        """
+        Same as get(), but the value is only stored once the entry is requested twice.
+
+        For large values (path data) that are usually not shared.
+        """
+        if index is None:
+            return decode(*args)
+        key = (table, index)
+        if key in self.values:
+            self.hits[table] = self.hits.get(table, 0) + 1
+            return self.values[key]
+        self.misses[table] = self.misses.get(table, 0) + 1
+        value = decode(*args)
+        if key in self.seen:
+            self.values[key] = value
+        else:
+            self.seen.add(key)
+        return value
+
+    def add_counters(self, counters):
+        """Adds the hits/misses of `counters` (e.g. a VI path styles.StyleTable) to totals()."""
+        self.counters.append(counters)
+
+    def totals(self):
+        """Returns (hits, misses) by table, including the added counters."""
+        hits, misses = dict(self.hits), dict(self.misses)
+        for counters in self.counters:
+            for table, count in counters.hits.items():
+                hits[table] = hits.get(table, 0) + count
+            for table, count in counters.misses.items():
+                misses[table] = misses.get(table, 0) + count
+        return hits, misses
+
+    def merge_stats(self, other):
+        """Adds hit/miss counts of another cache (e.g. of other artboards)."""
+        hits, misses = other.totals()
+        for table, count in hits.items():
+            self.hits[table] = self.hits.get(table, 0) + count
+        for table, count in misses.items():
+            self.misses[table] = self.misses.get(table, 0) + count
+
+    def stats(self):
+        """Returns {table: {"hits": n, "misses": n}}."""
+        hits, misses = self.totals()
+        return {table: {"hits": hits.get(table, 0), "misses": misses.get(table, 0)}
+                for table in sorted(set(hits) | set(misses))}
@@ -9,75 +9,102 @@ what works (2025/01/09): limited SVG export (no text, other units)
 """
 
 import argparse
+import json
 import logging
+import os
+import re
 import traceback
 import zipfile
 
-from packaging import version
-
 # Vectornator Inspection
 import decoders as d
+import diagnostics as dg
 import exporters as exp
 import extractors as ext
+import model as m
+import profiling as pf
+import result_cache as rc
+import tools_json as tj
+
+
+def precision_type(value):
+    """argparse type for --precision (int or "full")."""
+    if value == "full":
+        return None
+    return int(value)
+
 
 parser = argparse.ArgumentParser(description='Linearity Curve file reader')
 
 parser.add_argument('input_file', help='Linearity Curve file')
+parser.add_argument('-o', '--output', default=None,
+                    help='output svg file (default: result.svg next to the input)')
+parser.add_argument('--all-artboards', action='store_true',
+                    help='export every artboard to its own svg (output-1.svg, output-2.svg...)')
+parser.add_argument('-j', '--jobs', type=int, default=None,
+                    help='number of worker processes for --all-artboards (default: CPU count)')
+parser.add_argument('--pretty', action='store_true',
+                    help='indent the svg output')
+parser.add_argument('--json-backend', choices=tj.BACKENDS, default="auto",
+                    help='JSON parser (default: orjson if installed)')
+parser.add_argument('--incremental-json', action='store_true',
+                    help='parse artboard tables one by one, keeping path geometries as JSON text until used')
+parser.add_argument('--precision', type=precision_type, default=exp.pe.DEFAULT_PRECISION,
+                    help='decimals in path data, or "full" (default: %(default)s)')
+parser.add_argument('--profile', default=None, metavar='REPORT',
+                    help='write per-stage and per-element metrics to a JSON file')
+parser.add_argument('--profile-memory', action='store_true',
+                    help='add allocation peaks to the --profile report (slower)')
+parser.add_argument('--profile-stats', default=None, metavar='PSTATS',
+                    help='write a cProfile dump (readable with pstats)')
+parser.add_argument('--debug', type=dg.parse_channels, default=(), metavar='CHANNELS',
+                    help='print diagnostics of channels (%s, or "all")' % ",".join(dg.CHANNELS))
+parser.add_argument('--debug-full', action='store_true',
+                    help='do not truncate bitmaps and other large payloads in diagnostics')
+parser.add_argument('--cache-stats', action='store_true',
+                    help='print hit/miss counts of shared styles, transforms and bitmaps')
+parser.add_argument('--images', choices=[exp.IMAGE_INLINE, exp.IMAGE_EXTERNAL],
+                    default=exp.IMAGE_INLINE,
+                    help='embed bitmaps, or write them to an images directory next to the svg')
+parser.add_argument('--styles', choices=[exp.STYLE_INLINE, exp.STYLE_CSS],
+                    default=exp.STYLE_INLINE,
+                    help='style attributes, or CSS classes in a <style> element (smaller, defaults omitted)')
+parser.add_argument('--skip-hidden', action='store_true',
+                    help='omit hidden elements and invisible layers (instead of display:none)')
+parser.add_argument('--streaming', action='store_true',
+                    help='export elements while they are decoded (gradients are defined at the end)')
+parser.add_argument('--result-cache', default=None, metavar='DIR',
+                    help='reuse the svgs of unchanged inputs from a cache directory (see result_cache.py)')
+parser.add_argument('--result-cache-size', type=float, default=rc.DEFAULT_MAX_BYTES / 1024 ** 2,
+                    metavar='MB', help='size limit of the result cache (default: %(default)d MB)')
 
 
-def open_vectornator(file):
+def open_vectornator(file, output=None, cache=None, all_artboards=False, jobs=None,
+                     profiler=pf.NULL_PROFILER, incremental=False, streaming=False,
+                     result_cache=None, **export_options):
     """
     Open and process a Linearity Curve (.curve) file.
 
     Vectornator (.vectornator) file is not supported.
 
     You can upgrade file format by opening vectornator file in Linearity Curve, then export as .curve.
+
+    `output` is the svg file path. (default: result.svg next to the input file)
+    `cache` (model.DecodeCache) collects hit/miss counts of shared table entries.
+    With `all_artboards`, every artboard is exported by `jobs` processes (see convert_all_artboards()).
+    `profiler` (profiling.Profiler) collects per-stage metrics.
+    `incremental` parses GUID JSON table by table (VI JSON tools).
+    `streaming` exports elements while they are decoded (VI Decoders.iter_gid_json()).
+    `result_cache` (VI result cache.ResultCache) returns the svgs of unchanged inputs.
+    `export_options` are passed to VI Exporters.create_svg() (pretty, image_mode, precision,
+    skip_hidden, style_mode).
     """
     try:
-        with zipfile.ZipFile(file, 'r') as archive:
-            # Step 1: Read Manifest
-            manifest = ext.extract_manifest(archive)
-
-            # Step 2: Read Document
-            document = ext.extract_document(archive, manifest)
-
-            # Step 3: Extract Drawing Data
-            drawing_data = ext.extract_drawing_data(document)
-
-            # Step 4: Process Units and Artboards
-            units = drawing_data.get("settings", {}).get("units", "Pixels")
-            version = document.get("appVersion", "unknown app version")
-            artboard_paths = drawing_data.get("artboardPaths", [])
-
-            # will be used later (as Inkscape attribute)
-            print(f"Unit: {units}")
-
-            if not artboard_paths:
-                logging.warning("No artboard paths found in the document.")
-                return
-
-            # Step 5: Read Artboard (GUID JSON)
-            # If there's multiple artboards, only the first will be exported.
-            gid_json = ext.extract_gid_json(archive, artboard_paths[0])
-
-            # if the file is Linearity Curve
-            if check_if_curve(version):
-                print(f"Supported version: {version}.")
-                artboard = gid_json.get("artboards")[0]
-                layers = d.read_gid_json(archive, gid_json)
-                ext.read_dat_from_zip
-
-            # if the file is Vectornator
-            else:
-                # Does not work yet
-                # artboard = d.vectornator_to_artboard(gid_json)
-                # layers = gid_json.get("layers", [])
-                raise ValueError(
-                    f"Unsupported version: {version}. Version 5.0.0 or up is required.")
-
-            # print(json.dumps(gid_json, indent=4))
-
-            exp.create_svg(artboard, layers, file)
+        if all_artboards:
+            return convert_all_artboards(file, output, jobs, cache, profiler, incremental,
+                                         streaming, result_cache, **export_options)
+        return convert_vectornator(file, output, cache, profiler, incremental, streaming,
+                                   result_cache, **export_options)
 
     except zipfile.BadZipFile:
         logging.error("The provided file is not a valid ZIP archive.")
@@ -93,10 +120,311 @@ def open_vectornator(file):
             f"An unexpected error occurred: {traceback.format_exc()}")
 
 
+def convert_vectornator(file, output=None, cache=None, profiler=pf.NULL_PROFILER,
+                        incremental=False, streaming=False, result_cache=None,
+                        **export_options):
+    """
+    Converts a Linearity Curve (.curve) file to svg and returns the output path.
+
+    Unlike open_vectornator(), errors are raised to the caller.
+    Returns None if the document has no artboard.
+    With `result_cache` (VI result cache.ResultCache), an unchanged input is copied
+    from the cache instead of converted.
+    """
+    if output is None:
+        output = os.path.join(os.path.dirname(file), "result.svg")
+    if cache is None:
+        cache = m.DecodeCache()
+
+    profiler.count("input_bytes", os.path.getsize(file))
+
+    key = cached_result_key(result_cache, file, False, streaming, export_options, profiler)
+    if key is not None:
+        outputs = get_cached_result(result_cache, key, lambda number, count: output, profiler)
+        if outputs is not None:
+            return outputs[0] if outputs else None
+
+    with zipfile.ZipFile(file, 'r') as archive:
+        # Step 1-4: Read Manifest, Document and Drawing Data
+        with profiler.stage("read_document"):
+            artboard_paths = read_artboard_paths(archive)
+
+        if not artboard_paths:
+            logging.warning("No artboard paths found in the document.")
+            if key is not None:
+                result_cache.put(key, [], file)
+            return
+
+        # Step 5: Read Artboard (GUID JSON)
+        # If there's multiple artboards, only the first will be exported.
+        # (use convert_all_artboards() to export all of them)
+        gid_json = read_gid_json_file(archive, artboard_paths[0], profiler, incremental)
+        export_artboard(archive, gid_json, 0, output, cache, profiler, export_options,
+                        streaming)
+
+    if key is not None:
+        with profiler.stage("result_cache"):
+            result_cache.put(key, [output], file)
+    return output
+
+
+def convert_all_artboards(file, output=None, jobs=None, cache=None, profiler=pf.NULL_PROFILER,
+                          incremental=False, streaming=False, result_cache=None,
+                          **export_options):
+    """
+    Converts every artboard of a Linearity Curve (.curve) file to svg.
+
+    Each entry of drawing.artboardPaths (and each artboard in its GUID JSON) is
+    exported to its own file (result.svg -> result-1.svg, result-2.svg...).
+    The GUID JSONs are parsed and exported by a pool of `jobs` processes, each opening
+    the archive by its path (with image_mode="external", bitmaps go to the same
+    content-addressed images directory). Bitmaps are shared by the artboards of one
+    GUID JSON, a bitmap used by several artboard paths is read once per worker.
+    A document with a single artboard path, or `jobs` 1 (callers that already run in a
+    worker process), runs in this process, with bitmaps shared by all artboard paths.
+
+    Stage and element metrics of the workers (wall time, CPU time of the worker,
+    allocation peaks) and their cache counts are added to `profiler` and `cache`.
+    The workers are not covered by cProfile nor by the total CPU time.
+
+    Errors are raised to the caller. Returns the list of output paths.
+    """
+    if output is None:
+        output = os.path.join(os.path.dirname(file), "result.svg")
+    profiler.count("input_bytes", os.path.getsize(file))
+
+    key = cached_result_key(result_cache, file, True, streaming, export_options, profiler)
+    if key is not None:
+        outputs = get_cached_result(
+            result_cache, key, lambda number, count: artboard_output(output, number), profiler)
+        if outputs is not None:
+            return outputs
+
+    with zipfile.ZipFile(file, 'r') as archive:
+        with profiler.stage("read_document"):
+            artboard_paths = read_artboard_paths(archive)
+
+    if not artboard_paths:
+        logging.warning("No artboard paths found in the document.")
+        if key is not None:
+            result_cache.put(key, [], file)
+        return []
+
+    if cache is None:
+        cache = m.DecodeCache()
+    jobs = min(jobs or os.cpu_count(), len(artboard_paths))
+    if jobs == 1:
+        outputs = []
+        with zipfile.ZipFile(file, 'r') as zip_file:
+            # bitmaps used by several artboards are read once
+            archive = ext.SharedArchive(zip_file)
+            for artboard_path in artboard_paths:
+                outputs += export_artboard_path(archive, artboard_path, output, cache, profiler,
+                                                incremental, streaming, export_options,
+                                                len(outputs) + 1)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        # the number of artboards of a path is only known once it is parsed: each path
+        # is written to temporary names, renamed in document order
+        memory = profiler.memory if profiler.enabled else None
+        futures = []
+        try:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=tj.set_backend,
+                                     initargs=(tj.get_backend(),)) as executor:
+                futures = [executor.submit(export_artboard_path_task, file, artboard_path,
+                                           f"{output}.{number}.part", memory, incremental,
+                                           streaming, export_options)
+                           for number, artboard_path in enumerate(artboard_paths, 1)]
+                results = [future.result() for future in futures]
+        except BaseException:
+            # remove the temporary outputs of the paths that were exported
+            for future in futures:
+                if not future.cancelled() and future.exception() is None:
+                    for part_output in future.result()[0]:
+                        os.remove(part_output)
+            raise
+        outputs = []
+        for part_outputs, hits, misses, report in results:
+            worker_cache = m.DecodeCache()
+            worker_cache.hits, worker_cache.misses = hits, misses
+            cache.merge_stats(worker_cache)
+            if report is not None:
+                profiler.merge(report)
+            for part_output in part_outputs:
+                outputs.append(artboard_output(output, len(outputs) + 1))
+                os.replace(part_output, outputs[-1])
+
+    if key is not None:
+        with profiler.stage("result_cache"):
+            result_cache.put(key, outputs, file)
+    return outputs
+
+
+def export_artboard_path(archive, artboard_path, output, cache, profiler=pf.NULL_PROFILER,
+                         incremental=False, streaming=False, export_options=None,
+                         first_number=1):
+    """
+    Exports every artboard of one GUID JSON (an entry of drawing.artboardPaths).
+
+    `archive` is an extractors.SharedArchive, so bitmaps used by several artboards are
+    read once. Artboards are written to artboard_output(output, n) from n=`first_number`
+    (`output` is only the name stem). Hit/miss counts are added to `cache`.
+    Returns the output paths.
+    """
+    outputs = []
+    gid_json = read_gid_json_file(archive, artboard_path, profiler, incremental)
+    for artboard_index in range(len(gid_json.get("artboards", []))):
+        # one DecodeCache per artboard, like convert_vectornator()
+        artboard_cache = m.DecodeCache()
+        outputs.append(export_artboard(
+            archive, gid_json, artboard_index,
+            artboard_output(output, first_number + artboard_index),
+            artboard_cache, profiler, export_options or {}, streaming))
+        cache.merge_stats(artboard_cache)
+    return outputs
+
+
+def export_artboard_path_task(file, artboard_path, output, memory, incremental, streaming,
+                              export_options):
+    """
+    Process pool task of convert_all_artboards(), see export_artboard_path().
+
+    `memory` is None when profiling is disabled, else the `memory` option of the
+    worker's profiler. Returns (outputs, cache hits, cache misses, profiler report or None).
+    """
+    profiler = pf.NULL_PROFILER if memory is None else pf.Profiler(memory=memory)
+    cache = m.DecodeCache()
+    if profiler.enabled:
+        profiler.start()
+    try:
+        with zipfile.ZipFile(file, 'r') as zip_file:
+            outputs = export_artboard_path(ext.SharedArchive(zip_file), artboard_path, output,
+                                           cache, profiler, incremental, streaming, export_options)
+    finally:
+        if profiler.enabled:
+            profiler.stop()
+    return outputs, cache.hits, cache.misses, profiler.report() if profiler.enabled else None
+
+
+def artboard_output(output, number):
+    """Returns the svg path of the number-th artboard (result.svg -> result-1.svg)."""
+    stem, extension = os.path.splitext(output)
+    return f"{stem}-{number}{extension or '.svg'}"
+
+
+def cached_result_key(result_cache, file, all_artboards, streaming, export_options,
+                      profiler=pf.NULL_PROFILER):
+    """
+    Returns the VI result cache key of a conversion, or None if it is not cached.
+
+    Conversions writing bitmaps next to the svg (image_mode="external") are not cached.
+    """
+    if result_cache is None or export_options.get("image_mode") == exp.IMAGE_EXTERNAL:
+        return None
+    # the options that change the output (incremental parsing does not)
+    options = {"all_artboards": all_artboards, "streaming": streaming, **export_options}
+    with profiler.stage("result_cache"):
+        return result_cache.key(file, options)
+
+
+def get_cached_result(result_cache, key, output_path, profiler=pf.NULL_PROFILER):
+    """Copies the cached svgs of `key` (see ResultCache.get()). Returns None on a miss."""
+    with profiler.stage("result_cache"):
+        outputs = result_cache.get(key, output_path)
+    profiler.count("result_cache_hits" if outputs is not None else "result_cache_misses")
+    if outputs is not None:
+        logging.info("Unchanged input, %d svg copied from the result cache.", len(outputs))
+    return outputs
+
+
+def export_artboard(archive, gid_json, artboard_index, output, cache, profiler, export_options,
+                    streaming=False):
+    """
+    Exports one artboard of a GUID JSON to svg and returns the output path.
+
+    With `streaming`, elements are decoded while exported (stage "export/decode").
+    """
+    artboard = gid_json.get("artboards")[artboard_index]
+    if streaming:
+        layers = profiler.iterate(
+            d.iter_gid_json(archive, gid_json, cache, artboard_index), "decode")
+    else:
+        with profiler.stage("decode"):
+            layers = d.read_gid_json(archive, gid_json, cache, artboard_index)
+    with profiler.stage("export"):
+        exp.create_svg(artboard, layers, output, cache=cache, profiler=profiler,
+                       **export_options)
+    return output
+
+
+def read_gid_json_file(archive, artboard_path, profiler=pf.NULL_PROFILER, incremental=False):
+    """Reads and parses a GUID JSON (artboard) from the archive."""
+    with profiler.stage("parse_json"):
+        gid_json = ext.extract_gid_json(archive, artboard_path, incremental)
+    if profiler.enabled:
+        profiler.count("json_bytes", archive.getinfo(artboard_path).file_size)
+    return gid_json
+
+
+def read_artboard_paths(archive):
+    """
+    Reads Manifest and Document, and returns drawing.artboardPaths.
+
+    Raises ValueError if the document is not made by Linearity Curve 5.x.
+    """
+    # Step 1: Read Manifest
+    manifest = ext.extract_manifest(archive)
+
+    # Step 2: Read Document
+    document = ext.extract_document(archive, manifest)
+
+    # Step 3: Extract Drawing Data
+    drawing_data = ext.extract_drawing_data(document)
+
+    # Step 4: Process Units and Artboards
+    units = drawing_data.get("settings", {}).get("units", "Pixels")
+    version = document.get("appVersion", "unknown app version")
+
+    # will be used later (as Inkscape attribute)
+    dg.DECODE.info("Unit: %s", units)
+
+    # if the file is Linearity Curve
+    if check_if_curve(version):
+        dg.DECODE.info("Supported version: %s.", version)
+
+    # if the file is Vectornator
+    else:
+        # Does not work yet
+        # artboard = d.vectornator_to_artboard(gid_json)
+        # layers = gid_json.get("layers", [])
+        raise ValueError(
+            f"Unsupported version: {version}. Version 5.0.0 or up is required.")
+
+    return drawing_data.get("artboardPaths", [])
+
+
+def parse_version(text: str):
+    """
+    Returns the release numbers of a version string as a comparable tuple.
+
+    "5.18.4" -> (5, 18, 4). Trailing zeros are dropped ("5.0.0" == "5"), and anything
+    after the release numbers ("5.18.4 (1234)", "5.1.0b2") is ignored.
+    Raises ValueError if `text` does not start with a version number.
+    """
+    match = re.match(r"\s*v?(\d+(?:\.\d+)*)", text)
+    if match is None:
+        raise ValueError(f"Invalid version: {text!r}")
+    numbers = [int(number) for number in match.group(1).split(".")]
+    while len(numbers) > 1 and numbers[-1] == 0:
+        numbers.pop()
+    return tuple(numbers)
+
+
 def check_if_curve(input_version: str):
     """check if the file version is 5.x or not"""
-    required_version = version.parse("5.0.0")
-    current_version = version.parse(input_version)
+    required_version = parse_version("5.0.0")
+    current_version = parse_version(input_version)
 
     if current_version < required_version:
         return False
@@ -106,4 +434,27 @@ def check_if_curve(input_version: str):
 
 if __name__ == "__main__":
     args = parser.parse_args()
-    open_vectornator(args.input_file)
+    tj.set_backend(args.json_backend)
+    if args.debug:
+        dg.configure(args.debug, truncate=not args.debug_full)
+    cache = m.DecodeCache()
+    profiler = pf.NULL_PROFILER
+    if args.profile or args.profile_stats:
+        profiler = pf.Profiler(memory=args.profile_memory,
+                               cprofile=args.profile_stats is not None)
+        profiler.start()
+    result_cache = None
+    if args.result_cache:
+        result_cache = rc.ResultCache(args.result_cache, int(args.result_cache_size * 1024 ** 2))
+    open_vectornator(args.input_file, args.output, cache, args.all_artboards, args.jobs,
+                     profiler, args.incremental_json, args.streaming, result_cache,
+                     pretty=args.pretty, image_mode=args.images, precision=args.precision,
+                     skip_hidden=args.skip_hidden, style_mode=args.styles)
+    if profiler.enabled:
+        profiler.stop()
+        if args.profile:
+            profiler.write_report(args.profile)
+        if args.profile_stats:
+            profiler.dump_stats(args.profile_stats)
+    if args.cache_stats:
+        print(json.dumps(cache.stats(), indent=4))
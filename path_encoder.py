@@ -0,0 +1,202 @@
+"""
+VI path encoder
+
+converts pathGeometry data (model.PathGeometry) into compact svg path data (d=).
+
+* numbers are rounded to `precision` decimals (values closer to zero than that become 0)
+* straight segments are written as L/H/V instead of C
+* each subpath uses relative commands when its first numbers are estimated shorter (estimate_length())
+* separators are only written where needed ("M10-5L.5.25")
+
+Coordinates are rounded to integers in units of 10^-precision first, so straight
+segment detection and relative offsets are exact. Each subpath is then formatted
+with one template and shortened with a few replaces (compact_numbers()), not number by number.
+"""
+
+
+import re
+
+import tools_path as tp
+
+DEFAULT_PRECISION = 3
+
+# number count of each command
+ARITY = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "Z": 0}
+
+# "1.5 .25" -> "1.5.25" (not after integers or exponents: "1 .5", "1e-5 .5")
+FRACTION_SEPARATOR = re.compile(r"\.\d+ \.")
+
+# numbers compared by estimate_length() at the start of each subpath (moveto and the first curves)
+ESTIMATE_SAMPLE = 14
+
+# precision -> (absolute, relative) templates of each command, see command_templates()
+TEMPLATES = {}
+
+
+def command_templates(precision):
+    """
+    Returns the %-templates of each command, absolute and relative.
+
+    "C " is a repeated C: its letter is omitted. Letters and numbers are all
+    preceded by a space, compact_numbers() removes the spaces that are not needed.
+    """
+    if precision in TEMPLATES:
+        return TEMPLATES[precision]
+    if precision is None:
+        number = " %r"
+    elif precision:
+        number = f" %.{precision}f"
+    else:
+        number = " %d"
+    absolute, relative = {}, {}
+    for command, arity in ARITY.items():
+        absolute[command] = f" {command}" + number * arity
+        relative[command] = f" {command.lower()}" + number * arity if arity else f" {command}"
+        # moveto is never omitted (it would become lineto), Z never repeats
+        absolute[command + " "] = relative[command + " "] = number * arity
+    TEMPLATES[precision] = absolute, relative
+    return absolute, relative
+
+
+def compact_numbers(text, precision, letters):
+    """
+    Shortens the numbers of a formatted subpath ("0.500" -> ".5", "2.0" -> "2")
+    and removes the spaces that are not needed.
+
+    Args:
+        text (str): Subpath formatted with command_templates(), followed by a space.
+        precision (int): Decimals of the numbers (None: formatted with repr()).
+        letters (list): Command letters of the subpath.
+    """
+    # every number is followed by a space
+    if precision is None:
+        text = text.replace(".0 ", " ")
+    elif precision:
+        # one trailing zero per pass, the whole part keeps its zeros
+        for _ in range(precision):
+            text = text.replace("0 ", " ")
+        text = text.replace(". ", " ")
+    # and preceded by a space
+    if precision != 0:
+        text = text.replace(" 0.", " .").replace(" -0.", " -.")
+    for letter in letters:
+        text = text.replace(f" {letter} ", letter)
+    text = text.replace(" -", "-")
+    if " ." in text:
+        text = FRACTION_SEPARATOR.sub(lambda match: match[0].replace(" ", ""), text)
+    return text.strip()
+
+
+def quantize_points(points, scale):
+    """Rounds coordinates to integers in units of 1/scale (NumPy for large geometries)."""
+    np = tp.numpy() if len(points) >= tp.NUMPY_MIN_COORDINATES else None
+    if np is not None:
+        # same rounding as round(): half to even
+        return (np.frombuffer(points, dtype=np.float64) * scale).round().astype("int64").tolist()
+    return [round(value * scale) for value in points]
+
+
+def estimate_length(units):
+    """
+    Returns a cheap estimate of the formatted length of numbers (in units of 10^-precision):
+    their total bit length (~3.3 bits per digit, the sign is not counted).
+    """
+    return sum(map(int.bit_length, units))
+
+
+def subpath_commands(points, closed, x, y):
+    """
+    Returns the commands (repeated ones end with " "), absolute values and relative
+    offsets (from (x, y)) of a subpath.
+    """
+    start_x, start_y = points[0], points[1]
+    commands = ["M"]
+    values = [start_x, start_y]
+    offsets = [start_x - x, start_y - y]
+    x, y = start_x, start_y
+    last = "M"
+
+    # each segment goes from the anchor of a node (x, y) with its out point,
+    # to the in point and the anchor of the next node (the closing segment to the first node)
+    firsts = points if closed else points[:-6]
+    lasts = points[6:] + points[:6] if closed else points[6:]
+    for c1x, c1y, c2x, c2y, end_x, end_y in zip(firsts[4::6], firsts[5::6], lasts[2::6], lasts[3::6],
+                                                lasts[0::6], lasts[1::6]):
+        if c1x == x and c1y == y and c2x == end_x and c2y == end_y:
+            if end_y == y:
+                command = "H"
+                values.append(end_x)
+                offsets.append(end_x - x)
+            elif end_x == x:
+                command = "V"
+                values.append(end_y)
+                offsets.append(end_y - y)
+            else:
+                command = "L"
+                values += (end_x, end_y)
+                offsets += (end_x - x, end_y - y)
+        else:
+            command = "C"
+            values += (c1x, c1y, c2x, c2y, end_x, end_y)
+            offsets += (c1x - x, c1y - y, c2x - x, c2y - y, end_x - x, end_y - y)
+        commands.append(command + " " if command == last else command)
+        last = command
+        x, y = end_x, end_y
+
+    if closed and last != "C" and len(commands) > 1:
+        # Z draws the closing line
+        commands.pop()
+        del values[-ARITY[last]:], offsets[-ARITY[last]:]
+    return commands, values, offsets
+
+
+def encode_path_geometries(geometries, precision=DEFAULT_PRECISION, relative=True):
+    """
+    Converts a list of pathGeometry data (already transformed) to svg path data.
+
+    Args:
+        geometries (list): model.PathGeometry.
+        precision (int): Decimals to keep. None keeps full precision (and disables relative commands).
+        relative (bool): Use relative commands in subpaths where they are estimated shorter.
+
+    Returns:
+        str: Path data for the d attribute.
+    """
+    absolute_templates, relative_templates = command_templates(precision)
+    if precision is None:
+        relative = False
+        scale = None
+    else:
+        scale = 10 ** precision
+
+    parts = []
+    x = y = 0
+    for data in geometries:
+        if not len(data):
+            continue
+        closed = data.closed
+        # anchor x, y, in x, y, out x, y of each node
+        points = data.points.tolist() if scale is None else quantize_points(data.points, scale)
+        commands, values, offsets = subpath_commands(points, closed, x, y)
+
+        templates = absolute_templates
+        # a lone moveto has nothing to gain
+        if relative and len(commands) > 1:
+            # only the form estimated shorter is formatted, a sample is enough to tell
+            if estimate_length(offsets[:ESTIMATE_SAMPLE]) < estimate_length(values[:ESTIMATE_SAMPLE]):
+                templates, values = relative_templates, offsets
+
+        if closed:
+            commands.append("Z")
+            x, y = points[0], points[1]
+        else:
+            x, y = points[-6], points[-5]
+
+        if precision:
+            values = [value / scale for value in values]
+        template = "".join(map(templates.__getitem__, commands)) + " "
+        # " C" -> "C" (repeated commands have no letter)
+        letters = [templates[command][1] for command in set(commands) if command[-1] != " "]
+        parts.append(compact_numbers(template % tuple(values), precision, letters))
+
+    return "".join(parts)
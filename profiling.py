@@ -0,0 +1,280 @@
+"""
+VI profiling
+
+collects per-stage and per-element-kind metrics of a conversion.
+
+usage:
+    profiler = Profiler(memory=True, cprofile=True)
+    with profiler:
+        convert_vectornator("file.curve", profiler=profiler)
+    profiler.write_report("profile.json")
+    profiler.dump_stats("profile.pstats")
+
+Functions take NULL_PROFILER by default, whose methods do nothing.
+tracemalloc and cProfile are imported only when enabled.
+"""
+
+
+import json
+import threading
+import time
+
+
+class NullContext:
+    """Reusable context manager that does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_CONTEXT = NullContext()
+
+
+class NullProfiler:
+    """Profiler used when profiling is disabled."""
+    enabled = False
+
+    def stage(self, name):
+        return NULL_CONTEXT
+
+    def element(self, element, kind=None):
+        return NULL_CONTEXT
+
+    def count(self, name, amount=1):
+        pass
+
+    def iterate(self, iterable, name):
+        return iterable
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def element_kind(element):
+    """Returns the kind of an element defined in VI Decoders.traverse_element()."""
+    if element.get("groupElements"):
+        return "group"
+    if element.get("imageData"):
+        return "image"
+    if element.get("styledText"):
+        return "text"
+    if len(element.get("pathGeometry", [])) > 1:
+        return "compound path"
+    if element.get("pathGeometry"):
+        return "path"
+    return "empty"
+
+
+class Timer:
+    """Context manager measuring one stage or element, see Profiler.stage()/element()."""
+    __slots__ = ("profiler", "table", "name", "wall", "cpu", "child_wall", "child_cpu",
+                 "memory", "peak")
+
+    def __init__(self, profiler, table, name):
+        self.profiler = profiler
+        self.table = table
+        self.name = name
+
+    def __enter__(self):
+        profiler = self.profiler
+        stack = profiler.stack()
+        if self.table is profiler.stages:
+            for timer in reversed(stack):
+                if timer.table is profiler.stages:
+                    self.name = f"{timer.name}/{self.name}"
+                    break
+        self.child_wall = self.child_cpu = 0.0
+        self.memory = self.peak = None
+        if profiler.memory:
+            import tracemalloc
+
+            current, peak = tracemalloc.get_traced_memory()
+            # keep the peak of the outer stages before resetting it
+            for timer in stack:
+                if timer.peak is not None:
+                    timer.peak = max(timer.peak, peak)
+            tracemalloc.reset_peak()
+            self.memory = self.peak = current
+        stack.append(self)
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        profiler = self.profiler
+        stack = profiler.stack()
+        stack.pop()
+        peak_bytes = None
+        if self.memory is not None:
+            import tracemalloc
+
+            peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            peak_bytes = peak - self.memory
+            for timer in stack:
+                if timer.peak is not None:
+                    timer.peak = max(timer.peak, peak)
+        if self.table is profiler.elements:
+            # self time (children are measured by themselves)
+            for timer in reversed(stack):
+                if timer.table is profiler.elements:
+                    timer.child_wall += wall
+                    timer.child_cpu += cpu
+                    break
+            wall -= self.child_wall
+            cpu -= self.child_cpu
+        profiler.add(self.table, self.name, wall, cpu, peak_bytes)
+        return False
+
+
+class Profiler:
+    """
+    Records wall time, CPU time and allocation peaks of stages, the time spent on each
+    element kind, and counts of processed nodes/elements/images/bytes.
+
+    Args:
+        memory (bool): Trace allocation peaks per stage and element kind with tracemalloc
+            (slows the conversion).
+        cprofile (bool): Also run cProfile, see dump_stats().
+
+    Stages can be nested, nested stages are named "outer/inner". Element times are
+    self times (a group does not include its children), element allocation peaks
+    include the children. Threads are added up, and the
+    reports of worker processes (--all-artboards) are added with merge(). cProfile and
+    the total only cover the thread that started the profiler.
+    """
+    enabled = True
+
+    def __init__(self, memory=False, cprofile=False):
+        self.memory = memory
+        self.cprofile = None
+        if cprofile:
+            import cProfile
+
+            self.cprofile = cProfile.Profile()
+        self.stages = {}
+        self.elements = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.wall = self.cpu = 0.0
+        self.started_tracemalloc = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    def start(self):
+        """Starts measuring the total time (and tracemalloc/cProfile)."""
+        if self.memory:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracemalloc = True
+        if self.cprofile is not None:
+            self.cprofile.enable()
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+
+    def stop(self):
+        """Stops measuring the total time."""
+        self.wall = time.perf_counter() - self.wall
+        self.cpu = time.process_time() - self.cpu
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        if self.started_tracemalloc:
+            import tracemalloc
+
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+
+    def stack(self):
+        """Returns the timers open in the current thread."""
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def stage(self, name):
+        """Returns a context manager measuring a stage."""
+        return Timer(self, self.stages, name)
+
+    def element(self, element, kind=None):
+        """
+        Returns a context manager measuring the export of an element (dict) by its kind.
+
+        `kind` overrides element_kind() (e.g. "group" for a group streamed without children).
+        """
+        return Timer(self, self.elements, kind or element_kind(element))
+
+    def iterate(self, iterable, name):
+        """Yields the items of `iterable`, measuring the production of each as stage `name`."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                item = next(iterator, StopIteration)
+            if item is StopIteration:
+                return
+            yield item
+
+    def count(self, name, amount=1):
+        """Adds `amount` to a counter."""
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def add(self, table, name, wall, cpu, peak_bytes=None):
+        """Adds one measurement to a stage/element table."""
+        with self.lock:
+            entry = table.get(name)
+            if entry is None:
+                entry = table[name] = {"calls": 0, "wall": 0.0, "cpu": 0.0}
+            entry["calls"] += 1
+            entry["wall"] += wall
+            entry["cpu"] += cpu
+            if peak_bytes is not None:
+                entry["peak_bytes"] = max(entry.get("peak_bytes", 0), peak_bytes)
+
+    def merge(self, report):
+        """Adds the stages, elements and counts of another profiler's report() (e.g. of a worker process)."""
+        for table, entries in ((self.stages, report["stages"]), (self.elements, report["elements"])):
+            for name, other in entries.items():
+                with self.lock:
+                    entry = table.get(name)
+                    if entry is None:
+                        entry = table[name] = {"calls": 0, "wall": 0.0, "cpu": 0.0}
+                    entry["calls"] += other["calls"]
+                    entry["wall"] += other["wall"]
+                    entry["cpu"] += other["cpu"]
+                    if "peak_bytes" in other:
+                        entry["peak_bytes"] = max(entry.get("peak_bytes", 0), other["peak_bytes"])
+        for name, amount in report["counts"].items():
+            self.count(name, amount)
+
+    def report(self):
+        """Returns the metrics as a dict (seconds and bytes)."""
+        return {
+            "total": {"wall": self.wall, "cpu": self.cpu},
+            "stages": self.stages,
+            "elements": self.elements,
+            "counts": dict(sorted(self.counts.items())),
+        }
+
+    def write_report(self, path):
+        """Writes report() as JSON."""
+        with open(path, "w", encoding="utf-8") as report_file:
+            json.dump(self.report(), report_file, indent=4)
+
+    def dump_stats(self, path):
+        """Writes cProfile statistics (readable with pstats or snakeviz)."""
+        if self.cprofile is None:
+            raise ValueError("Profiler was created without cprofile=True")
+        self.cprofile.dump_stats(path)
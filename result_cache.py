@@ -0,0 +1,209 @@
+"""
+VI result cache
+
+persistent on-disk cache of converted svgs, keyed by content.
+
+usage: python result_cache.py CACHE_DIR [--list] [--prune] [--max-size MB] [--older-than DAYS] [--clear]
+
+The key of a conversion is a hash of the archive bytes, of the converter sources
+(converter_version(): any change to the code invalidates every entry) and of the
+options that change the output. An unchanged input is not decoded again: its svgs
+are copied from the cache.
+
+Each entry is a directory CACHE_DIR/<key>/ holding the svgs (1.svg, 2.svg...) and
+entry.json. The mtime of entry.json is the last use: when the cache grows over
+`max_bytes`, the least recently used entries are removed. Entries are written to a
+temporary directory and renamed, so several processes can share a cache.
+
+Bitmaps written next to the svg (image_mode="external") are not cached, such
+conversions bypass the cache.
+"""
+
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import time
+
+ENTRY_FILE = "entry.json"
+TEMPORARY_PREFIX = ".tmp-"
+DEFAULT_MAX_BYTES = 1024 ** 3
+HASH_CHUNK_SIZE = 1 << 20
+
+_converter_version = None
+
+
+def converter_version():
+    """Returns a hash of the VI modules (computed once)."""
+    global _converter_version
+    if _converter_version is None:
+        digest = hashlib.sha256()
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for path in sorted(glob.glob(os.path.join(directory, "*.py"))):
+            digest.update(os.path.basename(path).encode("utf-8"))
+            with open(path, "rb") as source:
+                digest.update(source.read())
+        _converter_version = digest.hexdigest()
+    return _converter_version
+
+
+def hash_file(path):
+    """Returns the sha256 (hex) of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Directory of converted svgs with size-bounded LRU eviction.
+
+    Args:
+        directory (str): Cache directory (created if missing).
+        max_bytes (int): Size above which least recently used entries are evicted.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+
+    def key(self, file, options):
+        """Returns the key of converting `file` with `options` (dict of JSON values)."""
+        digest = hashlib.sha256()
+        digest.update(hash_file(file).encode("ascii"))
+        digest.update(converter_version().encode("ascii"))
+        digest.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key, output_path):
+        """
+        Copies the svgs of entry `key` to their outputs, and marks the entry as used.
+
+        `output_path(number, count)` returns the path of the number-th svg (from 1).
+        Returns the list of output paths, or None if the entry does not exist.
+        """
+        entry_dir = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(entry_dir, ENTRY_FILE), encoding="utf-8") as entry_file:
+                count = json.load(entry_file)["count"]
+            outputs = []
+            for number in range(1, count + 1):
+                output = output_path(number, count)
+                shutil.copyfile(os.path.join(entry_dir, f"{number}.svg"), output)
+                outputs.append(output)
+            os.utime(os.path.join(entry_dir, ENTRY_FILE))
+        except (OSError, ValueError, KeyError):
+            # missing, or evicted by another process while copying
+            return None
+        return outputs
+
+    def put(self, key, outputs, source=None):
+        """Stores the svgs `outputs` (list of paths, may be empty) as entry `key`."""
+        entry_dir = os.path.join(self.directory, key)
+        size = sum(os.path.getsize(output) for output in outputs)
+        # an entry larger than the cache would evict everything, then itself
+        if size > self.max_bytes or os.path.isdir(entry_dir):
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = os.path.join(self.directory, f"{TEMPORARY_PREFIX}{os.urandom(16).hex()}")
+        os.mkdir(temporary)
+        try:
+            for number, output in enumerate(outputs, 1):
+                shutil.copyfile(output, os.path.join(temporary, f"{number}.svg"))
+            entry = {"count": len(outputs), "size": size, "source": source,
+                     "created": time.time()}
+            with open(os.path.join(temporary, ENTRY_FILE), "w", encoding="utf-8") as entry_file:
+                json.dump(entry, entry_file)
+            # fails if another process stored the same entry meanwhile
+            os.rename(temporary, entry_dir)
+        except OSError:
+            pass
+        finally:
+            shutil.rmtree(temporary, ignore_errors=True)
+        self.evict(self.max_bytes)
+
+    def entries(self):
+        """Returns the entries (dicts with key, size, count, source, created, used), oldest use first."""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if name.startswith(TEMPORARY_PREFIX):
+                continue
+            path = os.path.join(self.directory, name, ENTRY_FILE)
+            try:
+                with open(path, encoding="utf-8") as entry_file:
+                    entry = json.load(entry_file)
+                entry["used"] = os.path.getmtime(path)
+            except (OSError, ValueError):
+                continue
+            entry["key"] = name
+            entries.append(entry)
+        entries.sort(key=lambda entry: entry["used"])
+        return entries
+
+    def remove(self, key):
+        """Removes an entry."""
+        shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+
+    def evict(self, max_bytes, older_than=None):
+        """
+        Removes least recently used entries until the cache fits in `max_bytes`,
+        and entries not used for `older_than` seconds. Returns the removed entries.
+        """
+        entries = self.entries()
+        total = sum(entry["size"] for entry in entries)
+        limit = None if older_than is None else time.time() - older_than
+        removed = []
+        for entry in entries:
+            if total <= max_bytes and (limit is None or entry["used"] >= limit):
+                break
+            self.remove(entry["key"])
+            total -= entry["size"]
+            removed.append(entry)
+        return removed
+
+    def clear(self):
+        """Removes every entry (and leftover temporary directories)."""
+        for name in os.listdir(self.directory) if os.path.isdir(self.directory) else ():
+            self.remove(name)
+
+
+parser = argparse.ArgumentParser(description='Inspect or prune a result cache')
+
+parser.add_argument('directory', help='cache directory')
+parser.add_argument('--prune', action='store_true',
+                    help='remove least recently used entries above --max-size / --older-than')
+parser.add_argument('--max-size', type=float, default=DEFAULT_MAX_BYTES / 1024 ** 2,
+                    metavar='MB', help='size limit for --prune (default: %(default)d MB)')
+parser.add_argument('--older-than', type=float, default=None, metavar='DAYS',
+                    help='with --prune, also remove entries not used for DAYS')
+parser.add_argument('--clear', action='store_true', help='remove every entry')
+parser.add_argument('--list', action='store_true', help='list the entries')
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    result_cache = ResultCache(args.directory)
+    if args.clear:
+        result_cache.clear()
+    elif args.prune:
+        older_than = None if args.older_than is None else args.older_than * 86400
+        removed = result_cache.evict(args.max_size * 1024 ** 2, older_than)
+        print(f"Removed {len(removed)} entries "
+              f"({sum(entry['size'] for entry in removed) / 1024 ** 2:.1f} MB)")
+    entries = result_cache.entries()
+    if args.list:
+        for entry in entries:
+            used = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["used"]))
+            print(f"{entry['key'][:16]} {used} {entry['size'] / 1024:10.1f} KB "
+                  f"{entry['count']:3} svg  {entry['source']}")
+    print(f"{len(entries)} entries, "
+          f"{sum(entry['size'] for entry in entries) / 1024 ** 2:.1f} MB in {result_cache.directory}")
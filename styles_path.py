@@ -2,14 +2,300 @@
 VI path styles
 
 Converts non-text styles into svg styles.
+
+StyleTable converts the fills and pathStrokeStyles used by a document into style
+fragments in one pass, and interns the style attributes of the paths.
+StyleSheet turns style attributes into CSS classes (style_mode="css" of VI Exporters).
 """
 
 
 import colorsys
 import xml.etree.ElementTree as ET
 
+import diagnostics as dg
 import tools_path as tp
 
+# style fragments of a path without fill / stroke
+NO_FILL = "fill:none;fill-opacity:1"
+NO_STROKE = ("stroke:none;stroke-width:0;stroke-opacity:1;stroke-linecap:butt;"
+             "stroke-dasharray:;stroke-linejoin:miter")
+
+# initial values of the properties written by VI exporters. Layers and groups only
+# set properties that are not inherited, so these are also the inherited values.
+SVG_DEFAULTS = {
+    "display": ("inline",),
+    "mix-blend-mode": ("normal",),
+    "opacity": ("1", "1.0"),
+    "fill": ("black", "#000000"),
+    "fill-opacity": ("1", "1.0"),
+    "fill-rule": ("nonzero",),
+    "stroke": ("none",),
+    "stroke-width": ("1", "1.0"),
+    "stroke-opacity": ("1", "1.0"),
+    "stroke-linecap": ("butt",),
+    # "" and "None" are invalid values: ignored like the initial value
+    "stroke-dasharray": ("none", "", "None"),
+    "stroke-linejoin": ("miter",),
+    "text-anchor": ("start",),
+}
+
+# HSB colors converted in one pass are converted with NumPy from this many
+NUMPY_MIN_COLORS = 64
+
+
+class StyleTable:
+    """
+    Style fragments of the fills and pathStrokeStyles of a document, by index.
+
+    The entries referenced by elements (`fill_ids`, `stroke_style_ids`) are converted in
+    one pass, with all their colors (fills, strokes and gradient stops) in one batch
+    (colors_to_rgba()). Other entries are converted when first requested. An entry that
+    cannot be converted is exported as no fill / no stroke, with a warning on the
+    export channel. Entries missing from the tables (elements exported without their
+    document) are converted on each request.
+
+    `hits` and `misses` count the fill() / stroke() requests of each table like
+    DecodeCache (a miss is the first request of an entry).
+
+    Args:
+        fills (list): fills table of the GUID JSON.
+        stroke_styles (list): pathStrokeStyles table of the GUID JSON.
+        fill_ids, stroke_style_ids (iterable): Indexes converted upfront.
+    """
+
+    def __init__(self, fills=(), stroke_styles=(), fill_ids=(), stroke_style_ids=()):
+        self.fill_table = fills
+        self.stroke_table = stroke_styles
+        # index -> stroke fragment
+        self.converted_strokes = {}
+        # index -> (fill fragment, gradient, stop styles), fragment None for gradients
+        # (their fill is a url() of the element)
+        self.converted_fills = {}
+        # requested entries (their number is the number of misses)
+        self.strokes = {}
+        self.fills = {}
+        self.stroke_requests = self.fill_requests = 0
+        # (hidden, blend mode, opacity, fill, stroke) -> style attribute
+        self.styles = {}
+        self.convert(fill_ids, stroke_style_ids)
+
+    @property
+    def hits(self):
+        hits = {"fills": self.fill_requests - len(self.fills),
+                "pathStrokeStyles": self.stroke_requests - len(self.strokes)}
+        return {table: count for table, count in hits.items() if count}
+
+    @property
+    def misses(self):
+        misses = {"fills": len(self.fills), "pathStrokeStyles": len(self.strokes)}
+        return {table: count for table, count in misses.items() if count}
+
+    def convert(self, fill_ids=(), stroke_style_ids=()):
+        """Converts entries of the tables, the colors of all of them in one batch."""
+        # (table, index, colors of the entry)
+        entries = []
+        for table, indexes, size in (("fills", fill_ids, len(self.fill_table)),
+                                     ("pathStrokeStyles", stroke_style_ids, len(self.stroke_table))):
+            for index in sorted(indexes):
+                if 0 <= index < size:
+                    try:
+                        entries.append((table, index, self.entry_colors(table, index)))
+                    except Exception as e:
+                        self.unsupported(table, index, e)
+        try:
+            rgba_colors = colors_to_rgba([color for _, _, colors in entries for color in colors])
+        except Exception:
+            # a malformed color, converted again per entry to find it
+            rgba_colors = None
+        position = 0
+        for table, index, colors in entries:
+            try:
+                if rgba_colors is None:
+                    rgba = colors_to_rgba(colors)
+                else:
+                    rgba = rgba_colors[position:position + len(colors)]
+                self.store(table, index, rgba)
+            except Exception as e:
+                self.unsupported(table, index, e)
+            position += len(colors)
+
+    def entry_colors(self, table, index):
+        """Returns the colors of an entry (gradient stops, or its color)."""
+        if table == "pathStrokeStyles":
+            return [self.stroke_table[index].get("color")]
+        fill = self.fill_table[index]
+        gradient = fill_gradient(fill)
+        if gradient is not None:
+            return [stop.get("color") for stop in gradient["gradient"]["stops"]]
+        return [fill_color(fill)]
+
+    def store(self, table, index, rgba):
+        """Stores the fragments of an entry from the RGBA tuples of entry_colors()."""
+        if table == "pathStrokeStyles":
+            self.converted_strokes[index] = stroke_fragment(self.stroke_table[index], rgba[0])
+            return
+        gradient = fill_gradient(self.fill_table[index])
+        if gradient is not None:
+            self.converted_fills[index] = (None, gradient,
+                                           [stop_style(stop_rgba) for stop_rgba in rgba])
+        else:
+            self.converted_fills[index] = (fill_fragment(rgba[0]), None, None)
+
+    def unsupported(self, table, index, error):
+        dg.EXPORT.warning("%s[%d] is not supported, exported without it: %r", table, index, error)
+        if table == "pathStrokeStyles":
+            self.converted_strokes[index] = NO_STROKE
+        else:
+            self.converted_fills[index] = (NO_FILL, None, None)
+
+    def stroke(self, index, stroke_style):
+        """Returns the stroke fragment of pathStrokeStyles[index]."""
+        fragment = self.strokes.get(index)
+        if fragment is None:
+            if index is None or not 0 <= index < len(self.stroke_table):
+                return stroke_fragment(stroke_style, color_to_rgb_tuple(stroke_style.get("color")))
+            if index not in self.converted_strokes:
+                self.convert(stroke_style_ids=(index,))
+            fragment = self.strokes[index] = self.converted_strokes[index]
+        self.stroke_requests += 1
+        return fragment
+
+    def fill_entry(self, index):
+        """Returns (fill fragment, gradient, stop styles) of fills[index]."""
+        if index not in self.converted_fills:
+            self.convert(fill_ids=(index,))
+        return self.converted_fills[index]
+
+    def fill(self, index, fill):
+        """Returns the fill fragment of fills[index], or None for a gradient (see gradient())."""
+        entry = self.fills.get(index)
+        if entry is None:
+            if index is None or not 0 <= index < len(self.fill_table):
+                if fill_gradient(fill) is not None:
+                    return None
+                return fill_fragment(color_to_rgb_tuple(fill_color(fill)))
+            entry = self.fills[index] = self.fill_entry(index)
+        self.fill_requests += 1
+        return entry[0]
+
+    def gradient(self, index, fill):
+        """Returns (gradient, stop styles) of a gradient fill (stop styles may be None)."""
+        if index is not None and 0 <= index < len(self.fill_table):
+            return self.fill_entry(index)[1:]
+        return fill_gradient(fill), None
+
+    def path_style(self, hidden, blend_mode, opacity, fill, stroke):
+        """Returns the style attribute of a path, one string per unique style."""
+        key = (bool(hidden), blend_mode, f"{opacity}", fill, stroke)
+        style = self.styles.get(key)
+        if style is None:
+            style = self.styles[key] = (
+                f"display:{'none' if hidden else 'inline'};"
+                f"mix-blend-mode:{blend_mode_to_svg(blend_mode)};"
+                f"opacity:{opacity};{fill};fill-rule:nonzero;{stroke}")
+        return style
+
+
+class StyleSheet:
+    """
+    CSS classes of the style attributes of a document, one class per unique style.
+
+    Properties with their default value (SVG_DEFAULTS), and stroke / fill properties
+    without effect (no stroke, no fill), are omitted from the rules.
+
+    Args:
+        prefix (str): Class names are the prefix followed by a number (s0, s1...).
+    """
+
+    def __init__(self, prefix="s"):
+        self.prefix = prefix
+        self.classes = {}  # style attribute -> class name (None: only default values)
+        self.rules = {}  # declarations -> class name, in order of first use
+
+    def class_name(self, style):
+        """Returns the class of a style attribute, or None if it has only default values."""
+        name = self.classes.get(style, False)
+        if name is False:
+            declarations = minimal_style(style)
+            name = None
+            if declarations:
+                name = self.rules.get(declarations)
+                if name is None:
+                    name = self.rules[declarations] = f"{self.prefix}{len(self.rules)}"
+            self.classes[style] = name
+        return name
+
+    def apply(self, attributes):
+        """Returns `attributes` with the style attribute replaced by its class."""
+        if "style" not in attributes:
+            return attributes
+        name = self.class_name(attributes["style"])
+        classed = {}
+        for key, value in attributes.items():
+            if key != "style":
+                classed[key] = value
+            elif name is not None:
+                classed["class"] = name
+        return classed
+
+    def css(self, newline=""):
+        """Returns the rules of the classes, for a <style> element."""
+        return newline.join(f".{name}{{{declarations}}}"
+                            for declarations, name in self.rules.items())
+
+
+def minimal_style(style):
+    """Returns the declarations of a style attribute that are not default values."""
+    properties = {}
+    for declaration in style.split(";"):
+        name, _, value = declaration.partition(":")
+        name = name.strip()
+        if name:
+            properties[name] = value.strip()
+    no_stroke = properties.get("stroke", "none") == "none"
+    no_fill = properties.get("fill") == "none"
+    return ";".join(
+        f"{name}:{value}" for name, value in properties.items()
+        if value not in SVG_DEFAULTS.get(name, ())
+        and not (no_stroke and name.startswith("stroke-"))
+        and not (no_fill and name == "fill-opacity"))
+
+
+def fill_gradient(fill):
+    """Returns the gradient of a fill, or None if it is not a gradient fill."""
+    gradient = fill.get("gradient", {}).get("_0")
+    if gradient is not None and gradient.get("gradient"):
+        return gradient
+    return None
+
+
+def fill_color(fill):
+    """Returns the color of a (non-gradient) fill, or None."""
+    return fill.get("color", {}).get("_0")
+
+
+def fill_fragment(rgba):
+    """Returns the fill style fragment of a color (RGBA tuple, None: no fill)."""
+    if rgba is None:
+        return NO_FILL
+    return f"fill:{rgba_to_hex(rgba)};fill-opacity:{rgba[3]}"
+
+
+def stroke_fragment(stroke_style, rgba):
+    """Returns the stroke style fragment of a pathStrokeStyle (see decode_stroke_style())."""
+    basic_style = stroke_style.get("basicStrokeStyle")
+    return (f"stroke:{rgba_to_hex(rgba)};"
+            f"stroke-width:{stroke_style.get('width')};"
+            f"stroke-opacity:{rgba[3]};"
+            f"stroke-linecap:{cap_to_svg(basic_style.get('cap', 0))};"
+            f"stroke-dasharray:{dash_pattern_to_svg(basic_style.get('dashPattern'))};"
+            f"stroke-linejoin:{join_to_svg(basic_style.get('join', 1))}")
+
+
+def stop_style(rgba):
+    """Returns the style attribute of a gradient stop."""
+    return f"stop-color:{rgba_to_hex(rgba)};stop-opacity:{rgba[3]}"
+
 
 def decode_stroke_style(stroke_style):
     """
@@ -58,8 +344,12 @@ def decode_fill(fill):
         }
 
 
-def create_gradient_element(gradient_data, local_transform, id):
-    """Create an SVG gradient element from data."""
+def create_gradient_element(gradient_data, local_transform, id, stop_styles=None):
+    """
+    Create an SVG gradient element from data.
+
+    `stop_styles` are the style attributes of the stops (StyleTable), computed if None.
+    """
     gradient = gradient_data.get("gradient", {})
     gradient_type = gradient.get("typeRawValue", 0)  # 0: Linear, 1: Radial
     transform = gradient_data.get("transform", {})
@@ -92,16 +382,14 @@ def create_gradient_element(gradient_data, local_transform, id):
         gradient_element.attrib["r"] = str(r)
 
     # Add color stops
-    for stop in gradient["stops"]:
-        color = color_to_rgb_tuple(stop.get("color"))
+    for index, stop in enumerate(gradient["stops"]):
         ratio = stop.get("ratio")
 
 		# Create style attribute
-        style_parts = [
-            f"stop-color:{rgba_to_hex(color)}",
-            f"stop-opacity:{color[3]}",
-        ]
-        style = ";".join(style_parts)
+        if stop_styles is not None:
+            style = stop_styles[index]
+        else:
+            style = stop_style(color_to_rgb_tuple(stop.get("color")))
 
         stop_element = ET.Element("stop", {
             "style": style,
@@ -204,6 +492,58 @@ def join_to_svg(join):
             return "miter"
 
 
+def colors_to_rgba(colors):
+    """
+    Converts a list of colors (see color_to_rgb_tuple(), None stays None) at once.
+
+    HSB colors are converted with NumPy when there are NUMPY_MIN_COLORS of them
+    and NumPy is installed (same results as colorsys).
+    """
+    results = [None] * len(colors)
+    hsb_indexes = []
+    for index, color in enumerate(colors):
+        if color is None:
+            continue
+        rgba = color.get("rgba")
+        if rgba is not None:
+            results[index] = rgba_to_tuple(rgba)
+        elif color.get("hsba") is not None:
+            hsb_indexes.append(index)
+
+    np = tp.numpy() if len(hsb_indexes) >= NUMPY_MIN_COLORS else None
+    if np is None:
+        for index in hsb_indexes:
+            results[index] = hsba_to_rgba(colors[index]["hsba"])
+        return results
+
+    hsba = [colors[index]["hsba"] for index in hsb_indexes]
+    red, green, blue = hsv_to_rgb_arrays(
+        np,
+        np.array([color.get("hue", 0) for color in hsba], dtype=np.float64),
+        np.array([color.get("saturation", 0) for color in hsba], dtype=np.float64),
+        np.array([color.get("brightness", 0) for color in hsba], dtype=np.float64))
+    for index, color, r, g, b in zip(hsb_indexes, hsba, red.tolist(), green.tolist(),
+                                     blue.tolist()):
+        results[index] = r, g, b, color.get("alpha", 1)
+    return results
+
+
+def hsv_to_rgb_arrays(np, hue, saturation, brightness):
+    """colorsys.hsv_to_rgb() on NumPy arrays, with the same operations (same results)."""
+    sector = np.trunc(hue * 6.0)
+    fraction = hue * 6.0 - sector
+    p = brightness * (1.0 - saturation)
+    q = brightness * (1.0 - saturation * fraction)
+    t = brightness * (1.0 - saturation * (1.0 - fraction))
+    sector = sector.astype(np.int64) % 6
+    gray = saturation == 0.0
+    v = brightness
+    red = np.where(gray, v, np.choose(sector, [v, q, p, p, t, v]))
+    green = np.where(gray, v, np.choose(sector, [t, v, v, q, p, p]))
+    blue = np.where(gray, v, np.choose(sector, [p, p, t, v, v, q]))
+    return red, green, blue
+
+
 def color_to_rgb_tuple(color):
     """Converts color into string."""
     rgba = color.get("rgba")
@@ -0,0 +1,73 @@
+"""
+Tests of VI JSON tools incremental parsing.
+
+usage: python -m unittest discover tests
+"""
+
+import json
+import unittest
+
+import tools_json as tj
+
+GID_JSON = {
+    "artboards": [{"title": "Artboard [1]", "frame": {"x": 0, "y": 0, "width": 100.5, "height": 50}}],
+    "elements": [{"name": "a \"quoted\" {name}", "hidden": False, "opacity": 1e-3}, {"name": "é"}],
+    "pathGeometries": [
+        {"closed": True, "nodes": [{"anchorPoint": [1.5, -2], "inPoint": [1, 2], "nodeType": 0}]},
+        {"closed": False, "nodes": []},
+        [],
+        "]}",
+    ],
+    "compoundPaths": [],
+    "groups": None,
+}
+
+
+def backends():
+    return ["json"] + (["orjson"] if tj.ORJSON_INSTALLED else [])
+
+
+class LoadsGidJsonTest(unittest.TestCase):
+
+    def tearDown(self):
+        tj.set_backend("auto")
+
+    def test_same_as_json_loads(self):
+        for indent in (None, 2):
+            data = json.dumps(GID_JSON, indent=indent, ensure_ascii=False).encode("utf-8")
+            for backend in backends():
+                with self.subTest(backend=backend, indent=indent):
+                    tj.set_backend(backend)
+                    result = tj.loads_gid_json(data)
+                    self.assertIsInstance(result["pathGeometries"], tj.LazyArray)
+                    self.assertEqual(len(result["pathGeometries"]), 4)
+                    self.assertEqual(result["pathGeometries"][-1], "]}")
+                    result["pathGeometries"] = list(result["pathGeometries"])
+                    self.assertEqual(result, json.loads(data))
+
+    def test_lazy_array_keeps_its_text_only(self):
+        data = json.dumps(GID_JSON).encode("utf-8")
+        geometries = tj.loads_gid_json(data)["pathGeometries"]
+        self.assertEqual(json.loads(geometries.text), GID_JSON["pathGeometries"])
+
+    def test_truncated(self):
+        data = json.dumps(GID_JSON).encode("utf-8")
+        for backend in backends():
+            tj.set_backend(backend)
+            for end in range(len(data)):
+                with self.subTest(backend=backend, end=end):
+                    with self.assertRaises(json.JSONDecodeError):
+                        tj.loads_gid_json(data[:end])
+
+    def test_malformed(self):
+        for data in (b'{"elements": x}', b'{"elements" []}', b'{"elements": [1, 2}', b'{elements: []}',
+                     b'{"pathGeometries": [1 2]}', b'{"pathGeometries": [{]}', b'{} []', b'[]'):
+            for backend in backends():
+                with self.subTest(backend=backend, data=data):
+                    tj.set_backend(backend)
+                    with self.assertRaises(json.JSONDecodeError):
+                        tj.loads_gid_json(data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+VI image tools
+
+detects bitmap formats and writes images as external files.
+"""
+
+
+import hashlib
+import os
+import threading
+
+# (offset, magic bytes, format name like Pillow's Image.format)
+IMAGE_SIGNATURES = [
+    (0, b"\x89PNG\r\n\x1a\n", "PNG"),
+    (0, b"\xff\xd8\xff", "JPEG"),
+    (0, b"GIF87a", "GIF"),
+    (0, b"GIF89a", "GIF"),
+    (0, b"II*\x00", "TIFF"),
+    (0, b"MM\x00*", "TIFF"),
+    (0, b"BM", "BMP"),
+    (8, b"WEBP", "WEBP"),
+    (4, b"ftypheic", "HEIC"),
+    (4, b"ftypheix", "HEIC"),
+    (4, b"ftypmif1", "HEIF"),
+    (4, b"ftypavif", "AVIF"),
+]
+
+FILE_EXTENSIONS = {
+    "JPEG": "jpg",
+    "TIFF": "tif",
+}
+
+
+def detect_image_format(data):
+    """
+    Detects the image format ('PNG', 'JPEG'...) from the first bytes of bitmap data.
+
+    Returns None if the format is unknown.
+    """
+    header = bytes(data[:16])
+    for offset, signature, image_format in IMAGE_SIGNATURES:
+        if header.startswith(signature, offset):
+            return image_format
+    return None
+
+
+def image_mime_type(image_format):
+    """Returns mime type for the image format."""
+    if image_format is None:
+        return "application/octet-stream"
+    return f"image/{image_format.lower()}"
+
+
+def image_file_extension(image_format):
+    """Returns file extension (without dot) for the image format."""
+    if image_format is None:
+        return "bin"
+    return FILE_EXTENSIONS.get(image_format, image_format.lower())
+
+
+class ImageStore:
+    """
+    Writes bitmaps into a directory, named by the SHA-256 of their content.
+
+    The same bitmap is written only once, even if it is used by many elements
+    (or by other documents sharing the same directory).
+
+    Args:
+        directory (str): Directory to write images to.
+        href_base (str): Path of `directory` relative to the svg file.
+    """
+
+    def __init__(self, directory, href_base):
+        self.directory = directory
+        self.href_base = href_base
+        self.written = set()
+
+    def add(self, data, image_format=None):
+        """Stores bitmap data and returns its href."""
+        if image_format is None:
+            image_format = detect_image_format(data)
+        digest = hashlib.sha256(data).hexdigest()
+        name = f"{digest}.{image_file_extension(image_format)}"
+
+        if name not in self.written:
+            path = os.path.join(self.directory, name)
+            if not os.path.exists(path):
+                os.makedirs(self.directory, exist_ok=True)
+                # unique per process and thread (artboards are exported concurrently)
+                partial = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+                with open(partial, "wb") as image_file:
+                    image_file.write(data)
+                os.replace(partial, path)
+            self.written.add(name)
+
+        return f"{self.href_base}/{name}"
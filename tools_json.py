@@ -0,0 +1,203 @@
+"""
+VI JSON tools
+
+pluggable JSON parser, and incremental parsing of GUID JSON (artboard) files.
+
+The fastest installed backend is used (orjson, then the standard json module),
+set_backend() selects one explicitly. orjson is imported on first use.
+
+With incremental parsing, the top-level tables of a GUID JSON (bytes, never
+decoded as a whole) are located by a scanner (brackets and strings, nothing is
+parsed) and parsed one by one with the selected backend. Large tables
+(pathGeometries) are kept as LazyArray: the JSON text of each item is located
+once and parsed only when the item is accessed, so peak memory scales with the
+JSON text instead of with a Python object per number.
+"""
+
+
+import importlib.util
+import json
+import re
+from array import array
+
+ORJSON_INSTALLED = importlib.util.find_spec("orjson") is not None
+# imported by loads()
+orjson = None
+
+BACKENDS = ("auto", "orjson", "json")
+
+# tables kept as LazyArray by loads_gid_json()
+LAZY_TABLES = ("pathGeometries",)
+
+_backend = "orjson" if ORJSON_INSTALLED else "json"
+
+# scanner: skips text, strings, flat arrays ([1, 2]) and flat objects (no nested
+# object or array but flat arrays) without parsing them, up to the next bracket
+_FILL = rb'[^"\[\]{}]*'
+_STRING_PATTERN = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+_FLAT_ARRAY = rb'\[%s\]' % _FILL
+_FLAT_OBJECT = rb'\{%s(?:(?:%s|%s)%s)*\}' % (_FILL, _STRING_PATTERN, _FLAT_ARRAY, _FILL)
+_BRACKET = re.compile(rb'%s(?:(?:%s|%s|%s)%s)*([\[\]{}])'
+                      % (_FILL, _STRING_PATTERN, _FLAT_ARRAY, _FLAT_OBJECT, _FILL))
+_STRING = re.compile(_STRING_PATTERN)
+_SCALAR = re.compile(rb'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?|true|false|null')
+_WHITESPACE = re.compile(rb'[ \t\r\n]*')
+
+
+def set_backend(name="auto"):
+    """Selects the JSON backend ("auto", "orjson" or "json")."""
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend: {name}")
+    if name == "orjson" and not ORJSON_INSTALLED:
+        raise ValueError("JSON backend 'orjson' is not installed")
+    if name == "auto":
+        name = "orjson" if ORJSON_INSTALLED else "json"
+    _backend = name
+
+
+def get_backend():
+    """Returns the name of the JSON backend in use."""
+    return _backend
+
+
+def loads(data):
+    """Parses JSON text (str or bytes) with the selected backend."""
+    if _backend == "orjson":
+        return (orjson or _import_orjson()).loads(data)
+    return json.loads(data)
+
+
+def _import_orjson():
+    global orjson
+    import orjson as module
+    orjson = module
+    return orjson
+
+
+class LazyArray:
+    """
+    Read-only list of JSON values, parsed from their text when accessed.
+
+    Args:
+        text (bytes): JSON text of the array only (not the whole document, which can be freed).
+        starts, ends (array): Offsets of each item in `text`.
+
+    Items are only located (balanced brackets) by loads_gid_json(), a malformed item
+    raises json.JSONDecodeError when accessed.
+    """
+    __slots__ = ("text", "starts", "ends")
+
+    def __init__(self, text, starts, ends):
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return loads(self.text[self.starts[index]:self.ends[index]])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __bool__(self):
+        return len(self.starts) > 0
+
+
+def _skip_whitespace(text, index):
+    return _WHITESPACE.match(text, index).end()
+
+
+def _error(message, text, index):
+    """Returns a json.JSONDecodeError at byte `index` of `text`."""
+    return json.JSONDecodeError(message, text.decode("utf-8", "replace"),
+                                len(text[:index].decode("utf-8", "replace")))
+
+
+def _expect(text, index, character):
+    index = _skip_whitespace(text, index)
+    if text[index:index + 1] != character:
+        raise _error(f"Expecting {character.decode()!r} in GUID JSON", text, index)
+    return index + 1
+
+
+def _scan_value(text, index):
+    """Returns the end of the JSON value starting at `index`, without parsing it."""
+    character = text[index:index + 1]
+    if character == b"[" or character == b"{":
+        depth = 1
+        end = index + 1
+        while depth:
+            match = _BRACKET.match(text, end)
+            if match is None:
+                break
+            end = match.end()
+            depth += 1 if match.group(1) in b"[{" else -1
+        else:
+            return end
+        raise _error("Unterminated array or object in GUID JSON", text, index)
+    match = (_STRING if character == b'"' else _SCALAR).match(text, index)
+    if match is None:
+        raise _error("Expecting value in GUID JSON", text, index)
+    return match.end()
+
+
+def _scan_array(text, index):
+    """Locates the items of the JSON array starting at `index`. Returns (LazyArray, end)."""
+    start = index
+    starts, ends = array("q"), array("q")
+    index = _expect(text, index, b"[")
+    index = _skip_whitespace(text, index)
+    if text[index:index + 1] != b"]":
+        while True:
+            index = _skip_whitespace(text, index)
+            end = _scan_value(text, index)
+            starts.append(index - start)
+            ends.append(end - start)
+            index = _skip_whitespace(text, end)
+            if text[index:index + 1] == b"]":
+                break
+            index = _expect(text, index, b",")
+    index += 1
+    return LazyArray(text[start:index], starts, ends), index
+
+
+def loads_gid_json(text, lazy_tables=LAZY_TABLES):
+    """
+    Parses a GUID JSON (bytes) table by table with the selected backend.
+    Tables in `lazy_tables` become LazyArray.
+
+    Returns a dict like json.loads() would. Raises json.JSONDecodeError on malformed
+    or truncated text.
+    """
+    result = {}
+    index = _expect(text, 0, b"{")
+    index = _skip_whitespace(text, index)
+    if text[index:index + 1] != b"}":
+        while True:
+            index = _skip_whitespace(text, index)
+            if text[index:index + 1] != b'"':
+                raise _error("Expecting property name in GUID JSON", text, index)
+            end = _scan_value(text, index)
+            key = loads(text[index:end])
+            index = _expect(text, end, b":")
+            index = _skip_whitespace(text, index)
+            if key in lazy_tables and text[index:index + 1] == b"[":
+                result[key], index = _scan_array(text, index)
+            else:
+                end = _scan_value(text, index)
+                result[key] = loads(text[index:end])
+                index = end
+            index = _skip_whitespace(text, index)
+            if text[index:index + 1] == b"}":
+                break
+            index = _expect(text, index, b",")
+    if _skip_whitespace(text, index + 1) != len(text):
+        raise _error("Extra data after GUID JSON", text, index + 1)
+    return result
+
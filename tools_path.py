@@ -6,120 +6,147 @@ functions to manipulate localTransform
 
 
 import math
+from array import array
+
+import diagnostics as dg
+import model as m
+
+# NumPy is optional and imported on first use by numpy(): it takes longer to
+# import than a small document takes to convert
+_numpy = False
+
+# geometries with fewer coordinates are transformed in Python (NumPy call overhead)
+NUMPY_MIN_COORDINATES = 96
+
+
+def numpy():
+    """Returns the numpy module, or None if it is not installed (imported once)."""
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        _numpy = np
+    return _numpy
 
 
 def apply_transform(data, transform):
-    """Applies the given transform to the pathGeometry."""
-    translation = transform.get("translation")
-    data = apply_translation(data, translation)
-    data = apply_shear(data, transform.get("shear"), translation)
-    data = apply_scale(data, transform.get("scale"), translation)
-    data = apply_rotation(data, transform.get("rotation"), translation)
+    """
+    Applies the given transform to the pathGeometry (model.PathGeometry).
+
+    Same result as apply_translation, apply_shear, apply_scale and apply_rotation
+    (in that order, around translation), but done in a single pass with an affine matrix.
+    Large geometries are transformed with NumPy if it is installed.
+    """
+    a, b, c, d, e, f = transform_to_matrix(transform)
+    points = data.points
+
+    np = numpy() if len(points) >= NUMPY_MIN_COORDINATES else None
+    if np is not None:
+        coordinates = np.frombuffer(points, dtype=np.float64)
+        xs, ys = coordinates[0::2], coordinates[1::2]
+        transformed = np.empty_like(coordinates)
+        transformed[0::2] = a * xs + c * ys + e
+        transformed[1::2] = b * xs + d * ys + f
+    else:
+        xs, ys = points[0::2], points[1::2]
+        transformed = [0.0] * len(points)
+        transformed[0::2] = [a * x + c * y + e for x, y in zip(xs, ys)]
+        transformed[1::2] = [b * x + d * y + f for x, y in zip(xs, ys)]
+        transformed = array("d", transformed)
+
+    return m.PathGeometry(data.closed, transformed, data.node_types, data.corner_radii)
+
+
+def transform_to_matrix(local_transform):
+    """
+    Composes localTransform into an affine matrix (a, b, c, d, e, f).
+
+    Points are mapped as x' = a*x + c*y + e, y' = b*x + d*y + f (same as SVG matrix()).
+    Shear is applied first, then scale, rotation and translation.
+    """
+    if local_transform is None:
+        return 1.0, 0.0, 0.0, 1.0, 0.0, 0.0
+
+    rotation = local_transform.get("rotation", 0)
+    sx, sy = local_transform.get("scale", [1, 1])
+    shear = local_transform.get("shear", 0)
+    tx, ty = local_transform.get("translation", [0, 0])
+
+    cos = math.cos(rotation)
+    sin = math.sin(rotation)
+
+    return (
+        cos * sx,
+        sin * sx,
+        cos * sx * shear - sin * sy,
+        sin * sx * shear + cos * sy,
+        tx,
+        ty,
+    )
 
-    return data
+
+def map_points(data, function):
+    """Returns a new PathGeometry with every point (x, y) replaced by function(x, y)."""
+    points = data.points
+    transformed = array("d")
+    for x, y in zip(points[0::2], points[1::2]):
+        transformed.extend(function(x, y))
+    return m.PathGeometry(data.closed, transformed, data.node_types, data.corner_radii)
 
 
 def apply_translation(data, translation):
     """Applies translation to pathGeometry nodes."""
     tx, ty = translation
-    transformed_nodes = []
-    for node in data["nodes"]:
-        transformed_node = {
-            "nodeType": node["nodeType"], "cornerRadius": node["cornerRadius"]}
-        for point in ["anchorPoint", "inPoint", "outPoint"]:
-            x, y = node[point]
-            transformed_node[point] = [x + tx, y + ty]
-        transformed_nodes.append(transformed_node)
-    # returns new geometry data.
-    return {
-        "closed": data["closed"],
-        "nodes": transformed_nodes
-    }
+    return map_points(data, lambda x, y: (x + tx, y + ty))
 
 
 def apply_rotation(data, angle, origin=(0, 0)):
     """Applies rotation to pathGeometry nodes."""
     ox, oy = origin
-    transformed_nodes = []
-    for node in data["nodes"]:
-        transformed_node = {
-            "nodeType": node["nodeType"], "cornerRadius": node["cornerRadius"]}
-        for point in ["anchorPoint", "inPoint", "outPoint"]:
-            x, y = node[point]
-            x -= ox
-            y -= oy
-            rotated_x = x * math.cos(angle) - y * math.sin(angle)
-            rotated_y = x * math.sin(angle) + y * math.cos(angle)
-            transformed_node[point] = [rotated_x + ox, rotated_y + oy]
-        transformed_nodes.append(transformed_node)
-    return {
-        "closed": data["closed"],
-        "nodes": transformed_nodes
-    }
+
+    def rotate(x, y):
+        x -= ox
+        y -= oy
+        rotated_x = x * math.cos(angle) - y * math.sin(angle)
+        rotated_y = x * math.sin(angle) + y * math.cos(angle)
+        return rotated_x + ox, rotated_y + oy
+
+    return map_points(data, rotate)
 
 
 def apply_scale(data, scale, origin=(0, 0)):
     """Applies scale to pathGeometry nodes."""
     sx, sy = scale
     ox, oy = origin
-    transformed_nodes = []
-
-    for node in data["nodes"]:
-        transformed_node = {
-            "nodeType": node["nodeType"], "cornerRadius": node["cornerRadius"]}
-        for point in ["anchorPoint", "inPoint", "outPoint"]:
-            x, y = node[point]
-            x -= ox
-            y -= oy
-            scaled_x = x * sx
-            scaled_y = y * sy
-            transformed_node[point] = [scaled_x + ox, scaled_y + oy]
-        transformed_nodes.append(transformed_node)
-
-    return {
-        "closed": data["closed"],
-        "nodes": transformed_nodes
-    }
+    return map_points(data, lambda x, y: ((x - ox) * sx + ox, (y - oy) * sy + oy))
 
 
 def apply_shear(data, shear, origin=(0, 0)):
     """Applies shear (skewX) to pathGeometry nodes."""
     ox, oy = origin
-    transformed_nodes = []
-
-    for node in data["nodes"]:
-        transformed_node = {
-            "nodeType": node["nodeType"], "cornerRadius": node["cornerRadius"]}
-        for point in ["anchorPoint", "inPoint", "outPoint"]:
-            x, y = node[point]
-            x -= ox
-            y -= oy
-            sheared_x = x + y * shear
-            transformed_node[point] = [sheared_x + ox, y + oy]
-        transformed_nodes.append(transformed_node)
-
-    return {
-        "closed": data["closed"],
-        "nodes": transformed_nodes
-    }
+    return map_points(data, lambda x, y: ((x - ox) + (y - oy) * shear + ox, (y - oy) + oy))
 
 
 def calculate_bbox_center(data):
     """Calculates the center of the bounding box for given nodes."""
-    nodes = data["nodes"]
+    # anchorPoint coordinates of each node
+    xs = data.points[0::6]
+    ys = data.points[1::6]
 
-    min_x = min(node["anchorPoint"][0] for node in nodes)
-    max_x = max(node["anchorPoint"][0] for node in nodes)
-    min_y = min(node["anchorPoint"][1] for node in nodes)
-    max_y = max(node["anchorPoint"][1] for node in nodes)
+    min_x = min(xs)
+    max_x = max(xs)
+    min_y = min(ys)
+    max_y = max(ys)
 
     center_x = (min_x + max_x) / 2
     center_y = (min_y + max_y) / 2
-    print(f"center: {center_x}, {center_y}")
+    dg.TRANSFORM.debug("center: %s, %s", center_x, center_y)
 
     len_x = max_x - min_x
     len_y = max_y - min_y
-    print(f"length: {len_x}, {len_y}")
+    dg.TRANSFORM.debug("length: %s, %s", len_x, len_y)
 
     return center_x, center_y
 
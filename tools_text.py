@@ -11,19 +11,63 @@ But, I must work on this at some point, because Vectornator uses this data forma
 """
 
 
-import base64
-import copy
-import datetime
-import plistlib
-from typing import Any, Dict
+# base64, datetime and plistlib are imported where they are used: Vectornator
+# text data is rare, and every export imports this module
+import diagnostics as dg
 
 #import inkex
 
+# styledText properties of a tspan, and their values outside of any range
+TEXT_STYLE_PROPERTIES = (
+    ("fontName", "sans-serif"),
+    ("fontSize", 16),
+    ("fillColor", None),
+    ("alignment", 0),
+)
+
+
+def style_runs(styled_text, length):
+    """
+    Merges the attributed ranges of a styledText into runs, in a single sweep.
+
+    Each property (TEXT_STYLE_PROPERTIES) is a list of {"value", "upperBound"} ranges.
+    At a position, a property takes the value of its first range ending after it
+    (or its default), and a run ends at the nearest of these upper bounds.
+    Yields (start, end, values) for the `length` characters of the string, `values`
+    being a tuple in TEXT_STYLE_PROPERTIES order.
+
+    The first range ending after a position never moves backwards, so each range
+    list is walked once: O(length of the ranges + runs).
+    """
+    ranges = [(styled_text.get(name) or {}).get("values", [])
+              for name, _ in TEXT_STYLE_PROPERTIES]
+    defaults = [default for _, default in TEXT_STYLE_PROPERTIES]
+    indexes = [0] * len(ranges)
+    start = 0
+    while start < length:
+        end = length
+        values = []
+        for property_index, property_ranges in enumerate(ranges):
+            index = indexes[property_index]
+            while index < len(property_ranges) and property_ranges[index]["upperBound"] <= start:
+                index += 1
+            indexes[property_index] = index
+            if index < len(property_ranges):
+                values.append(property_ranges[index]["value"])
+                end = min(end, property_ranges[index]["upperBound"])
+            else:
+                values.append(defaults[property_index])
+        yield start, end, tuple(values)
+        start = end
+
 
 def decode_b64_plist(encoded_string):
     """
     Decodes Vectornator Text data (Binary plist encoded in base64).
     """
+    import base64
+    import plistlib
+
     decoded_bplist = plistlib.loads(base64.b64decode(encoded_string))
     return decoded_bplist
 
@@ -77,93 +121,83 @@ def get_text_anchor(alignment_value):
 # This file is copied from
 # https://github.com/avibrazil/NSKeyedUnArchiver
 # LGPL3
+# (_unserialize() is rewritten to resolve each object once)
 
-def _unserialize(o: dict, serialized: dict, removeClassName: bool, start: bool = True):
-    if start:
-        reassembled = copy.deepcopy(o)
-    else:
-        reassembled = o
-
-    finished = False
-    while not finished:
-        finished = True
-
-        cursor = None
-        if isinstance(reassembled, bytes):
-            try:
-                return unserializeNSKeyedArchiver(reassembled)
-            except:
-                # Not plist data, just plain binary
-                return reassembled
-        elif isinstance(reassembled, dict):
-            cursor = reassembled.keys()
-        elif isinstance(reassembled, list):
-            cursor = range(len(reassembled))
-        else:  # str, int etc
-            print("reassembled is a " +
-                  str(type(reassembled)) + ":" + str(reassembled))
-            return reassembled
-
-        for k in cursor:
-            #             print(f"cursor={k}")
-            if isinstance(reassembled[k], plistlib.UID):
-                reassembled[k] = copy.deepcopy(serialized[reassembled[k].data])
-
-                if str(reassembled[k]) == "$null":
-                    reassembled[k] = None
-
-                finished = False
-            elif isinstance(reassembled[k], dict) or isinstance(reassembled[k], list):
-                reassembled[k] = _unserialize(
-                    reassembled[k], serialized, removeClassName, start=False
-                )
-
-                if (
-                    "$class" in reassembled[k]
-                    and "$classes" in reassembled[k]["$class"]
-                ):
-                    # Specialized handler for common class types
-
-                    if "NSArray" in reassembled[k]["$class"]["$classes"]:
-                        reassembled[k] = reassembled[k]["NS.objects"]
-
-                    elif any(
-                        c in reassembled[k]["$class"]["$classes"]
-                        for c in ["NSMutableDictionary", "NSDictionary"]
-                    ):
-                        reassembled[k] = dict(
-                            zip(reassembled[k]["NS.keys"],
-                                reassembled[k]["NS.objects"])
-                        )
-
-                    elif any(
-                        c in reassembled[k]["$class"]["$classes"]
-                        for c in ["NSMutableString", "NSString"]
-                    ):
-                        reassembled[k] = reassembled[k]["NS.string"]
-
-                    elif any(
-                        c in reassembled[k]["$class"]["$classes"]
-                        for c in ["NSMutableData", "NSData"]
-                    ):
-                        reassembled[k] = reassembled[k]["NS.data"]
-
-                    elif "NSDate" in reassembled[k]["$class"]["$classes"]:
-                        apple2001reference = datetime.datetime(
-                            2001, 1, 1, tzinfo=datetime.timezone.utc
-                        )
-                        reassembled[k] = datetime.datetime.fromtimestamp(
-                            reassembled[k]["NS.time"] +
-                            apple2001reference.timestamp(),
-                            datetime.timezone.utc,
-                        )
-
-                    if removeClassName:
-                        # Remove visual polution
-                        del reassembled[k]["$class"]
-
-                finished = True
+def _unserialize(o: dict, serialized: list, removeClassName: bool):
+    """
+    Resolves the UIDs of `o` (the $top of an NSKeyedArchiver) into `serialized` ($objects).
 
+    Every UID is resolved once (memo table): an object referenced several times is
+    shared, not copied. Containers are created empty and filled from a stack instead
+    of recursion, so decoding is linear in the size of the archive, and references
+    cycles are kept.
+    """
+    import datetime
+    import plistlib
+
+    UID = plistlib.UID
+    memo = {}  # $objects index -> unserialized object
+    pending = []  # (container, raw values or (key, value) pairs) to fill
+
+    def resolve(value):
+        if type(value) is not UID:
+            return convert(value)
+        index = value.data
+        if index in memo:
+            return memo[index]
+        raw = serialized[index]
+        result = memo[index] = None if raw == "$null" else convert(raw)
+        return result
+
+    def convert(raw):
+        if isinstance(raw, list):
+            result = []
+            pending.append((result, raw))
+            return result
+        if not isinstance(raw, dict):
+            return raw
+
+        class_ref = raw.get("$class")
+        class_info = serialized[class_ref.data] if type(class_ref) is UID else class_ref
+        classes = class_info.get("$classes") if isinstance(class_info, dict) else None
+        if classes is None:
+            result = {}
+            pending.append((result, raw.items()))
+            return result
+
+        # Specialized handler for common class types
+        if "NSArray" in classes:
+            result = []
+            pending.append((result, raw["NS.objects"]))
+        elif "NSMutableDictionary" in classes or "NSDictionary" in classes:
+            result = {}
+            pending.append((result, zip(raw["NS.keys"], raw["NS.objects"])))
+        elif "NSMutableString" in classes or "NSString" in classes:
+            result = resolve(raw["NS.string"])
+        elif "NSMutableData" in classes or "NSData" in classes:
+            result = resolve(raw["NS.data"])
+        elif "NSDate" in classes:
+            apple2001reference = datetime.datetime(2001, 1, 1, tzinfo=datetime.timezone.utc)
+            result = datetime.datetime.fromtimestamp(
+                raw["NS.time"] + apple2001reference.timestamp(), datetime.timezone.utc)
+        else:
+            result = {}
+            items = raw.items()
+            if removeClassName:
+                # Remove visual polution
+                items = [(key, value) for key, value in items if key != "$class"]
+            pending.append((result, items))
+        return result
+
+    reassembled = convert(o)
+    while pending:
+        container, items = pending.pop()
+        if type(container) is list:
+            container.extend(resolve(value) for value in items)
+        else:
+            for key, value in items:
+                container[resolve(key)] = resolve(value)
+    dg.TEXT.debug("unarchived %d of %d objects", len(memo), len(serialized))
     return reassembled
 
 
@@ -177,6 +211,8 @@ def unserializeNSKeyedArchiver(plist, removeClassName=True):
     • dict       ⟹ unserialize
     """
 
+    import plistlib
+
     if isinstance(plist, bytes):
         plistdata = plistlib.loads(plist)
     elif isinstance(plist, dict):
@@ -188,8 +224,7 @@ def unserializeNSKeyedArchiver(plist, removeClassName=True):
         )
 
     if "$top" in plistdata:
-        o = copy.deepcopy(plistdata["$top"])
-        unserialized = _unserialize(o, plistdata["$objects"], removeClassName)
+        unserialized = _unserialize(plistdata["$top"], plistdata["$objects"], removeClassName)
     else:
         raise TypeError("Passed object is not an NSKeyedArchiver")
 
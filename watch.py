@@ -0,0 +1,295 @@
+"""
+VI watch folder
+
+long-running converter: watches directories and converts new or changed
+Linearity Curve files with a pool of warm worker processes.
+
+usage: python watch.py folder/ [more/] -o out/ --interval 1 --settle 2 --log latency.jsonl
+
+Directories are polled (no platform-specific file events), so it works on network
+and synced folders. A file is converted once its size and mtime have not changed
+for `--settle` seconds and it reads as a complete zip, so files still being written
+are not picked up (a file that never becomes a zip is converted, and fails, after
+10 x `--settle`). Outputs are named like VI batch converter (input.curve -> input.svg),
+existing outputs newer than their input are not converted again.
+
+Workers are started and warmed up (modules imported, JSON backend selected) before
+the first file arrives, so the latency of a file is its conversion time. Each
+conversion prints its status, conversion time and latency (from the moment the
+file is ready to the moment its svg is written), and --log appends it as JSON lines.
+
+A worker process that dies (killed, out of memory) does not stop the watcher: the
+pool is restarted, and the files that were converting are converted again alone,
+a file that kills its worker alone is reported as failed. --timeout fails the
+conversions that take too long (see VI batch converter.convert_one()).
+"""
+
+import argparse
+import json
+import os
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+# Vectornator Inspection
+import batch
+import open_vectornator as ov
+
+# a stable file that is not a complete zip is converted (and reported as failed)
+# after `settle` * INVALID_SETTLE_FACTOR seconds
+INVALID_SETTLE_FACTOR = 10
+
+parser = argparse.ArgumentParser(
+    description='Linearity Curve watch folder converter')
+
+parser.add_argument('directories', nargs='+', help='directories to watch (recursively)')
+parser.add_argument('-o', '--output-dir', default=None,
+                    help='output directory (default: next to each input)')
+parser.add_argument('-j', '--jobs', type=int, default=None,
+                    help='number of worker processes (default: CPU count)')
+parser.add_argument('--interval', type=float, default=1.0,
+                    help='seconds between two scans (default: %(default)s)')
+parser.add_argument('--settle', type=float, default=2.0,
+                    help='seconds a file must stay unchanged before it is converted (default: %(default)s)')
+parser.add_argument('--log', default=None,
+                    help='append one JSON line per conversion (status, duration, latency)')
+parser.add_argument('--timeout', type=float, default=None, metavar='SECONDS',
+                    help='fail a file whose conversion takes longer (default: no limit)')
+parser.add_argument('--once', action='store_true',
+                    help='exit when every file present is converted, instead of watching')
+parser.add_argument('--pretty', action='store_true',
+                    help='indent the svg output')
+parser.add_argument('--images', choices=[ov.exp.IMAGE_INLINE, ov.exp.IMAGE_EXTERNAL],
+                    default=ov.exp.IMAGE_INLINE,
+                    help='embed bitmaps, or write them to an images directory next to each svg')
+parser.add_argument('--styles', choices=[ov.exp.STYLE_INLINE, ov.exp.STYLE_CSS],
+                    default=ov.exp.STYLE_INLINE,
+                    help='style attributes, or CSS classes in a <style> element (smaller, defaults omitted)')
+parser.add_argument('--skip-hidden', action='store_true',
+                    help='omit hidden elements and invisible layers (instead of display:none)')
+parser.add_argument('--json-backend', choices=ov.tj.BACKENDS, default="auto",
+                    help='JSON parser (default: orjson if installed)')
+parser.add_argument('--incremental-json', action='store_true',
+                    help='parse artboard tables one by one, keeping path geometries as JSON text until used')
+parser.add_argument('--streaming', action='store_true',
+                    help='export elements while they are decoded (gradients are defined at the end)')
+parser.add_argument('--precision', type=ov.precision_type, default=ov.exp.pe.DEFAULT_PRECISION,
+                    help='decimals in path data, or "full" (default: %(default)s)')
+parser.add_argument('--result-cache', default=None, metavar='DIR',
+                    help='reuse the svgs of unchanged inputs from a cache directory (see result_cache.py)')
+parser.add_argument('--result-cache-size', type=float,
+                    default=ov.rc.DEFAULT_MAX_BYTES / 1024 ** 2, metavar='MB',
+                    help='size limit of the result cache (default: %(default)d MB)')
+
+
+def signature(path):
+    """Returns (size, mtime in ns) of a file, or None if it does not exist anymore."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class FolderWatcher:
+    """
+    Polls directories for new or changed .curve files, and debounces them.
+
+    Args:
+        directories (list): Directories watched recursively.
+        output_dir (str): Output directory (None: next to each input).
+        settle (float): Seconds a file must stay unchanged before it is ready.
+    """
+
+    def __init__(self, directories, output_dir=None, settle=2.0):
+        self.roots = [os.path.abspath(directory) for directory in directories]
+        self.output_dir = None if output_dir is None else os.path.abspath(output_dir)
+        self.settle = settle
+        # path -> (signature, time it was first seen with this signature)
+        self.pending = {}
+        # path -> signature of the last conversion (or failure)
+        self.converted = {}
+        for path, root in self.scan().items():
+            if batch.is_up_to_date(path, self.output_for(path, root)):
+                self.converted[path] = signature(path)
+
+    def scan(self):
+        """Returns {path: root} of every .curve file below the watched directories."""
+        paths = {}
+        for root in self.roots:
+            for path, _ in batch.collect_inputs([root]):
+                paths.setdefault(path, root)
+        return paths
+
+    def output_for(self, path, root):
+        """Returns the svg path of an input."""
+        return batch.output_path_for(path, root, self.output_dir)
+
+    def poll(self, now, running=()):
+        """
+        Scans the directories and returns the ready files as (path, signature, output).
+
+        Files in `running` (paths being converted) are not returned again.
+        """
+        ready = []
+        paths = self.scan()
+        for path in list(self.pending):
+            if path not in paths:
+                del self.pending[path]
+        for path in list(self.converted):
+            if path not in paths:
+                del self.converted[path]
+
+        for path, root in paths.items():
+            current = signature(path)
+            if current is None or self.converted.get(path) == current or path in running:
+                self.pending.pop(path, None)
+                continue
+            seen = self.pending.get(path)
+            if seen is None or seen[0] != current:
+                self.pending[path] = (current, now)
+            elif now - seen[1] >= self.settle and (
+                    # no central directory yet: probably still being written
+                    zipfile.is_zipfile(path)
+                    or now - seen[1] >= self.settle * INVALID_SETTLE_FACTOR):
+                del self.pending[path]
+                ready.append((path, current, self.output_for(path, root)))
+        return ready
+
+    def done(self, path, converted_signature):
+        """Records a finished conversion (converted again only if the file changes)."""
+        self.converted[path] = converted_signature
+
+
+def warm_worker(json_backend):
+    """
+    Worker initializer: selects the JSON backend, and imports the optional modules
+    VI modules load on first use (orjson, NumPy), so that no conversion pays for them.
+    """
+    ov.tj.set_backend(json_backend)
+    ov.tj.loads(b"{}")
+    ov.exp.tp.numpy()
+
+
+def ping():
+    """Empty task, used to start the workers."""
+    return os.getpid()
+
+
+def warm_pool(executor, jobs):
+    """Starts the `jobs` worker processes of `executor` before the first file arrives."""
+    wait([executor.submit(ping) for _ in range(jobs)])
+
+
+def start_pool(jobs, json_backend):
+    """Returns a process pool of `jobs` warm workers."""
+    executor = ProcessPoolExecutor(max_workers=jobs, initializer=warm_worker,
+                                   initargs=(json_backend,))
+    warm_pool(executor, jobs)
+    return executor
+
+
+def report(result, log=None):
+    """Prints a conversion result and appends it to the `log` JSON lines file."""
+    print(f"[{result['status']}] {result['input']} (convert {result['duration']:.2f}s, "
+          f"latency {result['latency']:.2f}s)", flush=True)
+    if log is not None:
+        with open(log, "a", encoding="utf-8") as log_file:
+            log_file.write(json.dumps(result) + "\n")
+
+
+def watch(directories, output_dir=None, jobs=None, interval=1.0, settle=2.0,
+          json_backend="auto", log=None, once=False, timeout=None, **options):
+    """
+    Converts new or changed files below `directories` until interrupted.
+
+    `options` are passed to convert_vectornator() like VI batch converter.run_batch().
+    `timeout` (seconds) fails the conversions that take longer.
+    With `once`, returns when every file present is converted.
+    Returns the number of conversions.
+    """
+    jobs = jobs or os.cpu_count()
+    watcher = FolderWatcher(directories, output_dir, settle)
+    conversions = 0
+    # ready files waiting for a worker: (path, signature, output, time the file was ready)
+    queue = deque()
+    # files that were converting when the pool broke, converted again alone
+    crashed = set()
+    running = {}  # future -> (path, signature, output, ready)
+    executor = start_pool(jobs, json_backend)
+    print(f"Watching {', '.join(watcher.roots)} with {jobs} workers.", flush=True)
+    try:
+        while True:
+            now = time.monotonic()
+            running_paths = {path for path, _, _, _ in running.values()}
+            running_paths.update(path for path, _, _, _ in queue)
+            for path, current, output in watcher.poll(now, running_paths):
+                queue.append((path, current, output, now))
+            broken = False
+            try:
+                while queue and len(running) < jobs:
+                    path, _, output, _ = queue[0]
+                    if running and (path in crashed or crashed.intersection(running_paths)):
+                        break
+                    future = executor.submit(batch.convert_one, path, output, options, timeout)
+                    running[future] = queue.popleft()
+                    running_paths.add(path)
+            except BrokenProcessPool:
+                # broken since the last wait()
+                broken = True
+
+            if once and not running and not queue and not watcher.pending:
+                break
+            if broken:
+                finished = wait(running)[0]
+            elif running:
+                finished, _ = wait(running, timeout=interval, return_when=FIRST_COMPLETED)
+            else:
+                finished = ()
+                time.sleep(interval)
+            while finished:
+                for future in finished:
+                    path, current, output, ready = running.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool as error:
+                        broken = True
+                        if path not in crashed:
+                            crashed.add(path)
+                            queue.appendleft((path, current, output, ready))
+                            continue
+                        result = batch.failed_result(path, error)
+                    except Exception as error:
+                        result = batch.failed_result(path, error)
+                    crashed.discard(path)
+                    result["latency"] = time.monotonic() - ready
+                    watcher.done(path, current)
+                    conversions += 1
+                    report(result, log)
+                # every future of a broken pool fails
+                finished = wait(running)[0] if broken else ()
+            if broken:
+                print("A worker process died, restarting the pool.", flush=True)
+                executor.shutdown()
+                executor = start_pool(jobs, json_backend)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executor.shutdown(cancel_futures=True)
+    return conversions
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    result_cache = None
+    if args.result_cache:
+        result_cache = ov.rc.ResultCache(args.result_cache,
+                                         int(args.result_cache_size * 1024 ** 2))
+    watch(args.directories, args.output_dir, args.jobs, args.interval, args.settle,
+          args.json_backend, args.log, args.once, args.timeout,
+          incremental=args.incremental_json, streaming=args.streaming,
+          result_cache=result_cache, pretty=args.pretty,
+          image_mode=args.images, precision=args.precision,
+          skip_hidden=args.skip_hidden, style_mode=args.styles)
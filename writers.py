@@ -0,0 +1,155 @@
+"""
+VI writers
+
+writes svg documents to a stream, one element at a time.
+
+Only the element being written is kept in memory, so the whole document is never
+built as a single tree or string. Embedded bitmaps (DataUri) are base64-encoded
+into the stream chunk by chunk.
+"""
+
+
+import base64
+import io
+import xml.etree.ElementTree as ET
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="no"?>'
+
+
+def escape_attribute(value):
+    """Escapes an attribute value like ElementTree does."""
+    value = str(value)
+    if "&" in value:
+        value = value.replace("&", "&amp;")
+    if "<" in value:
+        value = value.replace("<", "&lt;")
+    if ">" in value:
+        value = value.replace(">", "&gt;")
+    if "\"" in value:
+        value = value.replace("\"", "&quot;")
+    if "\r" in value:
+        value = value.replace("\r", "&#13;")
+    if "\n" in value:
+        value = value.replace("\n", "&#10;")
+    if "\t" in value:
+        value = value.replace("\t", "&#09;")
+    return value
+
+
+class DataUri:
+    """
+    Attribute value of a base64 data: URI, encoded while it is written by SvgWriter.
+
+    Args:
+        mime_type (str): Mime type of the data.
+        chunks (callable): Returns an iterable of bytes-like chunks of the data.
+    """
+    __slots__ = ("mime_type", "chunks")
+
+    def __init__(self, mime_type, chunks):
+        self.mime_type = mime_type
+        self.chunks = chunks
+
+    def write_to(self, stream):
+        """Writes the URI to a text stream, one encoded chunk at a time."""
+        stream.write(f"data:{self.mime_type};base64,")
+        rest = b""
+        for chunk in self.chunks():
+            if rest:
+                chunk = rest + chunk
+            # base64 of whole 3-byte groups, the remainder goes with the next chunk
+            cut = len(chunk) - len(chunk) % 3
+            stream.write(base64.b64encode(chunk[:cut]).decode("ascii"))
+            rest = bytes(chunk[cut:])
+        stream.write(base64.b64encode(rest).decode("ascii"))
+
+    def __str__(self):
+        stream = io.StringIO()
+        self.write_to(stream)
+        return stream.getvalue()
+
+
+class SvgWriter:
+    """
+    Streaming svg writer.
+
+    Container elements (svg, layers, groups) are opened with start() and closed with end(),
+    leaf elements are serialized with element() as soon as they are created.
+
+    Args:
+        stream: A text stream to write to.
+        pretty (bool): Indent the output. Indentation is written directly, no reparsing.
+        indent (str): Indent string used when `pretty` is set.
+    """
+
+    def __init__(self, stream, pretty=False, indent="\t"):
+        self.stream = stream
+        self.pretty = pretty
+        self.indent = indent
+        self.open_tags = []
+
+    def _newline(self):
+        """Starts a new indented line in pretty mode."""
+        if self.pretty:
+            self.stream.write("\n" + self.indent * len(self.open_tags))
+
+    def declaration(self):
+        """Writes the XML declaration."""
+        self.stream.write(XML_DECLARATION)
+        if not self.pretty:
+            self.stream.write("\n")
+
+    def start(self, tag, attributes=None):
+        """Writes an opening tag and keeps it open until end() is called."""
+        self._newline()
+        self.stream.write(f"<{tag}")
+        for key, value in (attributes or {}).items():
+            self.stream.write(f" {key}=\"{escape_attribute(value)}\"")
+        self.stream.write(">")
+        self.open_tags.append(tag)
+
+    def start_element(self, element):
+        """Writes the opening tag of an ET.Element (its children are ignored)."""
+        self.start(element.tag, element.attrib)
+
+    def end(self):
+        """Closes the last opened tag."""
+        tag = self.open_tags.pop()
+        self._newline()
+        self.stream.write(f"</{tag}>")
+
+    def element(self, element):
+        """Serializes a complete ET.Element and its children."""
+        if element is None:
+            return
+        self._newline()
+        if any(type(value) is DataUri for value in element.attrib.values()):
+            if not len(element) and element.text is None:
+                self._empty_element(element)
+                return
+            element.attrib = {key: str(value) for key, value in element.attrib.items()}
+        if self.pretty and len(element):
+            ET.indent(element, space=self.indent, level=len(self.open_tags))
+        ET.ElementTree(element).write(self.stream, encoding="unicode")
+
+    def _empty_element(self, element):
+        """Writes an element without children like ElementTree, streaming DataUri values."""
+        self.stream.write(f"<{element.tag}")
+        for key, value in element.attrib.items():
+            self.stream.write(f" {key}=\"")
+            if type(value) is DataUri:
+                value.write_to(self.stream)
+            else:
+                self.stream.write(escape_attribute(value))
+            self.stream.write("\"")
+        self.stream.write(" />")
+
+    def comment(self, text):
+        """Writes an XML comment."""
+        self.element(ET.Comment(text))
+
+    def close(self):
+        """Closes every open tag."""
+        while self.open_tags:
+            self.end()
+        self.stream.write("\n")